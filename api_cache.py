@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+API Caches
+In-process caches for the REST API. Entries are tied to the catalog data
+version stamp written by DatabaseSetup, so a data reload invalidates them.
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+
+from queries import DATA_VERSION_QUERY, PRICE_BUCKETS
+from serialization import dumps, timed_encode
+
+def current_data_version(conn):
+    """Read the catalog data version stamp (0 for databases built without one)"""
+    try:
+        row = conn.execute(DATA_VERSION_QUERY).fetchone()
+    except sqlite3.OperationalError:
+        return 0
+    return row[0] if row else 0
+
+def normalize_filters(filters):
+    """Hashable, order-independent key for a product filter dict"""
+    return (
+        filters.get('category') or None,
+        filters.get('brand') or None,
+        filters.get('department') or None,
+        float(filters['min_price']) if filters.get('min_price') is not None else None,
+        float(filters['max_price']) if filters.get('max_price') is not None else None,
+        ' '.join((filters.get('search') or '').lower().split()) or None,
+        filters.get('price_range') or None,
+    )
+
+class CountCache:
+    """
+    LRU cache of exact product counts keyed by normalized filter tuple.
+    The whole cache is dropped when the data version changes.
+    """
+
+    def __init__(self, max_entries=2048):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _check_version(self, version):
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+
+    def get(self, version, key):
+        with self._lock:
+            self._check_version(version)
+            count = self._entries.get(key)
+            if count is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return count
+
+    def set(self, version, key, count):
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = count
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'data_version': self._version
+            }
+
+class CountEstimator:
+    """
+    Approximate product counts without touching the matching rows.
+    Per-value counts for category/brand/department and an equi-depth price
+    histogram are gathered once per data version (covering index scans);
+    estimates combine them assuming the filters are independent. Searches
+    cannot be estimated this way; estimate() returns None for them.
+    """
+
+    FILTER_COLUMNS = ('category', 'brand', 'department')
+    PRICE_BUCKETS = 256
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._stats = None
+
+    def _load_stats(self, conn):
+        value_counts = {}
+        for column in self.FILTER_COLUMNS:
+            value_counts[column] = dict(
+                conn.execute(f"SELECT {column}, COUNT(*) FROM products GROUP BY {column}").fetchall()
+            )
+        prices = [row[0] for row in conn.execute(
+            "SELECT retail_price FROM products WHERE retail_price IS NOT NULL ORDER BY retail_price")]
+        step = max(len(prices) // self.PRICE_BUCKETS, 1)
+        return {
+            'total': sum(value_counts['category'].values()),
+            'value_counts': value_counts,
+            'price_quantiles': prices[::step] + prices[-1:],
+        }
+
+    def _price_fraction(self, quantiles, min_price, max_price, high_inclusive=True):
+        """Share of products priced within [min_price, max_price]"""
+        if not quantiles:
+            return 0.0
+        low = bisect_left(quantiles, min_price) if min_price is not None else 0
+        if max_price is None:
+            high = len(quantiles)
+        elif high_inclusive:
+            high = bisect_right(quantiles, max_price)
+        else:
+            high = bisect_left(quantiles, max_price)
+        return max(high - low, 0) / len(quantiles)
+
+    def estimate(self, conn, version, filters):
+        if filters.get('search'):
+            return None
+
+        with self._lock:
+            if self._version != version:
+                self._stats = self._load_stats(conn)
+                self._version = version
+            stats = self._stats
+
+        total = stats['total']
+        if not total:
+            return 0
+
+        estimate = float(total)
+        for column in self.FILTER_COLUMNS:
+            if filters.get(column):
+                estimate *= stats['value_counts'][column].get(filters[column], 0) / total
+
+        min_price, max_price = filters.get('min_price'), filters.get('max_price')
+        high_inclusive = True
+        if filters.get('price_range'):
+            # Intersect the named bucket [low, high) with min_price/max_price
+            low, high = PRICE_BUCKETS[filters['price_range']]
+            min_price = low if min_price is None else max(min_price, low)
+            if high is not None and (max_price is None or max_price >= high):
+                max_price, high_inclusive = high, False
+        if min_price is not None or max_price is not None:
+            estimate *= self._price_fraction(stats['price_quantiles'], min_price, max_price,
+                                             high_inclusive)
+
+        return int(round(estimate))
+
+class FragmentCache:
+    """
+    Pre-encoded JSON objects for individual products, keyed by the selected
+    field set and product id and tied to one data version. Listing pages are
+    stitched from these fragments instead of re-encoding every row. Lookups
+    happen once per row, so there is no LRU bookkeeping: the cache is emptied
+    when it fills up, and replaced when the data version changes.
+    """
+
+    def __init__(self, max_entries=100000):
+        self.max_entries = max_entries
+        self._generation = (None, {})
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _entries_for(self, version):
+        generation = self._generation
+        if generation[0] != version:
+            with self._lock:
+                if self._generation[0] != version:
+                    self._generation = (version, {})
+                generation = self._generation
+        return generation[1]
+
+    @timed_encode
+    def encode_rows(self, version, names, rows, id_index):
+        """
+        Encoded fragment for each row: a JSON object of `names` zipped with
+        the row. `id_index` is the position of the product id in the row.
+        """
+        entries = self._entries_for(version)
+        variant = ','.join(names)
+        fragments = []
+        misses = 0
+        for row in rows:
+            key = (variant, row[id_index])
+            fragment = entries.get(key)
+            if fragment is None:
+                fragment = dumps(dict(zip(names, row)))
+                if len(entries) >= self.max_entries:
+                    entries.clear()
+                entries[key] = fragment
+                misses += 1
+            fragments.append(fragment)
+        self.hits += len(fragments) - misses
+        self.misses += misses
+        return fragments
+
+    def stats(self):
+        version, entries = self._generation
+        return {
+            'entries': len(entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'data_version': version
+        }
+
+class CachedResponse:
+    """A serialized response body plus its strong ETag"""
+
+    __slots__ = ('body', 'etag', 'mimetype', 'version', 'expires_at')
+
+    def __init__(self, body, mimetype, version, expires_at):
+        self.body = body
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+        self.mimetype = mimetype
+        self.version = version
+        self.expires_at = expires_at
+
+class ResponseCache:
+    """
+    TTL + LRU cache of already-serialized JSON response bodies.
+    Entries from an older data version are treated as misses.
+    """
+
+    def __init__(self, max_entries=256, default_ttl=300):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.version != version or entry.expires_at <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def set(self, key, version, body, mimetype, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        entry = CachedResponse(body, mimetype, version, time.monotonic() + ttl)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses
+            }
@@ -4,37 +4,275 @@ E-commerce REST API - Milestone 2
 Flask application providing RESTful API endpoints for products
 """
 
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, stream_with_context
+from functools import wraps
 from flask_cors import CORS
-import sqlite3
 import os
 from datetime import datetime
 import logging
+import base64
+import csv
+import io
+import json
+from db_pool import ConnectionPool, DatabaseUnavailable
+from suggest_index import SuggestService
+from facet_index import FacetService
+from api_cache import (
+    CountCache, CountEstimator, FragmentCache, ResponseCache, current_data_version, normalize_filters
+)
+from serialization import FastJSONProvider, dumps, encode_with_array
+import compression
+from compression import compression_level, etag_variants, send_precompressed
+from metrics import Metrics, PROMETHEUS_CONTENT_TYPE
+import storage
+from queries import (
+    PRODUCT_BY_ID_QUERY, PRODUCTS_BY_IDS_QUERY, CATEGORIES_QUERY, BRANDS_QUERY, STATS_QUERY, SORT_ORDERS,
+    PRODUCT_FIELDS, SEARCH_IDS_QUERY, PRICE_BUCKETS,
+    build_match_query, product_list_query, product_count_query, sort_key
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 CORS(app)  # Enable CORS for frontend integration
 
 # Database configuration
-DATABASE = 'ecommerce.db'
+DATABASE = os.environ.get('DATABASE', 'ecommerce.db')
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 8))
+DB_POOL_MAX_USES = int(os.environ.get('DB_POOL_MAX_USES', 10000))
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 5.0))
+RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL', 300))
+RESPONSE_CACHE_SIZE = int(os.environ.get('RESPONSE_CACHE_SIZE', 256))
+
+# Storage profile (storage.py): readonly (default), readwrite, or immutable
+# for a frozen file; mmap size defaults to the file size plus headroom
+DB_OPEN_MODE = os.environ.get('DB_OPEN_MODE', 'readonly')
+DB_CACHE_SIZE_KIB = int(os.environ.get('DB_CACHE_SIZE_KIB', storage.SERVING_CACHE_KIB))
+DB_MMAP_SIZE = int(os.environ['DB_MMAP_SIZE']) if os.environ.get('DB_MMAP_SIZE') else None
+
+# Request metrics (/metrics, Server-Timing) and the slow-query log; 0 disables the log
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 100))
+SERVER_TIMING = os.environ.get('SERVER_TIMING', '1') != '0'
+
+# Registered first so the recorded request time includes compression
+metrics = Metrics(slow_query_ms=SLOW_QUERY_MS, server_timing=SERVER_TIMING)
+metrics.init_app(app)
+
+# Compression and frontend assets
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+STATIC_MAX_AGE = int(os.environ.get('STATIC_MAX_AGE', 3600))
+FRONTEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+compression.init_app(app, min_size=COMPRESSION_MIN_SIZE)
+
+# Listing/aggregate engine: sqlite (default), numpy (in-memory columnar
+# snapshot per process, see catalog_engine.py) or shared (the same snapshot
+# memory-mapped from CATALOG_SNAPSHOT_DIR and shared by all worker processes,
+# see shared_catalog.py); searches still go to SQLite
+CATALOG_ENGINE = os.environ.get('CATALOG_ENGINE', 'sqlite')
+if CATALOG_ENGINE not in ('sqlite', 'numpy', 'shared'):
+    raise ValueError(f"CATALOG_ENGINE must be sqlite, numpy or shared, not {CATALOG_ENGINE!r}")
+CATALOG_SNAPSHOT_DIR = os.environ.get('CATALOG_SNAPSHOT_DIR', 'catalog_snapshots')
+
+def configure_connection(conn):
+    """Apply the serving PRAGMAs to a new pooled connection"""
+    storage.apply_pragmas(conn, storage.serving_pragmas(DATABASE, DB_CACHE_SIZE_KIB, DB_MMAP_SIZE))
+
+db_pool = ConnectionPool(
+    storage.database_uri(DATABASE, DB_OPEN_MODE),
+    max_size=DB_POOL_SIZE,
+    max_uses=DB_POOL_MAX_USES,
+    timeout=DB_POOL_TIMEOUT,
+    factory=metrics.connection_class,
+    uri=True,
+    source=DATABASE,
+    configure=configure_connection
+)
+
+# Caches keyed off the catalog data version stamp
+count_cache = CountCache()
+count_estimator = CountEstimator()
+response_cache = ResponseCache(max_entries=RESPONSE_CACHE_SIZE, default_ttl=RESPONSE_CACHE_TTL)
+fragment_cache = FragmentCache()
+suggest_service = SuggestService(lambda: db_pool.connection())
+facet_service = FacetService(lambda: db_pool.connection())
+catalog_service = None
+if CATALOG_ENGINE == 'numpy':
+    from catalog_engine import CatalogService
+    catalog_service = CatalogService(lambda: db_pool.connection())
+elif CATALOG_ENGINE == 'shared':
+    from shared_catalog import SharedCatalogService
+    catalog_service = SharedCatalogService(lambda: db_pool.connection(), CATALOG_SNAPSHOT_DIR)
+
+COUNT_MODES = ('exact', 'estimate', 'none')
 
 def get_db_connection():
-    """Create a database connection"""
-    try:
-        conn = sqlite3.connect(DATABASE)
-        conn.row_factory = sqlite3.Row  # This enables column access by name
-        return conn
-    except Exception as e:
-        logger.error(f"Database connection error: {e}")
-        return None
+    """Borrow a pooled database connection (use as a context manager)"""
+    return metrics.connection(db_pool)
 
 def dict_from_row(row):
     """Convert sqlite3.Row object to dictionary"""
     return dict(zip(row.keys(), row))
 
+def parse_product_filters():
+    """Read the product filter query parameters shared by the listing endpoints"""
+    return {
+        'category': request.args.get('category'),
+        'brand': request.args.get('brand'),
+        'department': request.args.get('department'),
+        'min_price': request.args.get('min_price', type=float),
+        'max_price': request.args.get('max_price', type=float),
+        'search': request.args.get('search'),
+        # An unencoded "200+" in a query string arrives as "200 "
+        'price_range': (request.args.get('price_range') or '').replace(' ', '+') or None
+    }
+
+def validate_product_filters(filters):
+    """Error message for filter values that cannot be applied, or None"""
+    if filters['price_range'] and filters['price_range'] not in PRICE_BUCKETS:
+        return f"price_range must be one of: {', '.join(PRICE_BUCKETS)}"
+    return None
+
+def cached_response(ttl=None):
+    """
+    Serve a GET endpoint from the server-side response cache.
+    The serialized body is stored with a strong ETag; requests carrying a
+    matching If-None-Match get a 304. Entries expire after `ttl` seconds or
+    as soon as the catalog data version changes.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                with get_db_connection() as conn:
+                    version = current_data_version(conn)
+            except DatabaseUnavailable:
+                return view(*args, **kwargs)
+            
+            key = request.full_path
+            entry = response_cache.get(key, version)
+            cache_status = 'HIT'
+            if entry is None:
+                response = app.make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                entry = response_cache.set(key, version, response.get_data(), response.mimetype, ttl)
+                cache_status = 'MISS'
+            
+            # A compressed response carries a suffixed tag of the same entry
+            matched = [tag for tag in etag_variants(entry.etag) if request.if_none_match.contains(tag)]
+            if matched:
+                response = app.response_class(status=304)
+                response.set_etag(matched[0])
+                response.vary.add('Accept-Encoding')
+            else:
+                response = app.response_class(entry.body, mimetype=entry.mimetype)
+                response.set_etag(entry.etag)
+            response.headers['Cache-Control'] = 'no-cache'
+            response.headers['X-Cache'] = cache_status
+            return response
+        return wrapper
+    return decorator
+
+def parse_sort(filters):
+    """Read the sort parameter as (sort, error message or None)"""
+    searching = build_match_query(filters['search']) is not None
+    sort = request.args.get('sort', 'relevance' if searching else 'id')
+    if sort not in SORT_ORDERS:
+        return sort, f"sort must be one of: {', '.join(SORT_ORDERS)}"
+    if sort == 'relevance' and not searching:
+        return sort, 'sort=relevance requires a search term'
+    return sort, None
+
+LIST_FORMATS = ('rows', 'columns')
+
+def parse_fields():
+    """Read the fields projection as (field list or None for all fields, error message or None)"""
+    raw = request.args.get('fields')
+    if raw is None:
+        return None, None
+    fields = list(dict.fromkeys(field.strip() for field in raw.split(',') if field.strip()))
+    unknown = [field for field in fields if field not in PRODUCT_FIELDS]
+    if unknown or not fields:
+        return None, f"fields must be a comma-separated list of: {', '.join(PRODUCT_FIELDS)}"
+    return fields, None
+
+def get_catalog(version, filters=None, sort='id'):
+    """
+    Columnar catalog snapshot to answer from, or None to query SQLite
+    (engine disabled, snapshot unavailable or still being rebuilt for
+    `version`, or a search/relevance listing). A snapshot of an older
+    version is never used: callers cache what they encode under `version`.
+    """
+    if catalog_service is None:
+        return None
+    catalog = catalog_service.get_index(version, stale_ok=False)
+    if catalog is None or (filters is not None and not catalog.supports(filters, sort)):
+        return None
+    return catalog
+
+def preload_catalog():
+    """
+    Build (or map) the catalog snapshot in a parent process before it forks
+    workers, so every worker starts with it instead of building its own.
+    Pooled connections are closed so none are inherited across the fork.
+    """
+    if catalog_service is None:
+        return None
+    with get_db_connection() as conn:
+        version = current_data_version(conn)
+    catalog = catalog_service.load(version)
+    db_pool.close_all()
+    return catalog
+
+def get_total_count(conn, filters, mode):
+    """
+    Total products matching `filters` as (count, is_exact).
+    exact: served from the count cache, running COUNT(*) only on a miss.
+    estimate: cached exact count if present, else a statistics-based estimate.
+    none: no count at all.
+    """
+    if mode == 'none':
+        return None, False
+    
+    version = current_data_version(conn)
+    key = normalize_filters(filters)
+    cached = count_cache.get(version, key)
+    if cached is not None:
+        return cached, True
+    
+    if mode == 'estimate':
+        estimate = count_estimator.estimate(conn, version, filters)
+        if estimate is not None:
+            return estimate, False
+    
+    count_query, count_params = product_count_query(filters)
+    total_count = conn.execute(count_query, count_params).fetchone()['total']
+    count_cache.set(version, key, total_count)
+    return total_count, True
+
+def encode_cursor(sort, row):
+    """Opaque pagination cursor holding the sort order and last (sort key, id)"""
+    payload = json.dumps({'s': sort, 'k': list(sort_key(sort, row))}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_cursor(token, sort):
+    """Decode a cursor from encode_cursor(); raises ValueError if it is invalid"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        key = tuple(payload['k'])
+    except Exception:
+        raise ValueError('Malformed cursor')
+    if payload.get('s') != sort:
+        raise ValueError('Cursor was issued for a different sort order')
+    if len(key) != (1 if sort == 'id' else 2):
+        raise ValueError('Malformed cursor')
+    return key
+
 @app.route('/')
 def home():
     """API home endpoint"""
@@ -44,9 +282,16 @@ def home():
         'endpoints': {
             'GET /api/products': 'List all products (with optional pagination)',
             'GET /api/products/<id>': 'Get specific product by ID',
+            'GET|POST /api/products/batch': 'Get several products by ID in one request',
             'GET /api/products/categories': 'Get all product categories',
             'GET /api/products/brands': 'Get all product brands',
-            'GET /api/products/stats': 'Get product statistics'
+            'GET /api/products/stats': 'Get product statistics',
+            'GET /api/products/suggest?q=': 'Autocomplete product names, brands and categories',
+            'GET /api/products/facets': 'Get category, brand, department, distribution center and price range counts for the current filters',
+            'GET /api/products/export': 'Stream the filtered catalog as NDJSON or CSV',
+            'GET /api/pool/stats': 'Get database connection pool metrics',
+            'GET /metrics': 'Request, SQL and connection metrics (Prometheus text format)',
+            'GET /index.html': 'Frontend (run build_assets.py for precompressed assets)'
         },
         'timestamp': datetime.now().isoformat()
     })
@@ -57,170 +302,247 @@ def get_products():
     GET /api/products - List all products with optional pagination
     Query parameters:
     - page: Page number (default: 1)
+    - cursor: Opaque cursor from a previous response's next_cursor; seeks
+      straight to the next page instead of using page/OFFSET
     - limit: Items per page (default: 20, max: 100)
+    - sort: id (default), price_asc, price_desc or relevance (default when searching)
+    - count: exact (default), estimate or none - how total_items is computed
     - category: Filter by category
     - brand: Filter by brand
     - department: Filter by department (Men/Women)
     - min_price: Minimum price filter
     - max_price: Maximum price filter
+    - price_range: Named price bucket: 0-50, 50-100, 100-200 or 200+ (upper bound exclusive)
+    - search: Full-text search over name, brand and category (BM25-ranked,
+      last word matched as a prefix); combines with the other filters
+    - fields: Comma-separated fields to return (default: all), e.g. id,name,retail_price
+    - format: rows (default, one object per product) or columns (one array per field)
     """
     try:
         # Get query parameters
         page = request.args.get('page', 1, type=int)
         limit = min(request.args.get('limit', 20, type=int), 100)  # Max 100 items per page
-        category = request.args.get('category')
-        brand = request.args.get('brand')
-        department = request.args.get('department')
-        min_price = request.args.get('min_price', type=float)
-        max_price = request.args.get('max_price', type=float)
-        
-        # Calculate offset for pagination
-        offset = (page - 1) * limit
-        
-        # Build the query
-        query = """
-            SELECT 
-                p.id,
-                p.name,
-                p.brand,
-                p.category,
-                p.department,
-                p.retail_price,
-                p.cost,
-                p.sku,
-                dc.name as distribution_center,
-                dc.latitude as dc_latitude,
-                dc.longitude as dc_longitude
-            FROM products p
-            LEFT JOIN distribution_centers dc ON p.distribution_center_id = dc.id
-            WHERE 1=1
-        """
-        
-        params = []
-        
-        # Add filters
-        if category:
-            query += " AND p.category = ?"
-            params.append(category)
+        filters = parse_product_filters()
+        filters_error = validate_product_filters(filters)
+        sort, sort_error = parse_sort(filters)
+        fields, fields_error = parse_fields()
+        list_format = request.args.get('format', 'rows')
+        cursor_token = request.args.get('cursor')
+        count_mode = request.args.get('count', 'exact')
         
-        if brand:
-            query += " AND p.brand = ?"
-            params.append(brand)
+        if page < 1 or limit < 1:
+            return jsonify({
+                'success': False,
+                'error': 'Invalid pagination',
+                'message': 'page and limit must be positive integers'
+            }), 400
         
-        if department:
-            query += " AND p.department = ?"
-            params.append(department)
+        if list_format not in LIST_FORMATS:
+            return jsonify({
+                'success': False,
+                'error': 'Invalid format',
+                'message': f"format must be one of: {', '.join(LIST_FORMATS)}"
+            }), 400
         
-        if min_price is not None:
-            query += " AND p.retail_price >= ?"
-            params.append(min_price)
+        if fields_error:
+            return jsonify({
+                'success': False,
+                'error': 'Invalid fields',
+                'message': fields_error
+            }), 400
         
-        if max_price is not None:
-            query += " AND p.retail_price <= ?"
-            params.append(max_price)
+        if count_mode not in COUNT_MODES:
+            return jsonify({
+                'success': False,
+                'error': 'Invalid count mode',
+                'message': f"count must be one of: {', '.join(COUNT_MODES)}"
+            }), 400
         
-        # Add ordering and pagination
-        query += " ORDER BY p.id LIMIT ? OFFSET ?"
-        params.extend([limit, offset])
+        if filters_error:
+            return jsonify({
+                'success': False,
+                'error': 'Invalid filter',
+                'message': filters_error
+            }), 400
         
-        # Get total count for pagination
-        count_query = """
-            SELECT COUNT(*) as total
-            FROM products p
-            WHERE 1=1
-        """
+        if sort_error:
+            return jsonify({
+                'success': False,
+                'error': 'Invalid sort',
+                'message': sort_error
+            }), 400
         
-        count_params = []
-        if category:
-            count_query += " AND p.category = ?"
-            count_params.append(category)
-        if brand:
-            count_query += " AND p.brand = ?"
-            count_params.append(brand)
-        if department:
-            count_query += " AND p.department = ?"
-            count_params.append(department)
-        if min_price is not None:
-            count_query += " AND p.retail_price >= ?"
-            count_params.append(min_price)
-        if max_price is not None:
-            count_query += " AND p.retail_price <= ?"
-            count_params.append(max_price)
+        # Keyset mode seeks past the cursor row; page mode falls back to OFFSET
+        after = None
+        offset = 0
+        if cursor_token:
+            try:
+                after = decode_cursor(cursor_token, sort)
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'error': 'Invalid cursor',
+                    'message': str(e)
+                }), 400
+        else:
+            offset = (page - 1) * limit
         
-        conn = get_db_connection()
-        if not conn:
-            return jsonify({'error': 'Database connection failed'}), 500
+        # One extra row is fetched to know whether a next page exists
+        query, params = product_list_query(filters, limit + 1, offset, sort=sort, after=after,
+                                           fields=fields)
         
-        try:
-            # Get total count
-            cursor = conn.execute(count_query, count_params)
-            total_count = cursor.fetchone()['total']
+        with get_db_connection() as conn:
+            version = current_data_version(conn)
+            catalog = get_catalog(version, filters, sort)
+            if catalog is not None:
+                # In-memory snapshot: counts are exact and cheap
+                total_count, count_exact = (None, False) if count_mode == 'none' else (catalog.count(filters), True)
+                all_names, rows = catalog.query(filters, limit + 1, offset, sort=sort, after=after,
+                                                fields=fields)
+            else:
+                # Get total count (cached, estimated or skipped)
+                total_count, count_exact = get_total_count(conn, filters, count_mode)
+                
+                # Get products
+                cursor = conn.execute(query, params)
+                rows = cursor.fetchall()
+                all_names = [column[0] for column in cursor.description]
+            has_next = len(rows) > limit
+            rows = rows[:limit]
             
-            # Get products
-            cursor = conn.execute(query, params)
-            products = [dict_from_row(row) for row in cursor.fetchall()]
+            # Column names are read once per query; sort key columns selected
+            # only for the cursor come after the requested fields and are dropped
+            names = all_names[:len(fields)] if fields is not None else all_names
+            fragments = None
+            if list_format == 'columns':
+                products = {name: [row[i] for row in rows] for i, name in enumerate(names)}
+            elif 'relevance' in names:
+                # Relevance depends on the search, so these rows are not cacheable
+                products = [dict(zip(names, row)) for row in rows]
+            else:
+                fragments = fragment_cache.encode_rows(version, names, rows, all_names.index('id'))
             
             # Calculate pagination info
-            total_pages = (total_count + limit - 1) // limit
+            total_pages = (total_count + limit - 1) // limit if total_count is not None else None
             
-            return jsonify({
+            payload = {
                 'success': True,
-                'data': products,
                 'pagination': {
-                    'page': page,
+                    'page': None if after is not None else page,
                     'limit': limit,
+                    'sort': sort,
                     'total_items': total_count,
+                    'total_items_exact': count_exact,
                     'total_pages': total_pages,
-                    'has_next': page < total_pages,
-                    'has_prev': page > 1
+                    'has_next': has_next,
+                    'has_prev': after is not None or page > 1,
+                    'next_cursor': encode_cursor(sort, dict(zip(all_names, rows[-1]))) if has_next else None
                 },
-                'filters_applied': {
-                    'category': category,
-                    'brand': brand,
-                    'department': department,
-                    'min_price': min_price,
-                    'max_price': max_price
-                }
-            })
+                'filters_applied': filters
+            }
             
-        finally:
-            conn.close()
+            if fragments is not None:
+                return app.response_class(encode_with_array(payload, 'data', fragments),
+                                          mimetype='application/json')
+            payload['data'] = products
+            return jsonify(payload)
             
+    except DatabaseUnavailable:
+        return jsonify({'error': 'Database connection failed'}), 503
     except Exception as e:
         logger.error(f"Error in get_products: {e}")
         return jsonify({'error': 'Internal server error'}), 500
 
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+EXPORT_BATCH_SIZE = 500
+
+@app.route('/api/products/export', methods=['GET'])
+@compression_level(gzip=1, br=1)
+def export_products():
+    """
+    GET /api/products/export - Stream every product matching the filters
+    Query parameters:
+    - format: ndjson (default, one JSON object per line) or csv
+    - sort and the filters accepted by GET /api/products
+    Rows are streamed from the database cursor in small batches, so memory
+    use does not grow with the result size and the first rows go out at once.
+    """
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({
+            'success': False,
+            'error': 'Invalid format',
+            'message': f"format must be one of: {', '.join(EXPORT_FORMATS)}"
+        }), 400
+    
+    filters = parse_product_filters()
+    filters_error = validate_product_filters(filters)
+    if filters_error:
+        return jsonify({
+            'success': False,
+            'error': 'Invalid filter',
+            'message': filters_error
+        }), 400
+    
+    sort, sort_error = parse_sort(filters)
+    if sort_error:
+        return jsonify({
+            'success': False,
+            'error': 'Invalid sort',
+            'message': sort_error
+        }), 400
+    
+    # LIMIT -1 means no limit in SQLite
+    query, params = product_list_query(filters, -1, sort=sort)
+    
+    def generate():
+        try:
+            with get_db_connection() as conn:
+                cursor = conn.execute(query, params)
+                columns = [column[0] for column in cursor.description]
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                if export_format == 'csv':
+                    writer.writerow(columns)
+                
+                while True:
+                    rows = cursor.fetchmany(EXPORT_BATCH_SIZE)
+                    if not rows:
+                        break
+                    if export_format == 'csv':
+                        writer.writerows(rows)
+                        yield buffer.getvalue()
+                        buffer.seek(0)
+                        buffer.truncate()
+                    else:
+                        yield b''.join(dumps(dict(zip(columns, row))) + b'\n' for row in rows)
+        except Exception as e:
+            # Headers are already sent; all we can do is stop the stream
+            logger.error(f"Error in export_products: {e}")
+    
+    response = app.response_class(stream_with_context(generate()), mimetype=EXPORT_FORMATS[export_format])
+    response.headers['Content-Disposition'] = f'attachment; filename=products.{export_format}'
+    response.headers['X-Accel-Buffering'] = 'no'  # Let reverse proxies pass chunks through
+    return response
+
 @app.route('/api/products/<int:product_id>', methods=['GET'])
 def get_product(product_id):
     """
     GET /api/products/{id} - Get a specific product by ID
     """
     try:
-        conn = get_db_connection()
-        if not conn:
-            return jsonify({'error': 'Database connection failed'}), 500
-        
-        try:
-            query = """
-                SELECT 
-                    p.id,
-                    p.name,
-                    p.brand,
-                    p.category,
-                    p.department,
-                    p.retail_price,
-                    p.cost,
-                    p.sku,
-                    dc.name as distribution_center,
-                    dc.latitude as dc_latitude,
-                    dc.longitude as dc_longitude
-                FROM products p
-                LEFT JOIN distribution_centers dc ON p.distribution_center_id = dc.id
-                WHERE p.id = ?
-            """
-            
-            cursor = conn.execute(query, (product_id,))
-            product = cursor.fetchone()
+        with get_db_connection() as conn:
+            catalog = get_catalog(current_data_version(conn))
+            if catalog is not None:
+                names, rows = catalog.rows_by_id([product_id])
+                product = dict(zip(names, rows[product_id])) if rows else None
+            else:
+                cursor = conn.execute(PRODUCT_BY_ID_QUERY, (product_id,))
+                row = cursor.fetchone()
+                product = dict_from_row(row) if row else None
             
             if not product:
                 return jsonify({
@@ -231,132 +553,278 @@ def get_product(product_id):
             
             return jsonify({
                 'success': True,
-                'data': dict_from_row(product)
+                'data': product
             })
             
-        finally:
-            conn.close()
-            
     except ValueError:
         return jsonify({
             'success': False,
             'error': 'Invalid product ID',
             'message': 'Product ID must be a valid integer'
         }), 400
+    except DatabaseUnavailable:
+        return jsonify({'error': 'Database connection failed'}), 503
     except Exception as e:
         logger.error(f"Error in get_product: {e}")
         return jsonify({'error': 'Internal server error'}), 500
 
+BATCH_MAX_IDS = 500
+
+@app.route('/api/products/batch', methods=['GET', 'POST'])
+def get_products_batch():
+    """
+    GET|POST /api/products/batch - Get several products by ID in one query
+    - GET: ?ids=1,2,3
+    - POST: JSON body {"ids": [1, 2, 3]}
+    Results are returned in request order; IDs that do not exist are null
+    in `data` and listed in `not_found`. At most 500 IDs per request.
+    """
+    try:
+        if request.method == 'POST':
+            body = request.get_json(silent=True) or {}
+            raw_ids = body.get('ids', [])
+        else:
+            raw_ids = [part for part in request.args.get('ids', '').split(',') if part.strip()]
+        
+        try:
+            if not isinstance(raw_ids, list):
+                raise ValueError
+            ids = [int(product_id) for product_id in raw_ids]
+        except (TypeError, ValueError):
+            return jsonify({
+                'success': False,
+                'error': 'Invalid product IDs',
+                'message': 'ids must be a list of integers'
+            }), 400
+        
+        if len(ids) > BATCH_MAX_IDS:
+            return jsonify({
+                'success': False,
+                'error': 'Too many IDs',
+                'message': f'At most {BATCH_MAX_IDS} IDs per request'
+            }), 400
+        
+        products = {}
+        if ids:
+            with get_db_connection() as conn:
+                version = current_data_version(conn)
+                catalog = get_catalog(version)
+                if catalog is not None:
+                    names, found = catalog.rows_by_id(list(dict.fromkeys(ids)))
+                    rows = list(found.values())
+                else:
+                    cursor = conn.execute(PRODUCTS_BY_IDS_QUERY, (json.dumps(list(dict.fromkeys(ids))),))
+                    rows = cursor.fetchall()
+                    names = [column[0] for column in cursor.description]
+                id_index = names.index('id')
+                fragments = fragment_cache.encode_rows(version, names, rows, id_index)
+                products = {row[id_index]: fragment for row, fragment in zip(rows, fragments)}
+        
+        payload = {
+            'success': True,
+            'not_found': [product_id for product_id in dict.fromkeys(ids) if product_id not in products]
+        }
+        return app.response_class(
+            encode_with_array(payload, 'data', [products.get(product_id, b'null') for product_id in ids]),
+            mimetype='application/json'
+        )
+        
+    except DatabaseUnavailable:
+        return jsonify({'error': 'Database connection failed'}), 503
+    except Exception as e:
+        logger.error(f"Error in get_products_batch: {e}")
+        return jsonify({'error': 'Internal server error'}), 500
+
 @app.route('/api/products/categories', methods=['GET'])
+@cached_response()
 def get_categories():
     """GET /api/products/categories - Get all product categories with counts"""
     try:
-        conn = get_db_connection()
-        if not conn:
-            return jsonify({'error': 'Database connection failed'}), 500
-        
-        try:
-            query = """
-                SELECT 
-                    category,
-                    COUNT(*) as product_count,
-                    AVG(retail_price) as avg_price,
-                    MIN(retail_price) as min_price,
-                    MAX(retail_price) as max_price
-                FROM products
-                GROUP BY category
-                ORDER BY product_count DESC
-            """
-            
-            cursor = conn.execute(query)
-            categories = [dict_from_row(row) for row in cursor.fetchall()]
+        with get_db_connection() as conn:
+            catalog = get_catalog(current_data_version(conn))
+            if catalog is not None:
+                categories = catalog.categories()
+            else:
+                cursor = conn.execute(CATEGORIES_QUERY)
+                categories = [dict_from_row(row) for row in cursor.fetchall()]
             
             return jsonify({
                 'success': True,
                 'data': categories
             })
             
-        finally:
-            conn.close()
-            
+    except DatabaseUnavailable:
+        return jsonify({'error': 'Database connection failed'}), 503
     except Exception as e:
         logger.error(f"Error in get_categories: {e}")
         return jsonify({'error': 'Internal server error'}), 500
 
 @app.route('/api/products/brands', methods=['GET'])
+@cached_response()
 def get_brands():
     """GET /api/products/brands - Get all product brands with counts"""
     try:
-        conn = get_db_connection()
-        if not conn:
-            return jsonify({'error': 'Database connection failed'}), 500
-        
-        try:
-            query = """
-                SELECT 
-                    brand,
-                    COUNT(*) as product_count,
-                    AVG(retail_price) as avg_price
-                FROM products
-                GROUP BY brand
-                HAVING COUNT(*) > 1
-                ORDER BY product_count DESC
-                LIMIT 50
-            """
-            
-            cursor = conn.execute(query)
-            brands = [dict_from_row(row) for row in cursor.fetchall()]
+        with get_db_connection() as conn:
+            catalog = get_catalog(current_data_version(conn))
+            if catalog is not None:
+                brands = catalog.brands()
+            else:
+                cursor = conn.execute(BRANDS_QUERY)
+                brands = [dict_from_row(row) for row in cursor.fetchall()]
             
             return jsonify({
                 'success': True,
                 'data': brands
             })
             
-        finally:
-            conn.close()
-            
+    except DatabaseUnavailable:
+        return jsonify({'error': 'Database connection failed'}), 503
     except Exception as e:
         logger.error(f"Error in get_brands: {e}")
         return jsonify({'error': 'Internal server error'}), 500
 
 @app.route('/api/products/stats', methods=['GET'])
+@cached_response()
 def get_product_stats():
     """GET /api/products/stats - Get product statistics"""
     try:
-        conn = get_db_connection()
-        if not conn:
-            return jsonify({'error': 'Database connection failed'}), 500
-        
-        try:
-            query = """
-                SELECT 
-                    COUNT(*) as total_products,
-                    COUNT(DISTINCT category) as unique_categories,
-                    COUNT(DISTINCT brand) as unique_brands,
-                    COUNT(DISTINCT department) as departments,
-                    AVG(retail_price) as avg_price,
-                    MIN(retail_price) as min_price,
-                    MAX(retail_price) as max_price,
-                    SUM(CASE WHEN department = 'Men' THEN 1 ELSE 0 END) as men_products,
-                    SUM(CASE WHEN department = 'Women' THEN 1 ELSE 0 END) as women_products
-                FROM products
-            """
-            
-            cursor = conn.execute(query)
-            stats = dict_from_row(cursor.fetchone())
+        with get_db_connection() as conn:
+            catalog = get_catalog(current_data_version(conn))
+            if catalog is not None:
+                stats = catalog.stats()
+            else:
+                cursor = conn.execute(STATS_QUERY)
+                stats = dict_from_row(cursor.fetchone())
             
             return jsonify({
                 'success': True,
                 'data': stats
             })
             
-        finally:
-            conn.close()
-            
+    except DatabaseUnavailable:
+        return jsonify({'error': 'Database connection failed'}), 503
     except Exception as e:
         logger.error(f"Error in get_product_stats: {e}")
         return jsonify({'error': 'Internal server error'}), 500
 
+@app.route('/api/products/suggest', methods=['GET'])
+def get_suggestions():
+    """
+    GET /api/products/suggest - Type-ahead completions
+    Query parameters:
+    - q: Text typed so far (each word of a suggestion is matched as a prefix)
+    - limit: Number of suggestions (default: 8, max: 20)
+    """
+    try:
+        q = request.args.get('q', '')
+        limit = max(min(request.args.get('limit', 8, type=int), 20), 1)
+        
+        with get_db_connection() as conn:
+            version = current_data_version(conn)
+        
+        index = suggest_service.get_index(version)
+        if index is None:
+            return jsonify({
+                'success': False,
+                'error': 'Suggestions unavailable',
+                'message': 'The suggestion index is still being built'
+            }), 503
+        
+        return jsonify({
+            'success': True,
+            'query': q,
+            'data': index.lookup(q, limit)
+        })
+        
+    except DatabaseUnavailable:
+        return jsonify({'error': 'Database connection failed'}), 503
+    except Exception as e:
+        logger.error(f"Error in get_suggestions: {e}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/api/products/facets', methods=['GET'])
+def get_facets():
+    """
+    GET /api/products/facets - Filter counts for the current filter set
+    Query parameters:
+    - limit: Values per facet (default: 50, max: 1000; price ranges are always complete)
+    - histogram_bins: Equal-width price histogram bins (default: 20, max: 100, 0 for none)
+    - the filters accepted by GET /api/products
+    Each facet's counts ignore that facet's own filter, so picking a brand
+    still shows how many products the other brands would match; price
+    ranges and the histogram likewise ignore the price filters.
+    """
+    try:
+        filters = parse_product_filters()
+        limit = max(min(request.args.get('limit', 50, type=int), 1000), 1)
+        histogram_bins = max(min(request.args.get('histogram_bins', 20, type=int), 100), 0)
+        
+        filters_error = validate_product_filters(filters)
+        if filters_error:
+            return jsonify({
+                'success': False,
+                'error': 'Invalid filter',
+                'message': filters_error
+            }), 400
+        
+        with get_db_connection() as conn:
+            version = current_data_version(conn)
+            match = build_match_query(filters['search'])
+            search_ids = None
+            if match:
+                search_ids = [row[0] for row in conn.execute(SEARCH_IDS_QUERY, (match,))]
+        
+        index = facet_service.get_index(version)
+        if index is None:
+            return jsonify({
+                'success': False,
+                'error': 'Facets unavailable',
+                'message': 'The facet index is still being built'
+            }), 503
+        
+        return jsonify({
+            'success': True,
+            'data': index.counts(filters, search_ids, limit, histogram_bins),
+            'filters_applied': filters
+        })
+        
+    except DatabaseUnavailable:
+        return jsonify({'error': 'Database connection failed'}), 503
+    except Exception as e:
+        logger.error(f"Error in get_facets: {e}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/api/pool/stats', methods=['GET'])
+def get_pool_stats():
+    """GET /api/pool/stats - Connection pool hit/miss/wait metrics"""
+    return jsonify({
+        'success': True,
+        'data': db_pool.stats()
+    })
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """GET /metrics - Request, SQL, connection pool and cache metrics (Prometheus text format)"""
+    gauges = {f'db_pool_{name}': value for name, value in db_pool.stats().items()}
+    for prefix, cache in (('response_cache', response_cache), ('fragment_cache', fragment_cache)):
+        gauges.update({f'{prefix}_{name}': value for name, value in cache.stats().items()})
+    return app.response_class(metrics.render(gauges), content_type=PROMETHEUS_CONTENT_TYPE)
+
+@app.route('/index.html', methods=['GET'])
+def frontend_index():
+    """Frontend entry point (precompressed variant when available)"""
+    return send_precompressed(FRONTEND_DIR, 'index.html', STATIC_MAX_AGE)
+
+@app.route('/js/<path:filename>', methods=['GET'])
+def frontend_js(filename):
+    """Frontend scripts (precompressed variant when available)"""
+    return send_precompressed(os.path.join(FRONTEND_DIR, 'js'), filename, STATIC_MAX_AGE)
+
+@app.route('/styles/<path:filename>', methods=['GET'])
+def frontend_styles(filename):
+    """Frontend stylesheets (precompressed variant when available)"""
+    return send_precompressed(os.path.join(FRONTEND_DIR, 'styles'), filename, STATIC_MAX_AGE)
+
 @app.errorhandler(404)
 def not_found(error):
     """Handle 404 errors"""
@@ -382,9 +850,11 @@ if __name__ == '__main__':
         print("Please run 'python init_database.py' first to create the database.")
         exit(1)
     
-    print("🚀 Starting E-commerce REST API...")
-    print("📍 API will be available at: http://localhost:5000")
-    print("📚 API Documentation available at: http://localhost:5000")
+    port = int(os.environ.get('PORT', 5000))
+    print("🚀 Starting E-commerce REST API (development server)...")
+    print(f"📍 API will be available at: http://localhost:{port}")
+    print(f"📚 API Documentation available at: http://localhost:{port}")
+    print("🏭 For production use 'python serve.py' (multiple workers and threads)")
     print("🔧 Press Ctrl+C to stop the server")
     
-    app.run(debug=True, host='0.0.0.0', port=5000) 
\ No newline at end of file
+    app.run(debug=True, host='0.0.0.0', port=port) 
\ No newline at end of file
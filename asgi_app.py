@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+Async API Server
+Serves the Flask application on asyncio (ASGI). Connections are handled by
+the event loop, so slow clients and idle keep-alive connections cost a
+coroutine instead of a thread; only the request handler itself (SQLite
+queries, catalog lookups, JSON encoding) runs on a bounded thread pool sized
+to the connection pool. When every thread is busy and the wait queue is
+full, new requests get 503 with Retry-After instead of queuing without
+limit. Routes, caching and compression are exactly those of app.py.
+
+Runs under uvicorn when it is installed (pip install uvicorn), otherwise on
+a small built-in HTTP/1.1 server:
+
+    python asgi_app.py [--host 0.0.0.0] [--port 8000] [--server auto|uvicorn|builtin]
+    uvicorn asgi_app:application
+"""
+
+import argparse
+import asyncio
+import contextvars
+import io
+import logging
+import os
+import socket
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import unquote
+
+try:
+    import uvicorn
+except ImportError:  # optional dependency
+    uvicorn = None
+
+from app import DATABASE, DB_POOL_SIZE, app as flask_app, db_pool
+from serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+# Handler threads default to the connection pool size, so a thread never
+# waits for a connection; ASYNC_QUEUE_SIZE more requests may wait for a thread
+ASYNC_THREADS = int(os.environ.get('ASYNC_THREADS', DB_POOL_SIZE))
+ASYNC_QUEUE_SIZE = int(os.environ.get('ASYNC_QUEUE_SIZE', 64))
+ASYNC_MAX_BODY = int(os.environ.get('ASYNC_MAX_BODY', 1024 * 1024))
+KEEPALIVE_TIMEOUT = float(os.environ.get('KEEPALIVE_TIMEOUT', 5.0))
+MAX_HEADER_SIZE = 64 * 1024
+
+class ExecutorSaturated(Exception):
+    """Raised when the handler threads and their wait queue are all taken"""
+
+class BoundedExecutor:
+    """
+    Thread pool that admits at most max_workers + queue_size requests at a
+    time. Admission is only counted on the event loop thread, so it needs
+    no lock.
+    """
+
+    def __init__(self, max_workers, queue_size):
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix='async-api')
+        self.max_workers = max_workers
+        self.limit = max_workers + queue_size
+        self.in_flight = 0
+        self.rejected = 0
+
+    async def run(self, func, *args, admit=True):
+        """
+        Run func(*args) on the pool. admit=False skips the admission check,
+        for follow-up work of a request that was already admitted.
+        """
+        if admit and self.in_flight >= self.limit:
+            self.rejected += 1
+            raise ExecutorSaturated()
+        self.in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self.in_flight -= 1
+
+    def stats(self):
+        return {
+            'threads': self.max_workers,
+            'limit': self.limit,
+            'in_flight': self.in_flight,
+            'rejected': self.rejected
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+def wsgi_environ(scope, body):
+    """WSGI environ for an ASGI HTTP request scope"""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'REMOTE_ADDR': client[0],
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        key = name.decode('latin-1').upper().replace('-', '_')
+        if key not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            key = f'HTTP_{key}'
+        value = value.decode('latin-1')
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+def call_wsgi(wsgi_app, environ):
+    """
+    Run a WSGI request to completion on the calling thread. Returns
+    (status, headers, body, None), or (status, headers, None, iterable) for
+    a streamed response (no Content-Length), whose chunks the caller pulls.
+    """
+    started = []
+
+    def start_response(status, headers, exc_info=None):
+        started[:] = [status, headers]
+
+    result = wsgi_app(environ, start_response)
+    status, headers = started
+    if not any(name.lower() == 'content-length' for name, _ in headers):
+        return status, headers, None, result
+    try:
+        return status, headers, b''.join(result), None
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+
+class AsyncAPI:
+    """ASGI application running a WSGI app's requests on a BoundedExecutor"""
+
+    def __init__(self, wsgi_app, executor):
+        self.wsgi_app = wsgi_app
+        self.executor = executor
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+
+        body = await self._read_body(receive)
+        if body is None:
+            await self._send_error(send, 413, 'Request too large',
+                                   f'Request bodies are limited to {ASYNC_MAX_BODY} bytes')
+            return
+
+        # Every step of the request runs in this one context: a streamed
+        # body's chunks are produced on whichever thread is free, and
+        # Flask's request context (context variables) must be pushed and
+        # popped in the same context
+        context = contextvars.copy_context()
+        try:
+            status, headers, content, stream = await self.executor.run(
+                context.run, call_wsgi, self.wsgi_app, wsgi_environ(scope, body)
+            )
+        except ExecutorSaturated:
+            await self._send_error(send, 503, 'Server busy',
+                                   'Too many requests in progress, retry shortly',
+                                   [(b'retry-after', b'1')])
+            return
+
+        await send({
+            'type': 'http.response.start',
+            'status': int(status.split(' ', 1)[0]),
+            'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+        })
+        if stream is None:
+            await send({'type': 'http.response.body', 'body': content})
+            return
+
+        # Streamed responses (the export) produce each chunk on the pool
+        iterator = iter(stream)
+        try:
+            while True:
+                chunk = await self.executor.run(context.run, next, iterator, None, admit=False)
+                if chunk is None:
+                    break
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            if hasattr(stream, 'close'):
+                await self.executor.run(context.run, stream.close, admit=False)
+
+    async def _read_body(self, receive):
+        """Request body, or None if it exceeds ASYNC_MAX_BODY"""
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                break
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if size > ASYNC_MAX_BODY:
+                return None
+            chunks.append(chunk)
+            if not message.get('more_body'):
+                break
+        return b''.join(chunks)
+
+    async def _send_error(self, send, status, error, message, headers=()):
+        body = dumps({'success': False, 'error': error, 'message': message})
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(b'content-type', b'application/json'),
+                        (b'content-length', str(len(body)).encode())] + list(headers)
+        })
+        await send({'type': 'http.response.body', 'body': body})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await asyncio.to_thread(self.close)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def close(self):
+        """Wait for running handlers, then close pooled connections"""
+        self.executor.shutdown()
+        db_pool.close_all()
+
+application = AsyncAPI(flask_app, BoundedExecutor(ASYNC_THREADS, ASYNC_QUEUE_SIZE))
+
+async def _serve_request(app, reader, writer):
+    """Serve one HTTP/1.1 request for the built-in server; returns whether to keep the connection"""
+    try:
+        head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), KEEPALIVE_TIMEOUT)
+    except (asyncio.IncompleteReadError, asyncio.TimeoutError):
+        return False
+    lines = head[:-4].decode('latin-1').split('\r\n')
+    try:
+        method, target, version = lines[0].split(' ')
+        http_version = version.split('/', 1)[1]
+        headers = []
+        for line in lines[1:]:
+            name, _, value = line.partition(':')
+            headers.append((name.strip().lower().encode('latin-1'), value.strip().encode('latin-1')))
+        header_map = dict(headers)
+        length = int(header_map.get(b'content-length', b'0'))
+    except (ValueError, IndexError):
+        writer.write(b'HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\nConnection: close\r\n\r\n')
+        return False
+    if b'transfer-encoding' in header_map:
+        writer.write(b'HTTP/1.1 501 Not Implemented\r\nContent-Length: 0\r\nConnection: close\r\n\r\n')
+        return False
+    if length > ASYNC_MAX_BODY:
+        writer.write(b'HTTP/1.1 413 Payload Too Large\r\nContent-Length: 0\r\nConnection: close\r\n\r\n')
+        return False
+    body = await reader.readexactly(length) if length else b''
+
+    connection = header_map.get(b'connection', b'').lower()
+    keep_alive = connection != b'close' if http_version == '1.1' else connection == b'keep-alive'
+    path, _, query = target.partition('?')
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': http_version,
+        'method': method,
+        'scheme': 'http',
+        'path': unquote(path),
+        'raw_path': path.encode('latin-1'),
+        'query_string': query.encode('latin-1'),
+        'root_path': '',
+        'headers': headers,
+        'server': writer.get_extra_info('sockname')[:2],
+        'client': (writer.get_extra_info('peername') or ('', 0))[:2],
+    }
+
+    request_sent = False
+    response = {}
+
+    async def receive():
+        nonlocal request_sent
+        if request_sent:
+            return {'type': 'http.disconnect'}
+        request_sent = True
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+
+    async def send(message):
+        nonlocal keep_alive
+        if message['type'] == 'http.response.start':
+            status = message['status']
+            out_headers = list(message.get('headers', []))
+            names = {name.lower() for name, _ in out_headers}
+            has_body = method != 'HEAD' and status not in (204, 304)
+            # Without a length the body is chunked (HTTP/1.1) or ends with the connection
+            response['chunked'] = has_body and b'content-length' not in names and http_version == '1.1'
+            if has_body and b'content-length' not in names and not response['chunked']:
+                keep_alive = False
+            if response['chunked']:
+                out_headers.append((b'transfer-encoding', b'chunked'))
+            if not keep_alive:
+                out_headers.append((b'connection', b'close'))
+            try:
+                phrase = HTTPStatus(status).phrase
+            except ValueError:
+                phrase = ''
+            lines = [f'HTTP/1.1 {status} {phrase}'.encode('latin-1')]
+            lines += [name + b': ' + value for name, value in out_headers]
+            writer.write(b'\r\n'.join(lines) + b'\r\n\r\n')
+        elif message['type'] == 'http.response.body':
+            data = message.get('body', b'')
+            if response['chunked']:
+                if data:
+                    writer.write(b'%x\r\n%s\r\n' % (len(data), data))
+                if not message.get('more_body'):
+                    writer.write(b'0\r\n\r\n')
+            elif method != 'HEAD':
+                writer.write(data)
+            # Waits while the client is slow to read, without holding a thread
+            await writer.drain()
+
+    await app(scope, receive, send)
+    return keep_alive
+
+async def start_builtin_server(app, host=None, port=None, sock=None):
+    """
+    Start the minimal HTTP/1.1 server (keep-alive, chunked responses) used
+    without uvicorn, on host:port or on an already bound listening socket
+    """
+
+    async def handle(reader, writer):
+        # asyncio only disables Nagle for sockets created with IPPROTO_TCP,
+        # not for connections accepted on a socket bound elsewhere (serve.py)
+        conn = writer.get_extra_info('socket')
+        if conn is not None and conn.family in (socket.AF_INET, socket.AF_INET6):
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        try:
+            while await _serve_request(app, reader, writer):
+                pass
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            pass
+        except Exception as e:
+            logger.error(f"Error serving connection: {e}")
+        finally:
+            writer.close()
+
+    if sock is not None:
+        return await asyncio.start_server(handle, sock=sock, limit=MAX_HEADER_SIZE)
+    return await asyncio.start_server(handle, host, port, limit=MAX_HEADER_SIZE, backlog=1024)
+
+async def serve_builtin(app, host, port):
+    server = await start_builtin_server(app, host, port)
+    async with server:
+        await server.serve_forever()
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve the E-commerce REST API on asyncio')
+    parser.add_argument('--host', default='0.0.0.0', help='interface to bind')
+    parser.add_argument('--port', type=int, default=8000, help='port to listen on')
+    parser.add_argument('--server', choices=('auto', 'uvicorn', 'builtin'), default='auto',
+                        help='uvicorn if installed (auto), or the built-in HTTP/1.1 server')
+    args = parser.parse_args()
+
+    if not os.path.exists(DATABASE):
+        print(f"❌ Database file '{DATABASE}' not found!")
+        print("Please run 'python init_database.py' first to create the database.")
+        return 1
+    if args.server == 'uvicorn' and uvicorn is None:
+        print("❌ uvicorn is not installed (pip install uvicorn)")
+        return 1
+
+    use_uvicorn = uvicorn is not None and args.server != 'builtin'
+    print(f"🚀 Starting E-commerce REST API (async, {'uvicorn' if use_uvicorn else 'built-in server'})...")
+    print(f"📍 API will be available at: http://localhost:{args.port}")
+    print(f"🔧 {ASYNC_THREADS} handler threads, {ASYNC_QUEUE_SIZE} queued requests before 503")
+
+    if use_uvicorn:
+        uvicorn.run(application, host=args.host, port=args.port, lifespan='on')
+        return 0
+    try:
+        asyncio.run(serve_builtin(application, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        application.close()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
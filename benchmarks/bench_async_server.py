@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Server Load Test
+Starts the API under each server in turn - the development server exactly
+as `python app.py` runs it (debug mode), the threaded Flask server without
+debug (app.run(threaded=True)), the asyncio server (asgi_app.py) and the
+production pre-fork server (serve.py) - and drives each with the same
+HTTP load: a mix of listing, detail, categories, brands and stats
+requests from a fixed number of concurrent clients, optionally alongside
+slow clients that trickle their request headers. Reports throughput,
+latency percentiles (including the connection setup when the server closed
+the previous one), non-200 responses and the peak thread count over the
+server's processes.
+
+Usage: python benchmarks/bench_async_server.py [--db ecommerce.db] [--duration 5] [--slow-clients 200]
+       [--servers dev,threaded,async,serve] [--workers 2] [--threads 8]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HOST = '127.0.0.1'
+
+PATHS = [
+    '/api/products?limit=20',
+    '/api/products?category=Jeans&limit=20',
+    '/api/products?department=Women&sort=price_asc&limit=20',
+    '/api/products/categories',
+    '/api/products/brands',
+    '/api/products/stats',
+]
+DETAIL_SHARE = 0.4  # share of requests that are /api/products/<id>
+
+# name -> (concurrent clients, slow clients)
+SCENARIOS = {
+    '16 clients': (16, 0),
+    '64 clients': (64, 0),
+    '64 clients + slow clients': (64, None),
+}
+
+SERVERS = {
+    'dev': [sys.executable, os.path.join(ROOT, 'app.py')],
+    'threaded': [sys.executable, '-c',
+                 "import logging, sys, app; logging.getLogger('werkzeug').setLevel(logging.WARNING); "
+                 "app.app.run(host=sys.argv[1], port=int(sys.argv[2]), threaded=True)", '{host}', '{port}'],
+    'async': [sys.executable, os.path.join(ROOT, 'asgi_app.py'), '--host', '{host}', '--port', '{port}'],
+    'serve': [sys.executable, os.path.join(ROOT, 'serve.py'), '--host', '{host}', '--port', '{port}',
+              '--workers', '{workers}', '--threads', '{threads}'],
+}
+
+def free_port():
+    with socket.socket() as s:
+        s.bind((HOST, 0))
+        return s.getsockname()[1]
+
+def start_server(name, db, port, workers, threads):
+    command = [part.format(host=HOST, port=port, workers=workers, threads=threads) for part in SERVERS[name]]
+    env = dict(os.environ, DATABASE=os.path.abspath(db), PYTHONPATH=ROOT, PORT=str(port))
+    # A session of its own, so stopping it also stops the reloader's child
+    process = subprocess.Popen(command, cwd=ROOT, env=env, start_new_session=True,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            status = asyncio.run(probe(port))
+            if status == 200:
+                return process
+        except OSError:
+            time.sleep(0.2)
+    os.killpg(process.pid, signal.SIGKILL)
+    raise RuntimeError(f"{name} server did not start")
+
+async def probe(port):
+    reader, writer = await asyncio.open_connection(HOST, port)
+    try:
+        status, _ = await request(reader, writer, '/api/products/stats')
+        return status
+    finally:
+        writer.close()
+
+async def request(reader, writer, path):
+    """One GET; returns (status code, whether the server keeps the connection open)"""
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: {HOST}\r\n\r\n".encode())
+    head = await reader.readuntil(b'\r\n\r\n')
+    status = int(head[9:12])
+    headers = {}
+    for line in head.decode('latin-1').split('\r\n')[1:]:
+        name, _, value = line.partition(':')
+        headers[name.strip().lower()] = value.strip()
+    if 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    elif headers.get('transfer-encoding') == 'chunked':
+        while True:
+            size = int((await reader.readline()).strip(), 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    return status, headers.get('connection', '').lower() != 'close'
+
+async def client(port, deadline, max_id, latencies, statuses, rng):
+    reader = writer = None
+    while time.perf_counter() < deadline:
+        if rng.random() < DETAIL_SHARE:
+            path = f'/api/products/{rng.randint(1, max_id)}'
+        else:
+            path = rng.choice(PATHS)
+        try:
+            start = time.perf_counter()
+            if writer is None:
+                reader, writer = await asyncio.open_connection(HOST, port)
+            status, keep_alive = await request(reader, writer, path)
+            latencies.append(time.perf_counter() - start)
+            statuses[status] += 1
+            if not keep_alive:
+                # The Werkzeug server closes the connection after every response
+                writer.close()
+                reader = writer = None
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            statuses['error'] += 1
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+    if writer is not None:
+        writer.close()
+
+async def slow_client(port, deadline):
+    """Sends a header line every half second; reconnects if the server drops it"""
+    while time.perf_counter() < deadline:
+        try:
+            reader, writer = await asyncio.open_connection(HOST, port)
+            writer.write(b"GET /api/products/stats HTTP/1.1\r\nHost: bench\r\n")
+            while time.perf_counter() < deadline:
+                await asyncio.sleep(0.5)
+                writer.write(b"X-Slow: 1\r\n")
+                await writer.drain()
+            writer.close()
+        except OSError:
+            await asyncio.sleep(0.1)
+
+def thread_count(pid):
+    """Threads of a process and all its descendants (reloader, workers)"""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            threads = next(int(line.split()[1]) for line in f if line.startswith('Threads:'))
+        with open(f'/proc/{pid}/task/{pid}/children') as f:
+            children = [int(child) for child in f.read().split()]
+    except (OSError, StopIteration):
+        return 0
+    return threads + sum(thread_count(child) for child in children)
+
+async def run_scenario(process, port, clients, slow_clients, duration, max_id):
+    latencies = []
+    statuses = Counter()
+    deadline = time.perf_counter() + duration
+    tasks = [asyncio.create_task(slow_client(port, deadline)) for _ in range(slow_clients)]
+    # Let the slow clients connect before measuring
+    await asyncio.sleep(0.5 if slow_clients else 0)
+    start = time.perf_counter()
+    tasks += [asyncio.create_task(client(port, deadline, max_id, latencies, statuses, random.Random(i)))
+              for i in range(clients)]
+    peak_threads = 0
+    while time.perf_counter() < deadline:
+        peak_threads = max(peak_threads, thread_count(process.pid))
+        await asyncio.sleep(0.25)
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+
+    def percentile(p):
+        return latencies[min(int(len(latencies) * p), len(latencies) - 1)] * 1000 if latencies else 0
+
+    return {
+        'rps': len(latencies) / elapsed,
+        'p50': percentile(0.50),
+        'p95': percentile(0.95),
+        'p99': percentile(0.99),
+        'non_200': sum(count for status, count in statuses.items() if status != 200),
+        'threads': peak_threads,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--db', default=os.path.join(ROOT, 'ecommerce.db'), help='SQLite database path')
+    parser.add_argument('--duration', type=float, default=5.0, help='seconds per scenario')
+    parser.add_argument('--slow-clients', type=int, default=200, help='slow clients in the last scenario')
+    parser.add_argument('--max-id', type=int, default=29000, help='highest product id to request')
+    parser.add_argument('--servers', default=','.join(SERVERS), help='comma-separated servers to test')
+    parser.add_argument('--workers', type=int, default=2, help='serve.py worker processes')
+    parser.add_argument('--threads', type=int, default=8, help='serve.py threads per worker')
+    args = parser.parse_args()
+    servers = args.servers.split(',')
+    if any(name not in SERVERS for name in servers):
+        parser.error(f"--servers must be a comma-separated list of: {', '.join(SERVERS)}")
+
+    if not os.path.exists(args.db):
+        print(f"❌ Database not found: {args.db} (run init_database.py first)")
+        return 1
+
+    print(f"{'server':<10}{'scenario':<28}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'non-200':>9}{'threads':>9}")
+    for name in servers:
+        port = free_port()
+        process = start_server(name, args.db, port, args.workers, args.threads)
+        try:
+            for scenario, (clients, slow_clients) in SCENARIOS.items():
+                if slow_clients is None:
+                    slow_clients = args.slow_clients
+                result = asyncio.run(run_scenario(process, port, clients, slow_clients, args.duration, args.max_id))
+                print(f"{name:<10}{scenario:<28}{result['rps']:>9.0f}{result['p50']:>9.1f}{result['p95']:>9.1f}"
+                      f"{result['p99']:>9.1f}{result['non_200']:>9}{result['threads']:>9}")
+        finally:
+            os.killpg(process.pid, signal.SIGTERM)
+            process.wait()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Catalog Engine Benchmark
+Times listing pages, counts and aggregates on SQLite (the queries app.py
+runs) against the in-memory ColumnarCatalog (CATALOG_ENGINE=numpy).
+
+Usage: python benchmarks/bench_catalog_engine.py [--db ecommerce.db] [--repeat 200]
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import time
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from catalog_engine import ColumnarCatalog
+from queries import CATEGORIES_QUERY, STATS_QUERY, product_count_query, product_list_query
+
+# name -> (filters, sort, offset)
+SCENARIOS = {
+    'first page': ({}, 'id', 0),
+    'deep page (offset 20000)': ({}, 'id', 20000),
+    'category': ({'category': 'Jeans'}, 'id', 0),
+    'brand + department': ({'brand': 'Calvin Klein', 'department': 'Men'}, 'id', 0),
+    'price range, price_asc': ({'min_price': 50.0, 'max_price': 100.0}, 'price_asc', 0),
+    'bucket + category, price_desc': ({'price_range': '200+', 'category': 'Jeans'}, 'price_desc', 0),
+}
+PAGE_SIZE = 100
+
+def sqlite_listing(conn, filters, sort, offset):
+    sql, params = product_list_query(filters, PAGE_SIZE + 1, offset, sort=sort)
+    rows = conn.execute(sql, params).fetchall()
+    sql, params = product_count_query(filters)
+    total = conn.execute(sql, params).fetchone()[0]
+    return len(rows), total
+
+def catalog_listing(catalog, filters, sort, offset):
+    _, rows = catalog.query(filters, PAGE_SIZE + 1, offset, sort=sort)
+    return len(rows), catalog.count(filters)
+
+def measure(func, repeat):
+    return min(timeit.repeat(func, number=repeat, repeat=3)) / repeat * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--db', default=os.path.join(ROOT, 'ecommerce.db'), help='SQLite database path')
+    parser.add_argument('--repeat', type=int, default=200, help='calls per measurement')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"❌ Database not found: {args.db} (run init_database.py first)")
+        return 1
+
+    conn = sqlite3.connect(args.db)
+    conn.row_factory = sqlite3.Row
+
+    start = time.perf_counter()
+    catalog = ColumnarCatalog.from_database(conn)
+    build_ms = (time.perf_counter() - start) * 1000
+    array_bytes = sum(value.nbytes for value in vars(catalog).values() if hasattr(value, 'nbytes'))
+    print(f"Snapshot: {len(catalog):,} products, built in {build_ms:.0f} ms, "
+          f"{array_bytes / 1e6:.1f} MB in top-level arrays")
+    print(f"{PAGE_SIZE}-row page + exact count, {args.repeat} calls per measurement\n")
+
+    print(f"{'scenario':<32}{'sqlite us':>12}{'numpy us':>12}{'speedup':>10}")
+    for name, (filters, sort, offset) in SCENARIOS.items():
+        # Both engines must return the same page size and total
+        assert sqlite_listing(conn, filters, sort, offset) == catalog_listing(catalog, filters, sort, offset)
+        sqlite_us = measure(lambda: sqlite_listing(conn, filters, sort, offset), args.repeat)
+        numpy_us = measure(lambda: catalog_listing(catalog, filters, sort, offset), args.repeat)
+        print(f"{name:<32}{sqlite_us:>12.1f}{numpy_us:>12.1f}{sqlite_us / numpy_us:>9.1f}x")
+
+    for name, query, method in (('categories', CATEGORIES_QUERY, catalog.categories),
+                                ('stats', STATS_QUERY, catalog.stats)):
+        sqlite_us = measure(lambda: conn.execute(query).fetchall(), args.repeat)
+        numpy_us = measure(method, args.repeat)
+        print(f"{name:<32}{sqlite_us:>12.1f}{numpy_us:>12.1f}{sqlite_us / numpy_us:>9.1f}x")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
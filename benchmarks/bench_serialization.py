@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Serialization Microbenchmark
+Times encoding one 100-row product listing page three ways:
+- baseline: dict_from_row per row + Flask's stdlib jsonify (the original path)
+- dumps: one dict per row encoded by serialization.dumps (orjson if installed)
+- fragments: warm FragmentCache, page stitched from pre-encoded rows
+
+Usage: python benchmarks/bench_serialization.py [--rows 100] [--repeat 2000]
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, jsonify
+from flask.json.provider import DefaultJSONProvider
+
+from api_cache import FragmentCache
+from queries import PRODUCT_FIELDS
+from serialization import ENCODER, FastJSONProvider, dumps, encode_with_array
+
+def build_rows(count):
+    """Synthetic listing rows with the API's product columns, as sqlite3.Row"""
+    conn = sqlite3.connect(':memory:')
+    conn.row_factory = sqlite3.Row
+    names = list(PRODUCT_FIELDS)
+    conn.execute(f"CREATE TABLE page ({', '.join(names)})")
+    rng = random.Random(42)
+    conn.executemany(
+        f"INSERT INTO page VALUES ({', '.join('?' * len(names))})",
+        [
+            (i, f"Brand {i % 50} Jeans item {i}", f"Brand {i % 50}", 'Jeans', 'Women',
+             round(rng.uniform(5, 300), 2), round(rng.uniform(2, 150), 2), f"SKU{i:08d}",
+             f"DC {i % 10}", 35.0 + i % 10, -90.0 - i % 10)
+            for i in range(1, count + 1)
+        ]
+    )
+    cursor = conn.execute("SELECT * FROM page ORDER BY id")
+    return cursor.fetchall(), [column[0] for column in cursor.description]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100, help='rows per page')
+    parser.add_argument('--repeat', type=int, default=2000, help='pages encoded per measurement')
+    args = parser.parse_args()
+
+    rows, names = build_rows(args.rows)
+    meta = {'success': True, 'pagination': {'page': 1, 'limit': args.rows, 'has_next': True}}
+
+    baseline_app = Flask('baseline')
+    baseline_app.json = DefaultJSONProvider(baseline_app)
+    fast_app = Flask('fast')
+    fast_app.json = FastJSONProvider(fast_app)
+
+    cache = FragmentCache()
+    cache.encode_rows(1, names, rows, 0)
+
+    def baseline():
+        with baseline_app.app_context():
+            return jsonify({**meta, 'data': [dict(zip(row.keys(), row)) for row in rows]}).get_data()
+
+    def fast_dumps():
+        with fast_app.app_context():
+            return jsonify({**meta, 'data': [dict(zip(names, row)) for row in rows]}).get_data()
+
+    def fragments():
+        return encode_with_array(meta, 'data', cache.encode_rows(1, names, rows, 0))
+
+    print(f"Encoder: {ENCODER}, {args.rows} rows per page, {args.repeat} pages per run")
+    results = {}
+    for label, func in (('baseline', baseline), ('dumps', fast_dumps), ('fragments', fragments)):
+        best = min(timeit.repeat(func, number=args.repeat, repeat=5))
+        results[label] = best / args.repeat * 1e6
+        print(f"  {label:<10} {results[label]:8.1f} us/page  "
+              f"({results['baseline'] / results[label]:.1f}x baseline)  {len(func())} bytes")
+
+    # Every path must produce the same JSON document
+    assert dumps(baseline_app.json.loads(baseline())) == dumps(baseline_app.json.loads(fragments()))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Storage Profile Benchmark
+Measures read throughput of the API's hot queries (listings, counts, keyset
+and deep OFFSET pages, lookups, search, aggregates) under each connection
+profile:
+- default: rollback journal, plain connection (2 MB cache, no mmap)
+- wal: WAL journal, plain connection
+- wal+tuned: WAL plus the serving PRAGMAs (mmap, larger cache, temp_store=memory)
+- readonly: as wal+tuned, opened with mode=ro
+- immutable: as wal+tuned, opened with mode=ro&immutable=1
+
+Every profile is run by reader threads alone, then alongside a writer that
+keeps committing small transactions, like a reload in progress. Immutable
+connections are skipped there, since they assume nothing writes the file.
+The runs use copies of the database in a temporary directory.
+
+Usage: python benchmarks/bench_storage_profile.py [--db ecommerce.db | --products 100000]
+       [--threads 4] [--duration 5]
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import storage
+from queries import hot_queries, product_list_query
+
+# name -> (database copy, open mode or None for a plain path, serving PRAGMAs)
+PROFILES = {
+    'default': ('delete', None, False),
+    'wal': ('wal', None, False),
+    'wal+tuned': ('wal', 'readwrite', True),
+    'readonly': ('wal', 'readonly', True),
+    'immutable': ('wal', 'immutable', True),
+}
+
+def make_copies(source, directory):
+    """Rollback-journal and WAL copies of `source`; returns {copy name: path}"""
+    copies = {}
+    src = sqlite3.connect(source)
+    try:
+        for name, journal_mode in (('delete', 'DELETE'), ('wal', 'WAL')):
+            path = os.path.join(directory, f'{name}.db')
+            dst = sqlite3.connect(path)
+            src.backup(dst)
+            dst.execute(f"PRAGMA journal_mode = {journal_mode}")
+            dst.execute("CREATE TABLE IF NOT EXISTS bench_writes (id INTEGER PRIMARY KEY, payload TEXT)")
+            dst.commit()
+            if journal_mode == 'WAL':
+                dst.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            dst.close()
+            copies[name] = path
+    finally:
+        src.close()
+    return copies
+
+def workload(path):
+    """(sql, params) mix: the hot API queries plus deep OFFSET pages"""
+    conn = sqlite3.connect(path)
+    try:
+        products = conn.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+    finally:
+        conn.close()
+    queries = [(sql, params) for _, sql, params, _ in hot_queries()]
+    for fraction in (0.5, 0.9):
+        queries.append(product_list_query({}, 20, int(products * fraction)))
+        queries.append(product_list_query({'department': 'Women'}, 20, int(products * fraction / 2)))
+    return queries
+
+def connect(path, mode, tuned):
+    if mode is None:
+        conn = sqlite3.connect(path, check_same_thread=False)
+    else:
+        conn = sqlite3.connect(storage.database_uri(path, mode), uri=True, check_same_thread=False)
+    if tuned:
+        storage.apply_pragmas(conn, storage.serving_pragmas(path))
+    return conn
+
+def run(path, mode, tuned, queries, threads, duration, with_writer):
+    deadline = time.perf_counter() + duration
+    latencies = []
+    lock = threading.Lock()
+    writes = [0]
+
+    def reader(seed):
+        rng = random.Random(seed)
+        conn = connect(path, mode, tuned)
+        local = []
+        try:
+            while time.perf_counter() < deadline:
+                sql, params = rng.choice(queries)
+                start = time.perf_counter()
+                conn.execute(sql, params).fetchall()
+                local.append(time.perf_counter() - start)
+        finally:
+            conn.close()
+        with lock:
+            latencies.extend(local)
+
+    def writer():
+        conn = sqlite3.connect(path, isolation_level=None)
+        try:
+            while time.perf_counter() < deadline:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany("INSERT INTO bench_writes (payload) VALUES (?)",
+                                 (('x' * 200,) for _ in range(2000)))
+                conn.execute("COMMIT")
+                writes[0] += 1
+                time.sleep(0.01)
+        finally:
+            conn.close()
+
+    workers = [threading.Thread(target=reader, args=(seed,)) for seed in range(threads)]
+    if with_writer:
+        workers.append(threading.Thread(target=writer))
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+
+    def percentile(p):
+        return latencies[min(int(len(latencies) * p), len(latencies) - 1)] * 1000 if latencies else 0
+
+    return {
+        'qps': len(latencies) / elapsed,
+        'p50': percentile(0.50),
+        'p99': percentile(0.99),
+        'writes': writes[0] / elapsed,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--db', default=os.path.join(ROOT, 'ecommerce.db'), help='SQLite database path')
+    parser.add_argument('--products', type=int, help='use a synthetic catalog of this size instead of --db')
+    parser.add_argument('--threads', type=int, default=4, help='reader threads')
+    parser.add_argument('--duration', type=float, default=5.0, help='seconds per run')
+    args = parser.parse_args()
+
+    db = args.db
+    if args.products:
+        from synthetic_data import ensure_database
+        db = ensure_database(args.products)
+    if not os.path.exists(db):
+        print(f"❌ Database not found: {db} (run init_database.py first)")
+        return 1
+
+    with tempfile.TemporaryDirectory() as directory:
+        copies = make_copies(db, directory)
+        queries = workload(copies['wal'])
+        print(f"{os.path.getsize(db) / 2**20:.0f} MB database, {len(queries)} queries, {args.threads} reader threads")
+        print(f"{'profile':<12}{'writer':<8}{'queries/s':>11}{'p50 ms':>9}{'p99 ms':>9}{'commits/s':>11}")
+        for name, (copy, mode, tuned) in PROFILES.items():
+            for with_writer in (False, True):
+                if with_writer and mode == 'immutable':
+                    continue
+                result = run(copies[copy], mode, tuned, queries, args.threads, args.duration, with_writer)
+                print(f"{name:<12}{'yes' if with_writer else 'no':<8}{result['qps']:>11.0f}{result['p50']:>9.2f}"
+                      f"{result['p99']:>9.2f}{result['writes']:>11.1f}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+API Load Test Suite
+Runs a weighted scenario mix (first and deep pages, filters, search, product
+detail and batch lookups, facets and the aggregate endpoints) against a
+synthetic catalog of the requested size, both in-process through the Flask
+test client and over HTTP with concurrent keep-alive clients. Reports
+requests/second and p50/p95/p99 latency per scenario, saves the results as
+JSON and compares them with a stored baseline (exit status 1 on a regression).
+
+The database is generated once per size and seed with synthetic_data.py;
+the HTTP run starts serve.py unless --url points at a running server.
+
+Usage: python benchmarks/load_test.py [--products 10000] [--mode both] [--duration 10]
+       [--concurrency 16] [--baseline benchmarks/baseline.json] [--save-baseline]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import signal
+import sqlite3
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from urllib.parse import quote as url_quote, urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_async_server import free_port, request, start_server
+from synthetic_data import STYLES, ensure_database
+
+DEFAULT_BASELINE = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+PAGE_SIZE = 20
+
+class Workload:
+    """Request paths for each scenario, drawn from the values in the database"""
+
+    def __init__(self, db_path):
+        conn = sqlite3.connect(db_path)
+        try:
+            self.products, self.max_id = conn.execute("SELECT COUNT(*), MAX(id) FROM products").fetchone()
+            self.categories = [row[0] for row in conn.execute(
+                "SELECT category FROM category_stats WHERE category IS NOT NULL")]
+            self.brands = [row[0] for row in conn.execute(
+                "SELECT brand FROM brand_stats WHERE brand IS NOT NULL ORDER BY product_count DESC LIMIT 50")]
+        finally:
+            conn.close()
+        self.pages = max(self.products // PAGE_SIZE, 1)
+
+    def scenarios(self):
+        """name -> (weight, path(rng))"""
+        return {
+            'first_page': (8, lambda rng: f'/api/products?limit={PAGE_SIZE}'),
+            'deep_page': (10, lambda rng: f'/api/products?limit={PAGE_SIZE}'
+                                          f'&page={rng.randint(self.pages // 2 + 1, self.pages)}'),
+            'filter_category': (10, lambda rng: f'/api/products?limit={PAGE_SIZE}'
+                                                f'&category={quote(rng.choice(self.categories))}'),
+            'filter_brand_department': (8, lambda rng: f'/api/products?limit={PAGE_SIZE}'
+                                                       f'&brand={quote(rng.choice(self.brands))}'
+                                                       f'&department={rng.choice(["Men", "Women"])}'),
+            'filter_price_sorted': (8, lambda rng: self._price_path(rng)),
+            'search': (8, lambda rng: f'/api/products?limit={PAGE_SIZE}&search={rng.choice(STYLES).lower()}'),
+            'detail': (25, lambda rng: f'/api/products/{rng.randint(1, self.max_id)}'),
+            'batch': (5, lambda rng: '/api/products/batch?ids='
+                                     + ','.join(str(rng.randint(1, self.max_id)) for _ in range(20))),
+            'facets': (5, lambda rng: f'/api/products/facets?category={quote(rng.choice(self.categories))}'),
+            'categories': (4, lambda rng: '/api/products/categories'),
+            'brands': (4, lambda rng: '/api/products/brands'),
+            'stats': (5, lambda rng: '/api/products/stats'),
+        }
+
+    def _price_path(self, rng):
+        low = rng.choice([0, 10, 25, 50, 100])
+        return (f'/api/products?limit={PAGE_SIZE}&min_price={low}&max_price={low * 2 + 50}'
+                f'&sort={rng.choice(["price_asc", "price_desc"])}')
+
+    def picker(self, seed):
+        """Function returning a (scenario, path) drawn from the weighted mix"""
+        rng = random.Random(seed)
+        scenarios = self.scenarios()
+        names = list(scenarios)
+        weights = [scenarios[name][0] for name in names]
+
+        def pick():
+            name = rng.choices(names, weights)[0]
+            return name, scenarios[name][1](rng)
+        return pick
+
+def quote(value):
+    return url_quote(value, safe='')
+
+def summarize(samples, elapsed):
+    """samples: (scenario, seconds, status) tuples -> overall and per-scenario statistics"""
+    by_scenario = defaultdict(list)
+    errors = defaultdict(int)
+    for scenario, seconds, status in samples:
+        by_scenario[scenario].append(seconds)
+        if status != 200:
+            errors[scenario] += 1
+
+    def stats(latencies, error_count):
+        latencies = sorted(latencies)
+
+        def percentile(p):
+            return round(latencies[min(int(len(latencies) * p), len(latencies) - 1)] * 1000, 3)
+
+        return {
+            'requests': len(latencies),
+            'errors': error_count,
+            'rps': round(len(latencies) / elapsed, 1),
+            'p50_ms': percentile(0.50),
+            'p95_ms': percentile(0.95),
+            'p99_ms': percentile(0.99),
+        }
+
+    return {
+        'overall': stats([seconds for _, seconds, _ in samples], sum(errors.values())),
+        'scenarios': {name: stats(latencies, errors[name]) for name, latencies in sorted(by_scenario.items())},
+    }
+
+def run_inprocess(workload, duration, concurrency, warmup=0):
+    """Drive the Flask app through test clients, one per thread"""
+    from app import app
+
+    def drive(seconds):
+        samples = []
+        lock = threading.Lock()
+        deadline = time.perf_counter() + seconds
+
+        def worker(seed):
+            client = app.test_client()
+            pick = workload.picker(seed)
+            local = []
+            while time.perf_counter() < deadline:
+                scenario, path = pick()
+                start = time.perf_counter()
+                response = client.get(path)
+                response.get_data()
+                local.append((scenario, time.perf_counter() - start, response.status_code))
+            with lock:
+                samples.extend(local)
+
+        start = time.perf_counter()
+        threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return samples, time.perf_counter() - start
+
+    # Warm caches and in-memory indexes before measuring
+    drive(warmup)
+    return summarize(*drive(duration))
+
+async def _drive_http(workload, host, port, duration, concurrency):
+    samples = []
+    deadline = time.perf_counter() + duration
+
+    async def client(seed):
+        pick = workload.picker(seed)
+        reader = writer = None
+        while time.perf_counter() < deadline:
+            scenario, path = pick()
+            start = time.perf_counter()
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.open_connection(host, port)
+                status, keep_alive = await request(reader, writer, path)
+            except (OSError, asyncio.IncompleteReadError, ValueError):
+                status, keep_alive = 'error', False
+            samples.append((scenario, time.perf_counter() - start, status))
+            if not keep_alive and writer is not None:
+                writer.close()
+                reader = writer = None
+        if writer is not None:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(seed) for seed in range(concurrency)))
+    return samples, time.perf_counter() - start
+
+async def _run_http(workload, host, port, duration, concurrency, warmup):
+    # Warm every worker's caches and in-memory indexes before measuring
+    await _drive_http(workload, host, port, warmup, concurrency)
+    return summarize(*await _drive_http(workload, host, port, duration, concurrency))
+
+def run_http(workload, db_path, duration, concurrency, warmup=0, url=None, workers=2, threads=8):
+    """Drive a server over HTTP: the one at `url`, or a serve.py started for the run"""
+    if url:
+        parts = urlsplit(url)
+        return asyncio.run(_run_http(workload, parts.hostname, parts.port or 80, duration, concurrency,
+                                     warmup))
+    port = free_port()
+    process = start_server('serve', db_path, port, workers, threads)
+    try:
+        return asyncio.run(_run_http(workload, '127.0.0.1', port, duration, concurrency, warmup))
+    finally:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait()
+
+def compare(results, baseline, tolerance):
+    """Print the change against the baseline; returns the regressed (mode, scenario) pairs"""
+    if baseline['meta'].get('products') != results['meta']['products']:
+        print(f"⚠️  Baseline was recorded with {baseline['meta'].get('products')} products, "
+              f"this run used {results['meta']['products']}")
+    regressions = []
+    print(f"\n{'mode':<11}{'scenario':<26}{'rps':>10}{'Δ rps':>9}{'p95 ms':>10}{'Δ p95':>9}")
+    for mode, summary in results['results'].items():
+        base_summary = baseline['results'].get(mode)
+        if not base_summary:
+            continue
+        rows = [('overall', summary['overall'], base_summary['overall'])]
+        rows += [(name, stats, base_summary['scenarios'][name])
+                 for name, stats in summary['scenarios'].items() if name in base_summary['scenarios']]
+        for name, stats, base in rows:
+            rps_change = stats['rps'] / base['rps'] - 1 if base['rps'] else 0.0
+            p95_change = stats['p95_ms'] / base['p95_ms'] - 1 if base['p95_ms'] else 0.0
+            # Per-scenario rates only restate the mix, so throughput is judged overall
+            regressed = p95_change > tolerance or (name == 'overall' and rps_change < -tolerance)
+            if regressed:
+                regressions.append((mode, name))
+            print(f"{mode:<11}{name:<26}{stats['rps']:>10.1f}{rps_change:>+9.0%}{stats['p95_ms']:>10.2f}"
+                  f"{p95_change:>+9.0%}{'  ❌' if regressed else ''}")
+    return regressions
+
+def print_summary(mode, summary):
+    print(f"\n{mode}: {summary['overall']['rps']:.1f} req/s, p50 {summary['overall']['p50_ms']:.2f} ms, "
+          f"p95 {summary['overall']['p95_ms']:.2f} ms, p99 {summary['overall']['p99_ms']:.2f} ms, "
+          f"{summary['overall']['errors']} errors")
+    print(f"{'scenario':<26}{'requests':>10}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for name, stats in summary['scenarios'].items():
+        print(f"{name:<26}{stats['requests']:>10}{stats['rps']:>10.1f}{stats['p50_ms']:>10.2f}"
+              f"{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}{stats['errors']:>8}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--products', type=int, default=10000, help='synthetic catalog size (10000 to 10000000)')
+    parser.add_argument('--seed', type=int, default=42, help='dataset seed')
+    parser.add_argument('--db', help='use this database instead of a generated one')
+    parser.add_argument('--mode', choices=('inprocess', 'http', 'both'), default='both')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per mode')
+    parser.add_argument('--warmup', type=float, default=2.0, help='unmeasured seconds before each mode')
+    parser.add_argument('--inprocess-concurrency', type=int, default=4, help='test client threads')
+    parser.add_argument('--concurrency', type=int, default=16, help='concurrent HTTP clients')
+    parser.add_argument('--url', help='benchmark a running server (e.g. http://localhost:8000) instead of serve.py')
+    parser.add_argument('--workers', type=int, default=2, help='serve.py worker processes')
+    parser.add_argument('--threads', type=int, default=8, help='serve.py threads per worker')
+    parser.add_argument('--output', help='results JSON path (default: benchmarks/results/<time>.json)')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='baseline JSON to compare with')
+    parser.add_argument('--save-baseline', action='store_true', help='store this run as the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help='relative rps drop or p95 rise counted as a regression')
+    args = parser.parse_args()
+
+    db_path = os.path.abspath(args.db or ensure_database(args.products, seed=args.seed))
+    # app.py reads DATABASE when it is imported (in-process mode)
+    os.environ['DATABASE'] = db_path
+    workload = Workload(db_path)
+    print(f"📦 {db_path}: {workload.products:,} products")
+
+    results = {
+        'meta': {
+            'products': workload.products,
+            'seed': args.seed,
+            'duration': args.duration,
+            'warmup': args.warmup,
+            'inprocess_concurrency': args.inprocess_concurrency,
+            'http_concurrency': args.concurrency,
+            'server': args.url or f'serve.py --workers {args.workers} --threads {args.threads}',
+            'catalog_engine': os.environ.get('CATALOG_ENGINE', 'sqlite'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'recorded_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        },
+        'results': {},
+    }
+    if args.mode in ('inprocess', 'both'):
+        results['results']['inprocess'] = run_inprocess(workload, args.duration, args.inprocess_concurrency,
+                                                        args.warmup)
+        print_summary('inprocess', results['results']['inprocess'])
+    if args.mode in ('http', 'both'):
+        results['results']['http'] = run_http(workload, db_path, args.duration, args.concurrency, args.warmup,
+                                              args.url, args.workers, args.threads)
+        print_summary('http', results['results']['http'])
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{workload.products}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\n💾 Results saved to {output}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"📌 Baseline saved to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print("ℹ️  No baseline to compare with (run with --save-baseline to record one)")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\n❌ {len(regressions)} regressions beyond {args.tolerance:.0%}")
+        return 1
+    print(f"\n✅ No regressions beyond {args.tolerance:.0%}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Worker Memory Measurement
+Forks worker processes the way a pre-forking server does and reports each
+worker's memory after it has served listing and detail lookups, for the
+per-process catalog (CATALOG_ENGINE=numpy, built once in the parent and
+inherited copy-on-write) and the shared mapped snapshot
+(CATALOG_ENGINE=shared), next to a baseline with no catalog. Figures come from /proc/self/smaps_rollup, so this
+runs on Linux only. PSS (proportional set size) charges shared pages to the
+processes sharing them, so the sum of PSS is the real total.
+
+Usage: python benchmarks/measure_worker_rss.py [--db ecommerce.db] [--workers 4] [--requests 2000]
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from catalog_engine import ColumnarCatalog
+from shared_catalog import SharedCatalog
+
+FILTER_SETS = [{}, {'category': 'Jeans'}, {'department': 'Women'}, {'price_range': '50-100'}]
+SORTS = ['id', 'price_asc', 'price_desc']
+PAGE_SIZE = 100
+
+def memory_kb():
+    """Rss/Pss/Shared/Private totals (kB) of the current process"""
+    fields = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return {
+        'rss': fields['Rss'],
+        'pss': fields['Pss'],
+        'shared': fields['Shared_Clean'] + fields['Shared_Dirty'],
+        'private': fields['Private_Clean'] + fields['Private_Dirty'],
+    }
+
+def serve(catalog, requests, seed):
+    """Listing pages across the catalog plus batches of detail lookups (none without a catalog)"""
+    if catalog is None:
+        requests = 0
+    rng = random.Random(seed)
+    max_id = int(catalog.ids[-1]) if catalog is not None and len(catalog) else 0
+    for _ in range(requests):
+        filters = rng.choice(FILTER_SETS)
+        offset = rng.randrange(max(catalog.count(filters) - PAGE_SIZE, 1))
+        catalog.query(filters, PAGE_SIZE, offset, sort=rng.choice(SORTS))
+        catalog.rows_by_id([rng.randint(1, max_id) for _ in range(20)])
+    # A full collection walks every tracked object, as long-running workers eventually do
+    gc.collect()
+
+def run(catalog, workers, requests):
+    """Fork `workers` children sharing `catalog`; returns their memory figures"""
+    children = []
+    for worker in range(workers):
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            serve(catalog, requests, seed=worker)
+            with os.fdopen(write_fd, 'w') as f:
+                json.dump(memory_kb(), f)
+            os._exit(0)
+        os.close(write_fd)
+        children.append((pid, read_fd))
+
+    results = []
+    for pid, read_fd in children:
+        with os.fdopen(read_fd) as f:
+            results.append(json.load(f))
+        os.waitpid(pid, 0)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--db', default=os.path.join(ROOT, 'ecommerce.db'), help='SQLite database path')
+    parser.add_argument('--workers', type=int, default=4, help='worker processes to fork')
+    parser.add_argument('--requests', type=int, default=2000, help='listing + detail requests per worker')
+    args = parser.parse_args()
+
+    if not os.path.exists('/proc/self/smaps_rollup'):
+        print("❌ /proc/self/smaps_rollup not available (Linux only)")
+        return 1
+    if not os.path.exists(args.db):
+        print(f"❌ Database not found: {args.db} (run init_database.py first)")
+        return 1
+
+    conn = sqlite3.connect(args.db)
+    conn.row_factory = sqlite3.Row
+    with tempfile.TemporaryDirectory() as directory:
+        # Each engine is measured in its own child so none inherits another's
+        # pages; the baseline forks workers with no catalog at all
+        for engine in ('baseline', 'numpy', 'shared'):
+            read_fd, write_fd = os.pipe()
+            pid = os.fork()
+            if pid == 0:
+                os.close(read_fd)
+                if engine == 'baseline':
+                    catalog = None
+                elif engine == 'numpy':
+                    catalog = ColumnarCatalog.from_database(conn)
+                else:
+                    catalog = SharedCatalog.from_database(conn, directory)
+                parent = memory_kb()
+                results = run(catalog, args.workers, args.requests)
+                with os.fdopen(write_fd, 'w') as f:
+                    json.dump({'parent': parent, 'workers': results}, f)
+                os._exit(0)
+            os.close(write_fd)
+            with os.fdopen(read_fd) as f:
+                measured = json.load(f)
+            os.waitpid(pid, 0)
+
+            workers = measured['workers']
+            average = {key: sum(result[key] for result in workers) / len(workers) / 1024
+                       for key in ('rss', 'pss', 'shared', 'private')}
+            print(f"{engine}: parent RSS after load {measured['parent']['rss'] / 1024:.1f} MB, "
+                  f"{args.workers} workers x {args.requests} requests")
+            print(f"  per worker: RSS {average['rss']:.1f} MB, PSS {average['pss']:.1f} MB, "
+                  f"shared {average['shared']:.1f} MB, private {average['private']:.1f} MB")
+            print(f"  total worker PSS: {sum(result['pss'] for result in workers) / 1024:.1f} MB\n")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
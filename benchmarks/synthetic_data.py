@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Synthetic Dataset Generator
+Writes CSVs shaped like ecommerce-dataset/archive (products, users, orders,
+order_items, inventory_items, distribution_centers) for any catalog size and
+loads them with DatabaseSetup exactly as init_database.py does, so
+benchmarks run against the production schema, indexes and summary tables.
+Output is deterministic for a given size and seed.
+
+Per product there are 0.5 users, 1 order, 2 order items and 1 inventory
+item; brands follow a long-tailed popularity and prices a log-normal.
+
+Usage: python benchmarks/synthetic_data.py --products 100000 [--output benchmarks/data/100000]
+"""
+
+import argparse
+import csv
+import hashlib
+import math
+import os
+import random
+import sys
+import time
+from array import array
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from database_setup import DatabaseSetup
+from storage import remove_database
+
+CATEGORIES = [
+    'Intimates', 'Jeans', 'Tops & Tees', 'Fashion Hoodies & Sweatshirts', 'Sleep & Lounge',
+    'Shorts', 'Swim', 'Sweaters', 'Accessories', 'Active', 'Outerwear & Coats', 'Pants',
+    'Socks', 'Dresses', 'Plus', 'Maternity', 'Suits & Sport Coats', 'Leggings', 'Skirts',
+    'Blazers & Jackets', 'Socks & Hosiery', 'Underwear', 'Pants & Capris', 'Jumpsuits & Rompers',
+    'Clothing Sets', 'Suits',
+]
+NAMED_BRANDS = ['Allegra K', 'Calvin Klein', 'Carhartt', 'Hanes', 'Volcom', 'Nautica', 'Quiksilver',
+                "Levi's", 'Columbia', 'Nike', 'Tommy Hilfiger', 'Dockers']
+STYLES = ['Classic', 'Slim', 'Relaxed', 'Vintage', 'Essential', 'Performance', 'Cotton', 'Wool',
+          'Stretch', 'Logo', 'Striped', 'Fleece', 'Denim', 'Cropped', 'Oversized']
+DISTRIBUTION_CENTERS = [
+    ('Memphis TN', 35.1174, -89.9711), ('Chicago IL', 41.8369, -87.6847),
+    ('Houston TX', 29.7604, -95.3698), ('Los Angeles CA', 34.05, -118.25),
+    ('New Orleans LA', 29.95, -90.0667), ('Port Authority of New York/New Jersey NY/NJ', 40.634, -73.7834),
+    ('Philadelphia PA', 39.95, -75.1667), ('Mobile AL', 30.6944, -88.0431),
+    ('Charleston SC', 32.7833, -79.9333), ('Savannah GA', 32.0167, -81.1167),
+]
+STATUSES = ['Complete', 'Shipped', 'Processing', 'Cancelled', 'Returned']
+COUNTRIES = ['United States', 'China', 'Brasil', 'South Korea', 'France', 'United Kingdom', 'Germany', 'Spain']
+TRAFFIC_SOURCES = ['Search', 'Organic', 'Facebook', 'Email', 'Display']
+
+# Rows generated per product for the other tables
+USERS_PER_PRODUCT = 0.5
+ORDERS_PER_PRODUCT = 1
+ORDER_ITEMS_PER_ORDER = 2
+INVENTORY_ITEMS_PER_PRODUCT = 1
+
+CSV_TABLES = ['products', 'users', 'orders', 'order_items', 'inventory_items', 'distribution_centers']
+
+def _timestamp(rng):
+    return f"2023-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} {rng.randint(0, 23):02d}:00:00"
+
+def _write(path, header, rows):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+def write_csvs(products, directory, seed=42):
+    """Write the dataset CSVs into `directory`; returns {csv path: table name}"""
+    os.makedirs(directory, exist_ok=True)
+    rng = random.Random(seed)
+    brand_count = max(len(NAMED_BRANDS), int(math.sqrt(products) * 4))
+    brands = NAMED_BRANDS + [f'Brand {i}' for i in range(1, brand_count - len(NAMED_BRANDS) + 1)]
+    users = max(1, int(products * USERS_PER_PRODUCT))
+    orders = products * ORDERS_PER_PRODUCT
+    paths = {table: os.path.join(directory, f'{table}.csv') for table in CSV_TABLES}
+
+    _write(paths['distribution_centers'], ['id', 'name', 'latitude', 'longitude'],
+           ((i, name, lat, lon) for i, (name, lat, lon) in enumerate(DISTRIBUTION_CENTERS, 1)))
+
+    # Product attributes are needed again for order and inventory items;
+    # compact arrays keep 10M-product runs in memory
+    categories = array('H')
+    product_brands = array('I')
+    prices = array('d')
+
+    def product_rows():
+        for product_id in range(1, products + 1):
+            category = rng.randrange(len(CATEGORIES))
+            # Long tail: a few brands carry most of the catalog
+            brand = min(int(rng.paretovariate(1.2)) - 1, len(brands) - 1)
+            price = round(min(rng.lognormvariate(3.6, 0.7), 999.0), 2)
+            categories.append(category)
+            product_brands.append(brand)
+            prices.append(price)
+            yield (product_id, round(price * rng.uniform(0.35, 0.6), 2), CATEGORIES[category],
+                   f"{brands[brand]} {rng.choice(STYLES)} {CATEGORIES[category]} {product_id}", brands[brand], price,
+                   rng.choice(['Men', 'Women']), hashlib.md5(str(product_id).encode()).hexdigest().upper(),
+                   rng.randint(1, len(DISTRIBUTION_CENTERS)))
+
+    _write(paths['products'], ['id', 'cost', 'category', 'name', 'brand', 'retail_price', 'department',
+                               'sku', 'distribution_center_id'], product_rows())
+
+    _write(paths['users'], ['id', 'first_name', 'last_name', 'email', 'age', 'gender', 'state',
+                            'street_address', 'postal_code', 'city', 'country', 'latitude', 'longitude',
+                            'traffic_source', 'created_at'],
+           ((i, f'First{i % 997}', f'Last{i % 1009}', f'user{i}@example.com', rng.randint(12, 70),
+             rng.choice('MF'), f'State{i % 50}', f'{i} Main St', f'{10000 + i % 89999}', f'City{i % 500}',
+             rng.choice(COUNTRIES), round(rng.uniform(-60, 60), 4), round(rng.uniform(-180, 180), 4),
+             rng.choice(TRAFFIC_SOURCES), _timestamp(rng))
+            for i in range(1, users + 1)))
+
+    order_users = array('I', (rng.randint(1, users) for _ in range(orders)))
+    order_statuses = array('B', (rng.randrange(len(STATUSES)) for _ in range(orders)))
+    _write(paths['orders'], ['order_id', 'user_id', 'status', 'gender', 'created_at', 'returned_at',
+                             'shipped_at', 'delivered_at', 'num_of_item'],
+           ((i, order_users[i - 1], STATUSES[order_statuses[i - 1]], rng.choice('MF'), _timestamp(rng), '', '', '',
+             ORDER_ITEMS_PER_ORDER)
+            for i in range(1, orders + 1)))
+
+    def order_item_rows():
+        item_id = 0
+        for order_id in range(1, orders + 1):
+            for _ in range(ORDER_ITEMS_PER_ORDER):
+                item_id += 1
+                product_id = rng.randint(1, products)
+                yield (item_id, order_id, order_users[order_id - 1], product_id,
+                       (item_id - 1) % (products * INVENTORY_ITEMS_PER_PRODUCT) + 1,
+                       STATUSES[order_statuses[order_id - 1]], _timestamp(rng), '', '', '', prices[product_id - 1])
+
+    _write(paths['order_items'], ['id', 'order_id', 'user_id', 'product_id', 'inventory_item_id', 'status',
+                                  'created_at', 'shipped_at', 'delivered_at', 'returned_at', 'sale_price'],
+           order_item_rows())
+
+    def inventory_rows():
+        for i in range(products * INVENTORY_ITEMS_PER_PRODUCT):
+            product = i % products
+            yield (i + 1, product + 1, _timestamp(rng), '', round(prices[product] * 0.5, 2),
+                   CATEGORIES[categories[product]], '', brands[product_brands[product]], prices[product],
+                   '', '', 1)
+
+    _write(paths['inventory_items'], ['id', 'product_id', 'created_at', 'sold_at', 'cost', 'product_category',
+                                      'product_name', 'product_brand', 'product_retail_price',
+                                      'product_department', 'product_sku', 'product_distribution_center_id'],
+           inventory_rows())
+
+    return {paths[table]: table for table in CSV_TABLES}
+
+def build_database(products, db_path, seed=42, keep_csv=False):
+    """Generate the CSVs next to `db_path` and load them with DatabaseSetup; returns the load report"""
+    remove_database(db_path)
+    csv_dir = os.path.join(os.path.dirname(os.path.abspath(db_path)), 'csv')
+    csv_files = write_csvs(products, csv_dir, seed)
+
+    setup = DatabaseSetup(db_path)
+    setup.create_tables()
+    report = setup.load_csv_files_parallel(csv_files)
+    setup.verify_query_plans()
+    if not keep_csv:
+        for path in csv_files:
+            os.remove(path)
+        os.rmdir(csv_dir)
+    return report
+
+def default_directory(products, seed=42):
+    return os.path.join(ROOT, 'benchmarks', 'data', f'{products}-{seed}')
+
+def ensure_database(products, directory=None, seed=42):
+    """Path of a benchmark database with `products` products, building it if needed"""
+    directory = directory or default_directory(products, seed)
+    db_path = os.path.join(directory, 'ecommerce.db')
+    if not os.path.exists(db_path):
+        os.makedirs(directory, exist_ok=True)
+        build_database(products, db_path, seed)
+    return db_path
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--products', type=int, default=10000, help='number of products (e.g. 10000 to 10000000)')
+    parser.add_argument('--output', help='directory for ecommerce.db (default: benchmarks/data/<products>-<seed>)')
+    parser.add_argument('--seed', type=int, default=42, help='random seed')
+    parser.add_argument('--keep-csv', action='store_true', help='keep the generated CSV files')
+    args = parser.parse_args()
+
+    directory = args.output or default_directory(args.products, args.seed)
+    os.makedirs(directory, exist_ok=True)
+    db_path = os.path.join(directory, 'ecommerce.db')
+    start = time.perf_counter()
+    report = build_database(args.products, db_path, args.seed, args.keep_csv)
+    print(f"✅ {db_path} built in {time.perf_counter() - start:.1f}s")
+    for table_name, stats in report.items():
+        print(f"   {table_name:22} {stats['rows']:>11,} rows  {stats['rows_per_sec']:>9,} rows/sec")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
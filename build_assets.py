@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Frontend Asset Build
+Writes precompressed copies of the frontend files next to the originals:
+<file>.gz always and <file>.br when the brotli package is installed. app.py
+serves these variants directly, so static files are compressed once, at the
+highest levels, instead of on every request.
+"""
+
+import gzip
+import os
+import sys
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Files and directories served as the frontend by app.py
+FRONTEND_ASSETS = ['index.html', 'js', 'styles']
+ASSET_EXTENSIONS = ('.html', '.js', '.css')
+
+def iter_assets(root=ROOT):
+    for entry in FRONTEND_ASSETS:
+        path = os.path.join(root, entry)
+        if os.path.isfile(path):
+            yield path
+        elif os.path.isdir(path):
+            for dirpath, _, filenames in os.walk(path):
+                for filename in sorted(filenames):
+                    if filename.endswith(ASSET_EXTENSIONS):
+                        yield os.path.join(dirpath, filename)
+
+def compressors():
+    """(suffix, compress function) for every available encoding, highest levels"""
+    result = [('.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        result.append(('.br', lambda data: brotli.compress(data, quality=11)))
+    return result
+
+def build_assets(root=ROOT):
+    """Write the precompressed variants; returns (path, suffix, original size, compressed size) tuples"""
+    written = []
+    for path in iter_assets(root):
+        with open(path, 'rb') as f:
+            data = f.read()
+        for suffix, compress in compressors():
+            target = path + suffix
+            compressed = compress(data)
+            if len(compressed) >= len(data):
+                # Not worth serving; drop a stale variant if there is one
+                if os.path.exists(target):
+                    os.remove(target)
+                continue
+            with open(target, 'wb') as f:
+                f.write(compressed)
+            written.append((path, suffix, len(data), len(compressed)))
+    return written
+
+def main():
+    if brotli is None:
+        print("⚠️  brotli not installed - writing .gz variants only (pip install brotli)")
+    written = build_assets()
+    for path, suffix, original, compressed in written:
+        print(f"✅ {os.path.relpath(path, ROOT)}{suffix}: {original:,} -> {compressed:,} bytes "
+              f"({compressed / original:.0%})")
+    print(f"\n📦 {len(written)} precompressed assets written")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
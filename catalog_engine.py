@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Columnar Catalog Engine
+Optional in-memory copy of the product catalog that answers listing,
+count and aggregate requests without SQLite. Columns are NumPy arrays;
+category, brand, department and distribution center are dictionary-encoded
+as small ints, so filters are vectorized comparisons over the whole
+catalog. Enabled with CATALOG_ENGINE=numpy (see app.py). Full-text search
+and relevance sorting stay on SQLite (FTS5).
+"""
+
+import numpy as np
+
+from index_service import IndexService
+from queries import (CATALOG_SOURCE_QUERY, PRICE_BUCKETS, PRODUCT_FIELDS, SORT_ORDERS,
+                     SUMMARY_PRICE_SUMS_QUERY)
+
+# Dictionary-encoded columns; the distribution center also carries its
+# latitude/longitude, which are looked up through the same code
+ENCODED_COLUMNS = ('category', 'brand', 'department', 'distribution_center')
+DC_COLUMNS = {'dc_latitude': 0, 'dc_longitude': 1}
+SUPPORTED_SORTS = ('id', 'price_asc', 'price_desc')
+
+def _encode(values):
+    """(codes, lookup) for a column; None is code -1, and lookup[-1] is None"""
+    table = {}
+    codes = np.empty(len(values), dtype=np.int32)
+    for i, value in enumerate(values):
+        codes[i] = -1 if value is None else table.setdefault(value, len(table))
+    lookup = np.empty(len(table) + 1, dtype=object)
+    lookup[:len(table)] = list(table)
+    lookup[-1] = None
+    return codes, lookup
+
+def _float_column(values):
+    return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+
+class ColumnarCatalog:
+    """
+    Immutable snapshot of products joined to distribution_centers.
+    Sort orders and aggregates are computed once when the snapshot is built;
+    a request only builds a filter mask and gathers the rows of one page.
+    """
+
+    def __init__(self, rows, price_sums=None):
+        """
+        rows: tuples of the PRODUCT_FIELDS columns ordered by id.
+        price_sums: {'category'|'brand'|'department'|'catalog': {value: price_sum}}
+        from the summary tables; averages divide these sums, as SQLite does,
+        so both engines return the same floats. Missing sums are computed.
+        """
+        self.price_sums = price_sums or {}
+        columns = list(zip(*rows)) if rows else [()] * len(PRODUCT_FIELDS)
+        data = dict(zip(PRODUCT_FIELDS, columns))
+        self.size = len(rows)
+
+        self.ids = np.array(data['id'], dtype=np.int64)
+        self.prices = _float_column(data['retail_price'])
+        self.costs = _float_column(data['cost'])
+        self.names = np.array(data['name'], dtype=object)
+        self.skus = np.array(data['sku'], dtype=object)
+        self.codes = {}
+        self.lookups = {}
+        for column in ENCODED_COLUMNS:
+            self.codes[column], self.lookups[column] = _encode(data[column])
+
+        # Latitude/longitude per distribution center code (same trailing None slot)
+        dc_count = len(self.lookups['distribution_center'])
+        self.dc_coordinates = [np.full(dc_count, None, dtype=object) for _ in DC_COLUMNS]
+        dc_codes = self.codes['distribution_center']
+        for i, code in enumerate(dc_codes):
+            if code >= 0:
+                self.dc_coordinates[0][code] = data['dc_latitude'][i]
+                self.dc_coordinates[1][code] = data['dc_longitude'][i]
+
+        # SQLite orders NULL prices first ascending and last descending;
+        # -inf reproduces that for (price, id) ordering
+        self.priced = ~np.isnan(self.prices)
+        self.price_keys = np.where(self.priced, self.prices, -np.inf)
+        price_order = np.lexsort((self.ids, self.price_keys))
+        self.orders = {
+            'id': np.argsort(self.ids, kind='stable'),
+            'price_asc': price_order,
+            'price_desc': price_order[::-1].copy(),
+        }
+
+        self._index_values()
+
+    def _index_values(self):
+        """Per-snapshot lookups and aggregates derived from the column arrays"""
+        self.value_codes = {
+            column: {value: code for code, value in enumerate(lookup[:-1])}
+            for column, lookup in self.lookups.items()
+        }
+        self._categories = self._group_stats('category')
+        self._brands = self._group_stats('brand')
+        self._stats = self._catalog_stats()
+
+    def __len__(self):
+        return self.size
+
+    @staticmethod
+    def supports(filters, sort):
+        """Whether this engine can answer a listing (searches need FTS5)"""
+        return not filters.get('search') and sort in SUPPORTED_SORTS
+
+    def mask(self, filters):
+        """Boolean array of the products matching `filters`"""
+        mask = np.ones(self.size, dtype=bool)
+        for column in ('category', 'brand', 'department'):
+            if filters.get(column):
+                code = self.value_codes[column].get(filters[column])
+                if code is None:
+                    return np.zeros(self.size, dtype=bool)
+                mask &= self.codes[column] == code
+        # Comparisons with NaN are False, like comparisons with NULL in SQL
+        if filters.get('min_price') is not None:
+            mask &= self.prices >= filters['min_price']
+        if filters.get('max_price') is not None:
+            mask &= self.prices <= filters['max_price']
+        if filters.get('price_range'):
+            low, high = PRICE_BUCKETS[filters['price_range']]
+            mask &= self.prices >= low
+            if high is not None:
+                mask &= self.prices < high
+        return mask
+
+    def count(self, filters):
+        return int(np.count_nonzero(self.mask(filters)))
+
+    def query(self, filters, limit, offset=0, sort='id', after=None, fields=None):
+        """
+        Page of products as (column names, row tuples), with the same column
+        layout as queries.product_list_query: the selected fields first, then
+        any sort key columns the cursor needs.
+        """
+        order = self.orders[sort]
+        selected = order[self.mask(filters)[order]]
+
+        if after is not None:
+            if sort == 'id':
+                selected = selected[self.ids[selected] > after[0]]
+            else:
+                price, product_id = after
+                # A NULL price cursor is -inf, like the NULL prices in price_keys
+                price = -np.inf if price is None else price
+                keys, ids = self.price_keys[selected], self.ids[selected]
+                if SORT_ORDERS[sort][1] == 'ASC':
+                    keep = (keys > price) | ((keys == price) & (ids > product_id))
+                else:
+                    keep = (keys < price) | ((keys == price) & (ids < product_id))
+                selected = selected[keep]
+
+        page = selected[offset:] if limit < 0 else selected[offset:offset + limit]
+
+        names = list(fields) if fields is not None else list(PRODUCT_FIELDS)
+        for key_field in ('id', SORT_ORDERS[sort][2]):
+            if key_field not in names:
+                names.append(key_field)
+        columns = [self._column(name, page) for name in names]
+        return names, list(zip(*columns))
+
+    def _column(self, name, page):
+        if name == 'id':
+            return self.ids[page].tolist()
+        if name in ('retail_price', 'cost'):
+            values = (self.prices if name == 'retail_price' else self.costs)[page].tolist()
+            return [None if value != value else value for value in values]
+        if name in ('name', 'sku'):
+            return self._text(name, page)
+        if name in DC_COLUMNS:
+            return self.dc_coordinates[DC_COLUMNS[name]][self.codes['distribution_center'][page]].tolist()
+        return self.lookups[name][self.codes[name][page]].tolist()
+
+    def _text(self, name, page):
+        return (self.names if name == 'name' else self.skus)[page].tolist()
+
+    def rows_by_id(self, product_ids):
+        """
+        Products with the given ids as (column names, {id: row tuple});
+        ids that do not exist are left out
+        """
+        wanted = np.asarray(product_ids, dtype=np.int64)
+        positions = np.searchsorted(self.ids, wanted)
+        found = positions < self.size
+        found[found] &= self.ids[positions[found]] == wanted[found]
+        page = positions[found]
+        names = list(PRODUCT_FIELDS)
+        rows = list(zip(*[self._column(name, page) for name in names]))
+        return names, {row[0]: row for row in rows}
+
+    def _group_stats(self, column):
+        """Per-value rows shaped like the <column>_stats summary tables"""
+        codes = self.codes[column]
+        # Shift by one so NULL (-1) gets its own group at index 0
+        groups = codes + 1
+        size = len(self.lookups[column])
+        counts = np.bincount(groups, minlength=size)
+        price_counts = np.bincount(groups[self.priced], minlength=size)
+        price_sums = np.bincount(groups[self.priced], weights=self.prices[self.priced], minlength=size)
+        summary_sums = self.price_sums.get(column, {})
+        min_prices = np.full(size, np.inf)
+        max_prices = np.full(size, -np.inf)
+        np.minimum.at(min_prices, groups[self.priced], self.prices[self.priced])
+        np.maximum.at(max_prices, groups[self.priced], self.prices[self.priced])
+
+        rows = []
+        for group in np.flatnonzero(counts):
+            priced = price_counts[group] > 0
+            value = self.lookups[column][group - 1]
+            price_sum = summary_sums.get(value, float(price_sums[group]))
+            rows.append({
+                column: value,
+                'product_count': int(counts[group]),
+                'avg_price': price_sum / int(price_counts[group]) if priced else None,
+                'min_price': float(min_prices[group]) if priced else None,
+                'max_price': float(max_prices[group]) if priced else None,
+            })
+        # Same order as the summary table queries (NULL sorts first in SQLite)
+        rows.sort(key=lambda row: (-row['product_count'], row[column] is not None, row[column] or ''))
+        return rows
+
+    def _catalog_stats(self):
+        departments = {
+            row['department']: row['product_count'] for row in self._group_stats('department')
+        }
+        prices = self.prices[self.priced]
+        price_sum = self.price_sums.get('catalog', {}).get(None, float(prices.sum()))
+        return {
+            'total_products': self.size,
+            'unique_categories': len(self.lookups['category']) - 1,
+            'unique_brands': len(self.lookups['brand']) - 1,
+            'departments': len(self.lookups['department']) - 1,
+            'avg_price': price_sum / len(prices) if len(prices) else None,
+            'min_price': float(prices.min()) if len(prices) else None,
+            'max_price': float(prices.max()) if len(prices) else None,
+            'men_products': departments.get('Men', 0),
+            'women_products': departments.get('Women', 0),
+        }
+
+    def categories(self):
+        """Same rows as CATEGORIES_QUERY"""
+        return [dict(row) for row in self._categories]
+
+    def brands(self):
+        """Same rows as BRANDS_QUERY"""
+        return [
+            {key: row[key] for key in ('brand', 'product_count', 'avg_price')}
+            for row in self._brands if row['product_count'] > 1
+        ][:50]
+
+    def stats(self):
+        """Same row as STATS_QUERY"""
+        return dict(self._stats)
+
+    @classmethod
+    def from_database(cls, conn):
+        price_sums = {}
+        for column, value, price_sum in conn.execute(SUMMARY_PRICE_SUMS_QUERY):
+            price_sums.setdefault(column, {})[value] = price_sum
+        return cls([tuple(row) for row in conn.execute(CATALOG_SOURCE_QUERY)], price_sums)
+
+class CatalogService(IndexService):
+    """
+    Keeps a ColumnarCatalog current with the catalog data version. A reload
+    builds the new snapshot in the background and swaps it in atomically;
+    requests keep the snapshot they started with.
+    """
+
+    def __init__(self, connection_factory):
+        super().__init__(ColumnarCatalog.from_database, connection_factory, 'Columnar catalog')
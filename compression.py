@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Response Compression
+Negotiated gzip/brotli compression for API responses and serving of the
+precompressed frontend assets written by build_assets.py. brotli is
+optional; without it only gzip is offered for dynamic responses.
+"""
+
+import gzip
+import mimetypes
+import os
+import zlib
+
+from flask import abort, current_app, request, send_file
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+# Encodings in server preference order (used to break client quality ties)
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+# File suffix of each precompressed asset variant
+ASSET_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'application/x-ndjson',
+    'application/javascript',
+    'text/csv',
+    'text/css',
+    'text/html',
+    'text/javascript',
+    'text/plain',
+}
+
+# Levels for dynamic responses: fast enough to run on every request
+DEFAULT_LEVELS = {'gzip': 6, 'br': 4}
+
+def compression_level(**levels):
+    """
+    Override the compression levels of one route, e.g.
+    @compression_level(gzip=1, br=1) for large streamed responses.
+    """
+    def decorator(view):
+        view.compression_levels = {**DEFAULT_LEVELS, **levels}
+        return view
+    return decorator
+
+def negotiate_encoding(accept_encodings, available=ENCODINGS):
+    """Best content coding in `available` for an Accept-Encoding header, or None"""
+    return accept_encodings.best_match(available)
+
+def compress(data, encoding, level):
+    if encoding == 'br':
+        return brotli.compress(data, quality=level)
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+def compress_stream(chunks, encoding, level):
+    """Compress a streamed body chunk by chunk, flushing after each chunk"""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=level)
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            yield compressor.process(chunk) + compressor.flush()
+        yield compressor.finish()
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        yield compressor.flush()
+
+def etag_variants(etag):
+    """The ETag of an uncompressed body plus the tags of its compressed variants"""
+    return [etag] + [f"{etag}-{encoding}" for encoding in ASSET_SUFFIXES]
+
+def init_app(app, min_size=1024):
+    """
+    Compress eligible responses of `app` after each request. Bodies smaller
+    than `min_size` bytes, non-2xx responses, file responses and anything
+    already encoded are left alone.
+    """
+    @app.after_request
+    def compress_response(response):
+        if (not 200 <= response.status_code < 300
+                or response.status_code == 204
+                or response.direct_passthrough
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES
+                or 'no-transform' in response.headers.get('Cache-Control', '')):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = negotiate_encoding(request.accept_encodings)
+        if encoding is None:
+            return response
+
+        view = current_app.view_functions.get(request.endpoint)
+        level = getattr(view, 'compression_levels', DEFAULT_LEVELS)[encoding]
+        if response.is_streamed:
+            response.response = compress_stream(response.response, encoding, level)
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < min_size:
+                return response
+            response.set_data(compress(data, encoding, level))
+
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag:
+            response.set_etag(f"{etag}-{encoding}", weak)
+        return response
+
+    return compress_response
+
+def send_precompressed(directory, filename, max_age):
+    """
+    Send a static file, using its precompressed .br/.gz variant when the
+    client accepts it and the variant is at least as new as the original.
+    """
+    path = safe_join(directory, filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+
+    source_mtime = os.path.getmtime(path)
+    available = [
+        encoding for encoding, suffix in ASSET_SUFFIXES.items()
+        if os.path.isfile(path + suffix) and os.path.getmtime(path + suffix) >= source_mtime
+    ]
+    encoding = negotiate_encoding(request.accept_encodings, available) if available else None
+    mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+    if encoding is None:
+        response = send_file(path, mimetype=mimetype, max_age=max_age)
+    else:
+        response = send_file(path + ASSET_SUFFIXES[encoding], mimetype=mimetype, max_age=max_age)
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    return response
@@ -1,13 +1,153 @@
 import pandas as pd
 import sqlite3
 import os
+import hashlib
+import time
+import multiprocessing
+import queue as queue_module
+from concurrent.futures import ProcessPoolExecutor
 from sqlalchemy import create_engine, text
 import logging
+from storage import enable_wal
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Secondary indexes, built after bulk load. The (column, id) indexes return
+# filtered listings already in ORDER BY id order; the (column, retail_price)
+# indexes answer filter + price-range counts and the category/brand
+# aggregates from the index alone (covering).
+INDEXES = {
+    'idx_products_category_id': 'products (category, id)',
+    'idx_products_department_id': 'products (department, id)',
+    'idx_products_category_price': 'products (category, retail_price)',
+    'idx_products_brand_price': 'products (brand, retail_price)',
+    'idx_products_department_price': 'products (department, retail_price)',
+    'idx_products_retail_price': 'products (retail_price)',
+    'idx_order_items_product': 'order_items (product_id, sale_price)',
+    'idx_order_items_order': 'order_items (order_id, sale_price)',
+    'idx_order_items_user': 'order_items (user_id)',
+    'idx_orders_user_status': 'orders (user_id, status, created_at)',
+    'idx_inventory_items_product': 'inventory_items (product_id)',
+    'idx_users_country': 'users (country, city)',
+}
+
+# Summary tables maintained at load time for the aggregate API endpoints,
+# mapped to the products column they are grouped by (None: whole catalog)
+AGGREGATE_TABLES = {
+    'category_stats': 'category',
+    'brand_stats': 'brand',
+    'department_stats': 'department',
+    'catalog_stats': None,
+}
+
+# Primary key of each table loaded from CSV; delta ingestion (delta_ingest.py)
+# upserts on it and tracks its maximum as the table's high-water mark
+TABLE_KEYS = {
+    'products': 'id',
+    'users': 'id',
+    'orders': 'order_id',
+    'order_items': 'id',
+    'inventory_items': 'id',
+    'distribution_centers': 'id',
+}
+
+# Triggers keeping the products_fts search index in sync with products
+PRODUCTS_FTS_TRIGGERS = {
+    'products_fts_insert': """
+        CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN
+            INSERT INTO products_fts (rowid, name, brand, category)
+            VALUES (new.id, new.name, new.brand, new.category);
+        END
+    """,
+    'products_fts_delete': """
+        CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN
+            INSERT INTO products_fts (products_fts, rowid, name, brand, category)
+            VALUES ('delete', old.id, old.name, old.brand, old.category);
+        END
+    """,
+    'products_fts_update': """
+        CREATE TRIGGER IF NOT EXISTS products_fts_update AFTER UPDATE ON products BEGIN
+            INSERT INTO products_fts (products_fts, rowid, name, brand, category)
+            VALUES ('delete', old.id, old.name, old.brand, old.category);
+            INSERT INTO products_fts (rowid, name, brand, category)
+            VALUES (new.id, new.name, new.brand, new.category);
+        END
+    """,
+}
+
+# PRAGMAs for the bulk load writer: no rollback journal or fsync (a failed
+# load is simply rerun from the CSVs) and a large page cache
+BULK_LOAD_PRAGMAS = {
+    'journal_mode': 'OFF',
+    'synchronous': 'OFF',
+    'cache_size': -262144,  # 256 MB
+    'temp_store': 'MEMORY',
+}
+
+# Seconds a parser waits on the full queue before checking whether the load was aborted
+PARSE_PUT_TIMEOUT = 0.5
+
+_parse_queue = None
+_parse_stop = None
+
+def _init_parse_worker(queue, stop):
+    """Process pool initializer: remember the queue chunks are sent to and the abort flag"""
+    global _parse_queue, _parse_stop
+    _parse_queue = queue
+    _parse_stop = stop
+
+def _send_chunk(item):
+    """Queue a parsed chunk for the writer; False if the load was aborted meanwhile"""
+    while not _parse_stop.is_set():
+        try:
+            _parse_queue.put(item, timeout=PARSE_PUT_TIMEOUT)
+            return True
+        except queue_module.Full:
+            continue
+    return False
+
+def _parse_csv_worker(csv_file, table_name, chunk_size):
+    """Parse a CSV in a worker process and stream row chunks to the writer"""
+    rows_parsed = 0
+    for chunk in pd.read_csv(csv_file, chunksize=chunk_size):
+        # NaN -> None so missing values are stored as NULL
+        chunk = chunk.astype(object).where(chunk.notna(), None)
+        rows = list(chunk.itertuples(index=False, name=None))
+        if not _send_chunk((table_name, list(chunk.columns), rows)):
+            return rows_parsed
+        rows_parsed += len(rows)
+    _send_chunk((table_name, None, None))  # end of this table
+    return rows_parsed
+
+def _abort_parsers(pool, stop, queue, futures):
+    """
+    Stop the parse workers after the writer failed. Parsers blocked on the
+    full queue notice the stop flag; the queue is drained until they are
+    done, since a process cannot exit while its queued data is unread.
+    """
+    stop.set()
+    pool.shutdown(wait=False, cancel_futures=True)
+    while not all(future.done() for future in futures):
+        try:
+            queue.get(timeout=0.1)
+        except queue_module.Empty:
+            pass
+
+def file_fingerprint(csv_file):
+    """(size in bytes, SHA-256 hex digest) of a CSV file"""
+    digest = hashlib.sha256()
+    size = 0
+    with open(csv_file, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+            size += len(block)
+    return size, digest.hexdigest()
+
+class QueryPlanError(Exception):
+    """Raised when a hot API query is planned as a full table scan"""
+
 class DatabaseSetup:
     def __init__(self, db_name='ecommerce.db'):
         self.db_name = db_name
@@ -118,35 +258,434 @@ class DatabaseSetup:
         )
         """
         
+        # Create catalog_meta table (data version stamp used by the API caches)
+        catalog_meta_schema = """
+        CREATE TABLE IF NOT EXISTS catalog_meta (
+            key TEXT PRIMARY KEY,
+            value INTEGER
+        )
+        """
+        
+        # Create ingest state tables: the size and checksum of every CSV
+        # loaded, and the highest primary key loaded per table, so later
+        # delta ingests skip unchanged files and read only appended rows
+        ingest_schemas = [
+            """
+            CREATE TABLE IF NOT EXISTS ingest_files (
+                path TEXT PRIMARY KEY,
+                table_name TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                sha256 TEXT NOT NULL,
+                ingested_at INTEGER NOT NULL
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS ingest_marks (
+                table_name TEXT PRIMARY KEY,
+                high_water INTEGER,
+                ingested_at INTEGER NOT NULL
+            )
+            """,
+        ]
+        
+        # Create product summary tables (one row per category/brand/department,
+        # plus a single catalog-wide row). Sums and counts are kept rather than
+        # averages so new rows can be folded in incrementally.
+        aggregate_schemas = [
+            f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                {column or 'id'} {'TEXT' if column else 'INTEGER'} PRIMARY KEY,
+                product_count INTEGER NOT NULL DEFAULT 0,
+                price_count INTEGER NOT NULL DEFAULT 0,
+                price_sum REAL NOT NULL DEFAULT 0,
+                min_price REAL,
+                max_price REAL
+            )
+            """
+            for table, column in AGGREGATE_TABLES.items()
+        ]
+        
+        # Create the full-text search index over product name, brand and
+        # category. It is an external-content FTS5 table (no second copy of the
+        # text) kept in sync with products by triggers; prefix indexes make
+        # 2-3 character type-ahead prefixes cheap.
+        products_fts_schema = """
+        CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+            name, brand, category,
+            content='products', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+        """
+        
         with self.engine.connect() as conn:
+            conn.execute(text(catalog_meta_schema))
+            for ingest_schema in ingest_schemas:
+                conn.execute(text(ingest_schema))
+            for aggregate_schema in aggregate_schemas:
+                conn.execute(text(aggregate_schema))
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS idx_brand_stats_count ON brand_stats (product_count)"
+            ))
             conn.execute(text(products_schema))
             conn.execute(text(users_schema))
             conn.execute(text(orders_schema))
             conn.execute(text(order_items_schema))
             conn.execute(text(inventory_items_schema))
             conn.execute(text(distribution_centers_schema))
+            conn.execute(text(products_fts_schema))
+            for trigger in PRODUCTS_FTS_TRIGGERS.values():
+                conn.execute(text(trigger))
+            # BM25 column weights: name matches count most, then brand, then category
+            conn.execute(text(
+                "INSERT INTO products_fts (products_fts, rank) VALUES ('rank', 'bm25(10.0, 5.0, 2.0)')"
+            ))
             conn.commit()
             
         logger.info("Database tables created successfully!")
     
     def load_csv_data(self, csv_file, table_name, chunk_size=1000):
-        """Load CSV data into database table"""
+        """Load CSV data into database table.
+
+        Product chunks are folded into the summary tables in the same
+        transaction, so appending a CSV keeps the aggregates current without
+        a full recompute.
+        """
         logger.info(f"Loading data from {csv_file} into {table_name}...")
         
         try:
             # Read CSV in chunks to handle large files
             chunk_count = 0
             for chunk in pd.read_csv(csv_file, chunksize=chunk_size):
-                chunk.to_sql(table_name, self.engine, if_exists='append', index=False)
+                with self.engine.begin() as conn:
+                    chunk.to_sql(table_name, conn, if_exists='append', index=False)
+                    if table_name == 'products':
+                        self.merge_product_aggregates(conn, chunk)
                 chunk_count += 1
                 logger.info(f"Loaded chunk {chunk_count} for {table_name}")
                 
             logger.info(f"Successfully loaded {table_name} data!")
+            self.record_ingest_state({csv_file: (table_name, *file_fingerprint(csv_file))})
+            self.bump_data_version()
             
         except Exception as e:
             logger.error(f"Error loading {table_name}: {str(e)}")
             raise
     
+    def load_csv_files_parallel(self, csv_files, workers=None, chunk_size=50000,
+                                rows_per_transaction=500000):
+        """Bulk load several CSVs at once.
+
+        CSVs are parsed in parallel by a process pool; parsed chunks are
+        funnelled through a queue to this process, the single writer, which
+        inserts them with executemany in large transactions under bulk-load
+        PRAGMAs. Search triggers are suspended during the load and the search
+        index, aggregates and secondary indexes are built once afterwards,
+        and the CSV checksums and high-water marks are recorded for later
+        delta ingests. csv_files maps file path -> table name (several files
+        may load the same table). Returns rows/sec per table.
+
+        Meant for a new, empty database file. The load commits every
+        rows_per_transaction rows with journal_mode=OFF, so a failed load
+        cannot be rolled back: the file is left partially loaded and must be
+        deleted and rebuilt (db_snapshots.build_snapshot does this).
+        """
+        if not csv_files:
+            return {}
+        workers = workers or min(len(csv_files), os.cpu_count() or 1)
+        logger.info(f"Loading {len(csv_files)} CSV files with {workers} parser processes...")
+        
+        self.drop_indexes()
+        # Pooled engine connections would stop journal_mode from changing
+        self.engine.dispose()
+        conn = sqlite3.connect(self.db_name, isolation_level=None)
+        for pragma, value in BULK_LOAD_PRAGMAS.items():
+            conn.execute(f"PRAGMA {pragma} = {value}")
+        for trigger_name in PRODUCTS_FTS_TRIGGERS:
+            conn.execute(f"DROP TRIGGER IF EXISTS {trigger_name}")
+        
+        report = {}
+        started = time.perf_counter()
+        # Tables are finished when their last file's end marker arrives
+        finished = {}
+        files_left = len(csv_files)
+        rows_loaded = {table: 0 for table in csv_files.values()}
+        statements = {}
+        
+        # Bounded so fast parsers cannot run far ahead of the writer
+        queue = multiprocessing.Queue(maxsize=workers * 4)
+        stop = multiprocessing.Event()
+        try:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_parse_worker,
+                                     initargs=(queue, stop)) as pool:
+                futures = [pool.submit(_parse_csv_worker, csv_file, table_name, chunk_size)
+                           for csv_file, table_name in csv_files.items()]
+                # Checksums for delta ingestion, computed by whichever parser is free first
+                fingerprints = {csv_file: pool.submit(file_fingerprint, csv_file) for csv_file in csv_files}
+                
+                try:
+                    pending_rows = 0
+                    conn.execute("BEGIN")
+                    while files_left:
+                        try:
+                            table_name, columns, rows = queue.get(timeout=1)
+                        except queue_module.Empty:
+                            # A worker that died never sends its end marker
+                            for future in futures:
+                                if future.done() and future.exception():
+                                    raise future.exception()
+                            continue
+                        if columns is None:
+                            files_left -= 1
+                            finished[table_name] = time.perf_counter()
+                            continue
+                        
+                        if table_name not in statements:
+                            placeholders = ', '.join('?' for _ in columns)
+                            statements[table_name] = (
+                                f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({placeholders})"
+                            )
+                        conn.executemany(statements[table_name], rows)
+                        rows_loaded[table_name] += len(rows)
+                        pending_rows += len(rows)
+                        if pending_rows >= rows_per_transaction:
+                            conn.execute("COMMIT")
+                            conn.execute("BEGIN")
+                            pending_rows = 0
+                    conn.execute("COMMIT")
+                    
+                    # Surface parse errors from the workers
+                    for future in futures:
+                        future.result()
+                    fingerprints = {csv_file: future.result() for csv_file, future in fingerprints.items()}
+                except BaseException:
+                    # Parsers blocked on the bounded queue would keep the pool from shutting down
+                    _abort_parsers(pool, stop, queue, futures + list(fingerprints.values()))
+                    raise
+        except Exception as e:
+            # No ROLLBACK or cleanup: without a journal a rollback is
+            # undefined, and earlier transactions are committed anyway (see
+            # the docstring)
+            logger.error(f"Error in parallel load, {self.db_name} must be rebuilt: {str(e)}")
+            conn.close()
+            raise
+        
+        for trigger in PRODUCTS_FTS_TRIGGERS.values():
+            conn.execute(trigger)
+        conn.execute("PRAGMA journal_mode = DELETE")
+        conn.execute("PRAGMA synchronous = FULL")
+        conn.close()
+        
+        for table_name, rows in rows_loaded.items():
+            elapsed = finished[table_name] - started
+            report[table_name] = {
+                'rows': rows,
+                'seconds': round(elapsed, 3),
+                'rows_per_sec': round(rows / elapsed) if elapsed > 0 else rows
+            }
+            logger.info(f"{table_name}: {rows} rows in {elapsed:.2f}s "
+                        f"({report[table_name]['rows_per_sec']} rows/sec)")
+        
+        # Derived structures are built once over the loaded data
+        self.rebuild_search_index()
+        self.refresh_aggregates()
+        self.create_indexes()
+        self.record_ingest_state({csv_file: (table_name, *fingerprints[csv_file])
+                                  for csv_file, table_name in csv_files.items()})
+        self.apply_storage_profile()
+        return report
+    
+    def merge_product_aggregates(self, conn, products):
+        """Fold a DataFrame of newly inserted products into the summary tables"""
+        def merge(table, column, key, n, count, total, low, high):
+            values = {
+                'key': None if pd.isna(key) else key,
+                'n': int(n),
+                'count': int(count),
+                'total': float(total),
+                'low': None if pd.isna(low) else float(low),
+                'high': None if pd.isna(high) else float(high),
+            }
+            key_column = column or 'id'
+            result = conn.execute(text(f"""
+                UPDATE {table} SET
+                    product_count = product_count + :n,
+                    price_count = price_count + :count,
+                    price_sum = price_sum + :total,
+                    min_price = CASE WHEN min_price IS NULL THEN :low
+                                     WHEN :low IS NULL THEN min_price
+                                     ELSE MIN(min_price, :low) END,
+                    max_price = CASE WHEN max_price IS NULL THEN :high
+                                     WHEN :high IS NULL THEN max_price
+                                     ELSE MAX(max_price, :high) END
+                WHERE {key_column} IS :key
+            """), values)
+            if result.rowcount == 0:
+                conn.execute(text(f"""
+                    INSERT INTO {table} ({key_column}, product_count, price_count, price_sum, min_price, max_price)
+                    VALUES (:key, :n, :count, :total, :low, :high)
+                """), values)
+        
+        aggregations = ['size', 'count', 'sum', 'min', 'max']
+        for table, column in AGGREGATE_TABLES.items():
+            if column is None:
+                merge(table, None, 1, *products['retail_price'].agg(aggregations))
+                continue
+            groups = products.groupby(column, dropna=False)['retail_price'].agg(aggregations)
+            for key, row in groups.iterrows():
+                merge(table, column, key, *row)
+    
+    def record_ingest_state(self, files, conn=None):
+        """Remember loaded CSVs and the new high-water marks of their tables.
+
+        A mark never moves down, so ids deleted from the top of a table are
+        still recognized as previously loaded.
+
+        files maps CSV path -> (table name, size, sha256). With `conn` (a
+        sqlite3 connection in a transaction) the state is written as part of
+        that transaction.
+        """
+        now = int(time.time() * 1000)
+        rows = [(os.path.abspath(csv_file), table_name, size, sha256, now)
+                for csv_file, (table_name, size, sha256) in files.items()]
+        tables = sorted({table_name for table_name, _, _ in files.values()})
+        
+        def record(execute):
+            for row in rows:
+                execute("""
+                    INSERT INTO ingest_files (path, table_name, size, sha256, ingested_at)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(path) DO UPDATE SET
+                        table_name = excluded.table_name, size = excluded.size,
+                        sha256 = excluded.sha256, ingested_at = excluded.ingested_at
+                """, row)
+            for table_name in tables:
+                execute(f"""
+                    INSERT INTO ingest_marks (table_name, high_water, ingested_at)
+                    SELECT ?, MAX({TABLE_KEYS[table_name]}), ? FROM {table_name} WHERE true
+                    ON CONFLICT(table_name) DO UPDATE SET
+                        high_water = CASE WHEN high_water IS NULL OR excluded.high_water > high_water
+                                          THEN excluded.high_water ELSE high_water END,
+                        ingested_at = excluded.ingested_at
+                """, (table_name, now))
+        
+        if conn is not None:
+            record(conn.execute)
+            return
+        conn = sqlite3.connect(self.db_name)
+        try:
+            with conn:
+                record(conn.execute)
+        finally:
+            conn.close()
+    
+    def refresh_aggregates(self):
+        """Rebuild the product summary tables from scratch"""
+        logger.info("Rebuilding product aggregates...")
+        
+        with self.engine.begin() as conn:
+            for table, column in AGGREGATE_TABLES.items():
+                conn.execute(text(f"DELETE FROM {table}"))
+                conn.execute(text(f"""
+                    INSERT INTO {table} ({column or 'id'}, product_count, price_count, price_sum, min_price, max_price)
+                    SELECT {column or '1'}, COUNT(*), COUNT(retail_price), TOTAL(retail_price),
+                           MIN(retail_price), MAX(retail_price)
+                    FROM products
+                    {f'GROUP BY {column}' if column else ''}
+                """))
+        
+        self.bump_data_version()
+    
+    def bump_data_version(self, conn=None):
+        """Advance the data version stamp so API caches drop stale entries.
+
+        The stamp is the load time in milliseconds (or the previous stamp + 1,
+        whichever is larger), so it also changes when the database file is
+        rebuilt from scratch. With `conn` (a sqlite3 connection in a
+        transaction) the stamp moves in the same commit as the data.
+        """
+        sql = """
+            INSERT INTO catalog_meta (key, value) VALUES ('data_version', :now)
+            ON CONFLICT(key) DO UPDATE SET value = MAX(value + 1, excluded.value)
+        """
+        params = {'now': int(time.time() * 1000)}
+        if conn is not None:
+            conn.execute(sql, params)
+            return
+        with self.engine.connect() as conn:
+            conn.execute(text(sql), params)
+            conn.commit()
+    
+    def apply_storage_profile(self):
+        """Switch the file to WAL journaling and checkpoint it (see storage.py)"""
+        self.engine.dispose()
+        conn = sqlite3.connect(self.db_name)
+        try:
+            mode = enable_wal(conn)
+        finally:
+            conn.close()
+        logger.info(f"Journal mode: {mode}")
+        return mode
+    
+    def create_indexes(self):
+        """Create secondary indexes and refresh planner statistics.
+
+        Call this after the bulk load: building each index once over the
+        loaded table is much cheaper than maintaining it row by row.
+        """
+        logger.info("Creating secondary indexes...")
+        
+        with self.engine.connect() as conn:
+            for index_name, definition in INDEXES.items():
+                conn.execute(text(f"CREATE INDEX IF NOT EXISTS {index_name} ON {definition}"))
+            # Merge the search index segments written chunk by chunk during the load
+            conn.execute(text("INSERT INTO products_fts (products_fts) VALUES ('optimize')"))
+            conn.execute(text("ANALYZE"))
+            conn.commit()
+            
+        logger.info(f"Created {len(INDEXES)} indexes and analyzed the database")
+    
+    def rebuild_search_index(self):
+        """Rebuild the full-text index from the products table"""
+        logger.info("Rebuilding product search index...")
+        with self.engine.connect() as conn:
+            conn.execute(text("INSERT INTO products_fts (products_fts) VALUES ('rebuild')"))
+            conn.commit()
+    
+    def drop_indexes(self):
+        """Drop the secondary indexes (before a large reload)"""
+        with self.engine.connect() as conn:
+            for index_name in INDEXES:
+                conn.execute(text(f"DROP INDEX IF EXISTS {index_name}"))
+            conn.commit()
+    
+    def verify_query_plans(self, queries=None):
+        """Run EXPLAIN QUERY PLAN on the API queries and fail on table scans"""
+        from queries import hot_queries
+        
+        logger.info("Verifying query plans...")
+        offenders = []
+        
+        conn = sqlite3.connect(self.db_name)
+        try:
+            for name, sql, params, allow_scan in queries or hot_queries():
+                plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+                scans = [step for step in plan
+                         if step.startswith('SCAN')
+                         and 'COVERING INDEX' not in step
+                         and 'VIRTUAL TABLE INDEX' not in step
+                         and not step.startswith('SCAN (subquery')]
+                logger.info(f"{name}: {' | '.join(plan)}")
+                if scans and not allow_scan:
+                    offenders.append(f"{name}: {', '.join(scans)}")
+        finally:
+            conn.close()
+        
+        if offenders:
+            raise QueryPlanError("Hot queries fall back to a table scan: " + "; ".join(offenders))
+        
+        logger.info("All hot queries use indexes")
+    
     def verify_data_loading(self):
         """Verify that data was loaded correctly"""
         logger.info("Verifying data loading...")
@@ -190,12 +729,18 @@ def main():
         'ecommerce-dataset/archive/distribution_centers.csv': 'distribution_centers'
     }
     
+    available = {}
     for csv_file, table_name in csv_files.items():
         if os.path.exists(csv_file):
-            db_setup.load_csv_data(csv_file, table_name)
+            available[csv_file] = table_name
         else:
             logger.warning(f"CSV file not found: {csv_file}")
     
+    # Parse the CSVs in parallel and load them (indexes are built afterwards),
+    # then check the API's query plans
+    db_setup.load_csv_files_parallel(available)
+    db_setup.verify_query_plans()
+    
     # Verify data loading
     db_setup.verify_data_loading()
     
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Database Connection Pool
+Keeps warm SQLite connections for the REST API so requests do not pay for
+opening the file, parsing the schema and re-preparing the same SQL.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import logging
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+class DatabaseUnavailable(Exception):
+    """Raised when no connection could be handed out (pool exhausted or open failed)"""
+
+class _PooledConnection:
+    """A pooled sqlite3 connection plus the bookkeeping the pool needs"""
+
+    __slots__ = ('conn', 'uses', 'created_at', 'last_used', 'owner', 'generation')
+
+    def __init__(self, conn, generation=0):
+        self.conn = conn
+        self.generation = generation
+        self.uses = 0
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.owner = None
+
+class ConnectionPool:
+    """
+    Bounded pool of SQLite connections with per-thread affinity.
+
+    Each worker thread prefers the connection it used last, so long-lived
+    worker threads keep one warm connection with its prepared statements.
+    Short-lived threads fall back to any idle connection. At most `max_size`
+    connections are open at once; callers beyond that wait up to `timeout`.
+    Connections are created as `factory` (a sqlite3.Connection subclass);
+    `database` may be a file: URI when `uri` is set, and `configure` is
+    called with each new connection (to apply PRAGMAs, for instance).
+
+    `source` is the path the database is served from. When the file it
+    names is replaced (a snapshot published by db_snapshots.py), checked at
+    most every `source_check_interval` seconds, connections to the previous
+    file are retired: idle ones are closed at once, busy ones when they are
+    released, so in-flight requests finish on the data they started with.
+    """
+
+    def __init__(self, database, max_size=8, max_uses=10000, timeout=5.0,
+                 statement_cache_size=128, health_check_interval=30.0, factory=sqlite3.Connection,
+                 uri=False, configure=None, source=None, source_check_interval=1.0):
+        self.database = database
+        self.factory = factory
+        self.uri = uri
+        self.configure = configure
+        self.source = source
+        self.source_check_interval = source_check_interval
+        self.max_size = max_size
+        self.max_uses = max_uses
+        self.timeout = timeout
+        # Large enough to hold every listing filter combination plus the fixed routes
+        self.statement_cache_size = statement_cache_size
+        self.health_check_interval = health_check_interval
+
+        self._lock = threading.Condition()
+        self._idle = []  # LIFO stack of idle _PooledConnection
+        self._open = 0
+        self._local = threading.local()
+        self._generation = 0
+        self._source_id = self._stat_source()
+        self._next_source_check = time.monotonic() + source_check_interval
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'waits': 0,
+            'wait_time_ms': 0.0,
+            'timeouts': 0,
+            'recycled': 0,
+            'health_check_failures': 0,
+            'source_swaps': 0,
+            'retired': 0,
+        }
+
+    def _connect(self):
+        """Open a new connection configured for the API"""
+        conn = sqlite3.connect(
+            self.database,
+            check_same_thread=False,
+            cached_statements=self.statement_cache_size,
+            factory=self.factory,
+            uri=self.uri
+        )
+        conn.row_factory = sqlite3.Row  # This enables column access by name
+        if self.configure is not None:
+            try:
+                self.configure(conn)
+            except sqlite3.Error:
+                conn.close()
+                raise
+        return _PooledConnection(conn, self._generation)
+
+    def _stat_source(self):
+        """(device, inode) of the file `source` resolves to, or None"""
+        if self.source is None:
+            return None
+        try:
+            stat = os.stat(self.source)
+        except OSError:
+            return None
+        return (stat.st_dev, stat.st_ino)
+
+    def _check_source(self):
+        """Start a new connection generation if the served file was replaced"""
+        now = time.monotonic()
+        if self.source is None or now < self._next_source_check:
+            return
+        self._next_source_check = now + self.source_check_interval
+        source_id = self._stat_source()
+        if source_id is None or source_id == self._source_id:
+            return
+        with self._lock:
+            if source_id == self._source_id:
+                return
+            self._source_id = source_id
+            self._generation += 1
+            self._stats['source_swaps'] += 1
+            stale = [entry for entry in self._idle if entry.generation != self._generation]
+            self._idle = [entry for entry in self._idle if entry.generation == self._generation]
+            self._stats['retired'] += len(stale)
+        logger.info(f"Database file {self.source} was replaced; retiring {len(stale)} idle connections")
+        for entry in stale:
+            self._discard(entry)
+
+    def _take_idle(self):
+        """Pop the caller's own idle connection if present, else the most recent one"""
+        mine = getattr(self._local, 'entry', None)
+        if mine is not None and mine in self._idle:
+            self._idle.remove(mine)
+            return mine
+        return self._idle.pop() if self._idle else None
+
+    def _is_healthy(self, entry):
+        if time.monotonic() - entry.last_used < self.health_check_interval:
+            return True
+        try:
+            entry.conn.execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            self._stats['health_check_failures'] += 1
+            return False
+
+    def _discard(self, entry):
+        try:
+            entry.conn.close()
+        except sqlite3.Error:
+            pass
+        with self._lock:
+            self._open -= 1
+            self._lock.notify()
+
+    def acquire(self):
+        """Check out a connection, opening or waiting for one if needed"""
+        self._check_source()
+        deadline = None
+        while True:
+            with self._lock:
+                entry = self._take_idle()
+                if entry is None and self._open < self.max_size:
+                    self._open += 1
+                    self._stats['misses'] += 1
+                    reserved = True
+                elif entry is None:
+                    if deadline is None:
+                        deadline = time.monotonic() + self.timeout
+                        self._stats['waits'] += 1
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise DatabaseUnavailable('Connection pool exhausted')
+                    started = time.monotonic()
+                    self._lock.wait(remaining)
+                    self._stats['wait_time_ms'] += (time.monotonic() - started) * 1000
+                    continue
+                else:
+                    self._stats['hits'] += 1
+                    reserved = False
+
+            if reserved:
+                try:
+                    entry = self._connect()
+                except sqlite3.Error as e:
+                    with self._lock:
+                        self._open -= 1
+                        self._lock.notify()
+                    logger.error(f"Database connection error: {e}")
+                    raise DatabaseUnavailable(str(e))
+            elif not self._is_healthy(entry):
+                self._discard(entry)
+                continue
+
+            entry.owner = threading.get_ident()
+            self._local.entry = entry
+            return entry
+
+    def release(self, entry):
+        """Return a connection to the pool, recycling it once it is worn out"""
+        entry.uses += 1
+        entry.last_used = time.monotonic()
+        if entry.conn.in_transaction:
+            try:
+                entry.conn.rollback()
+            except sqlite3.Error:
+                self._discard(entry)
+                return
+        if entry.uses >= self.max_uses:
+            self._stats['recycled'] += 1
+            self._discard(entry)
+            return
+        if entry.generation != self._generation:
+            self._stats['retired'] += 1
+            self._discard(entry)
+            return
+        with self._lock:
+            self._idle.append(entry)
+            self._lock.notify()
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrow a connection for the duration of a `with` block. It goes back
+        to the pool however the block ends (an exception, or GeneratorExit
+        when a streamed response is abandoned), except after a database
+        error, when it is closed instead.
+        """
+        entry = self.acquire()
+        try:
+            yield entry.conn
+        except sqlite3.DatabaseError:
+            # Do not hand a possibly broken connection to the next request
+            self._discard(entry)
+            raise
+        except BaseException:
+            self.release(entry)
+            raise
+        else:
+            self.release(entry)
+
+    def close_all(self):
+        """Close every idle connection (used on shutdown, fork and data reload)"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+            self._lock.notify_all()
+        for entry in idle:
+            try:
+                entry.conn.close()
+            except sqlite3.Error:
+                pass
+
+    def stats(self):
+        """Snapshot of pool hit/miss/wait counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['open'] = self._open
+            stats['idle'] = len(self._idle)
+            stats['in_use'] = self._open - len(self._idle)
+            stats['max_size'] = self.max_size
+            stats['generation'] = self._generation
+        total = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / total, 4) if total else 0.0
+        stats['wait_time_ms'] = round(stats['wait_time_ms'], 3)
+        return stats
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Database Snapshots
+Zero-downtime data reloads. A reload never touches the live database file.
+It builds a new versioned file in <database>.snapshots/ with DatabaseSetup,
+validates it (row counts, indexes, search index, integrity, query plans)
+and warms it by running the hot API queries once. It then publishes the
+file by atomically replacing the serving path with a symlink to it.
+
+Connections opened after the swap read the new file. Connections that are
+already open keep reading the old one; the API's connection pool notices
+the swap and retires them as their requests finish. The new file carries a
+new data version stamp, so every cache keyed on it moves to the new data.
+The previous snapshot is kept so draining readers are never affected;
+older ones are removed.
+"""
+
+import logging
+import os
+import sqlite3
+import time
+
+from database_setup import DatabaseSetup, INDEXES, QueryPlanError
+from queries import hot_queries
+from storage import database_uri, remove_database
+
+logger = logging.getLogger(__name__)
+
+# Snapshots kept after a publish: the live one and the one before it
+KEEP_SNAPSHOTS = 2
+
+# A new snapshot may not have fewer products than this share of the live one
+MIN_PRODUCTS_RATIO = 0.5
+
+class SnapshotValidationError(Exception):
+    """Raised when a newly built snapshot is not fit to be published"""
+
+def snapshot_directory(database):
+    return f"{os.path.abspath(database)}.snapshots"
+
+def new_snapshot_path(database):
+    """Path for the next snapshot of `database`, named after its build time"""
+    stem = os.path.splitext(os.path.basename(database))[0]
+    now = time.time()
+    stamp = f"{time.strftime('%Y%m%d-%H%M%S', time.gmtime(now))}-{int(now * 1000) % 1000:03d}"
+    return os.path.join(snapshot_directory(database), f"{stem}-{stamp}-{os.getpid()}.db")
+
+def current_snapshot(database):
+    """File the serving path currently resolves to, or None if it does not exist"""
+    return os.path.realpath(database) if os.path.exists(database) else None
+
+def build_snapshot(database, csv_files, path=None):
+    """
+    Load `csv_files` ({csv path: table name}) into a new snapshot file next
+    to `database`. Returns (snapshot path, load report); the file is removed
+    if the load fails.
+    """
+    path = path or new_snapshot_path(database)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    logger.info(f"Building snapshot {path}...")
+    try:
+        setup = DatabaseSetup(path)
+        setup.create_tables()
+        report = setup.load_csv_files_parallel(csv_files)
+        setup.engine.dispose()
+    except Exception:
+        remove_database(path)
+        raise
+    return path, report
+
+def validate_snapshot(path, expected_rows=None, previous=None, min_products_ratio=MIN_PRODUCTS_RATIO):
+    """
+    Check a built snapshot before it is published. `expected_rows` maps
+    table name -> row count (e.g. from the load report). `previous` is the
+    live database; the new one must have at least `min_products_ratio` of
+    its products, which guards against a truncated export. Also checks:
+    - the indexes, the search index and the data version stamp exist
+    - PRAGMA quick_check passes and the hot queries use indexes
+    - every hot API query runs (this also warms the file in the OS page cache)
+    Raises SnapshotValidationError listing every problem found.
+    """
+    problems = []
+    conn = sqlite3.connect(database_uri(path, 'readonly'), uri=True)
+    try:
+        for table, expected in (expected_rows or {}).items():
+            actual = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            if actual != expected:
+                problems.append(f"{table} has {actual} rows, expected {expected}")
+        products = conn.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+        if products == 0:
+            problems.append("products is empty")
+        if previous:
+            live = sqlite3.connect(database_uri(previous, 'readonly'), uri=True)
+            try:
+                live_products = live.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+            finally:
+                live.close()
+            if products < live_products * min_products_ratio:
+                problems.append(f"products dropped from {live_products} to {products}")
+
+        existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        missing = sorted(set(INDEXES) - existing)
+        if missing:
+            problems.append(f"missing indexes: {', '.join(missing)}")
+
+        indexed = conn.execute("SELECT COUNT(*) FROM products_fts_docsize").fetchone()[0]
+        if indexed != products:
+            problems.append(f"search index covers {indexed} of {products} products")
+        if conn.execute("SELECT value FROM catalog_meta WHERE key = 'data_version'").fetchone() is None:
+            problems.append("no data version stamp")
+
+        integrity = conn.execute("PRAGMA quick_check").fetchone()[0]
+        if integrity != 'ok':
+            problems.append(f"quick_check: {integrity}")
+
+        for name, sql, params, _ in hot_queries():
+            try:
+                conn.execute(sql, params).fetchall()
+            except sqlite3.Error as e:
+                problems.append(f"{name} failed: {e}")
+    except sqlite3.Error as e:
+        problems.append(str(e))
+    finally:
+        conn.close()
+
+    if not problems:
+        try:
+            DatabaseSetup(path).verify_query_plans()
+        except QueryPlanError as e:
+            problems.append(str(e))
+
+    if problems:
+        raise SnapshotValidationError(f"Snapshot {path} failed validation: " + "; ".join(problems))
+    logger.info(f"Snapshot {path} validated")
+
+def publish_snapshot(database, path):
+    """
+    Atomically point the serving path `database` at snapshot `path`.
+    A regular file previously at `database` is replaced by the symlink;
+    processes that still have it open keep reading it.
+    """
+    link = f"{database}.{os.getpid()}.tmp"
+    target = os.path.relpath(os.path.abspath(path), os.path.dirname(os.path.abspath(database)))
+    if os.path.lexists(link):
+        os.remove(link)
+    os.symlink(target, link)
+    os.replace(link, database)
+    logger.info(f"Published snapshot {path} as {database}")
+
+def prune_snapshots(database, keep=KEEP_SNAPSHOTS):
+    """Remove all but the `keep` newest snapshots (never the live one); returns the removed paths"""
+    directory = snapshot_directory(database)
+    if not os.path.isdir(directory):
+        return []
+    live = current_snapshot(database)
+    # Names start with the build time, so they sort oldest first
+    snapshots = sorted((os.path.join(directory, name) for name in os.listdir(directory) if name.endswith('.db')),
+                       reverse=True)
+    removed = []
+    for path in snapshots[keep:]:
+        if path != live:
+            remove_database(path)
+            removed.append(path)
+    return removed
+
+def reload_database(database, csv_files, keep=KEEP_SNAPSHOTS):
+    """
+    Build, validate and publish a new snapshot of `database` from
+    `csv_files`, then prune old snapshots. Returns the load report. Nothing
+    is published (and the new file is removed) if any step fails.
+    """
+    previous = current_snapshot(database)
+    path, report = build_snapshot(database, csv_files)
+    try:
+        validate_snapshot(path, {table: stats['rows'] for table, stats in report.items()}, previous)
+    except SnapshotValidationError:
+        remove_database(path)
+        raise
+    publish_snapshot(database, path)
+    for removed in prune_snapshots(database, keep):
+        logger.info(f"Removed old snapshot {removed}")
+    return report
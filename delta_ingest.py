@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+Delta Ingestion
+Applies new and changed CSV rows to a loaded database in place, instead of
+rebuilding it. Every CSV's size and SHA-256 is recorded when it is loaded
+(ingest_files), and so is the highest primary key per table (ingest_marks):
+- a file whose checksum has not changed is skipped
+- a file that only grew (its old contents are an unchanged prefix) is read
+  from where the last load stopped, so only the appended rows are parsed
+- any other file (rewritten, or a new delta file) is read in full
+
+Rows are upserted on the table's primary key (INSERT ... ON CONFLICT DO
+UPDATE). Rows above the table's recorded high-water mark are inserted
+without a lookup; an existing row is only written when one of its columns
+differs. Rows at or below the mark whose id no longer exists (deleted since
+they were loaded) are inserted again and reported as reinserted.
+The secondary indexes and the search index (through its triggers) are
+maintained row by row. The summary tables behind categories, brands and
+stats are adjusted by the difference each product makes, with their
+minimum and maximum prices re-read through the (column, retail_price)
+indexes. Everything, including the ingest state and a new data version
+stamp, is committed in one transaction; API readers (WAL) keep reading the
+previous data until then. Rows missing from a CSV are never deleted.
+
+Usage: python delta_ingest.py [--db ecommerce.db] [table=path.csv ...]
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import sys
+import time
+
+import pandas as pd
+
+from database_setup import AGGREGATE_TABLES, TABLE_KEYS, DatabaseSetup
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 50000
+
+DEFAULT_CSV_FILES = {
+    'ecommerce-dataset/archive/products.csv': 'products',
+    'ecommerce-dataset/archive/users.csv': 'users',
+    'ecommerce-dataset/archive/orders.csv': 'orders',
+    'ecommerce-dataset/archive/order_items.csv': 'order_items',
+    'ecommerce-dataset/archive/inventory_items.csv': 'inventory_items',
+    'ecommerce-dataset/archive/distribution_centers.csv': 'distribution_centers',
+}
+
+# products columns the summary tables depend on
+AGGREGATE_COLUMNS = ('category', 'brand', 'department', 'retail_price')
+
+def scan_file(csv_file, known=None):
+    """
+    Compare a CSV with its state from the last ingest. `known` is the
+    recorded (size, sha256), or None. Returns (status, offset, size, sha256):
+    status is 'new', 'unchanged', 'appended' or 'changed', and offset is
+    where reading must start (0 for a full read, past the header included).
+    """
+    digest = hashlib.sha256()
+    size = 0
+    prefix_ok = False
+    with open(csv_file, 'rb') as f:
+        if known:
+            known_size, known_sha256 = known
+            remaining = known_size
+            last = b''
+            while remaining > 0:
+                block = f.read(min(1 << 20, remaining))
+                if not block:
+                    break
+                digest.update(block)
+                size += len(block)
+                remaining -= len(block)
+                last = block
+            # An unchanged prefix that ends on a row boundary
+            prefix_ok = (size == known_size and digest.hexdigest() == known_sha256
+                         and last.endswith(b'\n'))
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+            size += len(block)
+    sha256 = digest.hexdigest()
+    if known is None:
+        return 'new', 0, size, sha256
+    if sha256 == known[1] and size == known[0]:
+        return 'unchanged', size, size, sha256
+    if prefix_ok:
+        return 'appended', known[0], size, sha256
+    return 'changed', 0, size, sha256
+
+def read_chunks(csv_file, offset=0, chunk_size=CHUNK_SIZE):
+    """Yield (columns, rows) chunks of a CSV, starting at byte `offset` (a row boundary)"""
+    columns = list(pd.read_csv(csv_file, nrows=0).columns)
+    with open(csv_file, 'rb') as f:
+        if offset:
+            f.seek(offset)
+            if not f.read(1):
+                return
+            f.seek(offset)
+            chunks = pd.read_csv(f, header=None, names=columns, chunksize=chunk_size)
+        else:
+            chunks = pd.read_csv(f, chunksize=chunk_size)
+        for chunk in chunks:
+            # NaN -> None so missing values are stored as NULL (as in a full load)
+            chunk = chunk.astype(object).where(chunk.notna(), None)
+            yield columns, list(chunk.itertuples(index=False, name=None))
+
+def upsert_statement(table_name, columns):
+    """INSERT that updates an existing row only when a column differs"""
+    key = TABLE_KEYS[table_name]
+    placeholders = ', '.join('?' for _ in columns)
+    values = [column for column in columns if column != key]
+    return (
+        f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({placeholders}) "
+        f"ON CONFLICT({key}) DO UPDATE SET "
+        + ', '.join(f"{column} = excluded.{column}" for column in values)
+        + " WHERE " + ' OR '.join(f"{table_name}.{column} IS NOT excluded.{column}" for column in values)
+    )
+
+class DeltaIngest:
+    """One ingest run over a sqlite3 connection in an open transaction"""
+
+    def __init__(self, conn, chunk_size=CHUNK_SIZE):
+        self.conn = conn
+        self.chunk_size = chunk_size
+        self.tables = {}
+        # (summary table, group key) -> [product_count, price_count, price_sum] difference
+        self.aggregate_deltas = {}
+
+    def table_report(self, table_name):
+        if table_name not in self.tables:
+            key = TABLE_KEYS[table_name]
+            recorded = self.conn.execute("SELECT high_water FROM ingest_marks WHERE table_name = ?",
+                                         (table_name,)).fetchone()
+            high_water = recorded[0] if recorded else None
+            current = self.conn.execute(f"SELECT MAX({key}) FROM {table_name}").fetchone()[0]
+            # Rows above the mark are inserted without a lookup, so the mark
+            # may never be below the table's real maximum
+            if current is not None and (high_water is None or current > high_water):
+                if recorded:
+                    logger.warning(f"{table_name} has rows above its recorded high-water mark {high_water} "
+                                   f"(loaded without recording ingest state); using {current}")
+                high_water = current
+            self.tables[table_name] = {
+                'files': 0,
+                'unchanged_files': 0,
+                'rows_read': 0,
+                'inserted': 0,
+                'reinserted': 0,
+                'updated': 0,
+                'unchanged': 0,
+                'high_water_before': high_water,
+                'high_water': high_water,
+            }
+        return self.tables[table_name]
+
+    def ingest_file(self, csv_file, table_name, status, offset):
+        report = self.table_report(table_name)
+        report['files'] += 1
+        if status == 'unchanged':
+            report['unchanged_files'] += 1
+            return
+        for columns, rows in read_chunks(csv_file, offset, self.chunk_size):
+            self.ingest_rows(table_name, columns, rows)
+
+    def ingest_rows(self, table_name, columns, rows):
+        report = self.table_report(table_name)
+        report['rows_read'] += len(rows)
+        key_index = columns.index(TABLE_KEYS[table_name])
+        # Last occurrence of a key wins, as if the rows were applied in order
+        # (rows without a key get a new one from SQLite, as in a full load)
+        rows = (list({row[key_index]: row for row in rows if row[key_index] is not None}.values())
+                + [row for row in rows if row[key_index] is None])
+        high_water = report['high_water']
+
+        # Only keys at or below the high-water mark can already exist
+        candidates = [row[key_index] for row in rows
+                      if row[key_index] is not None and high_water is not None and row[key_index] <= high_water]
+        existing = self.existing_rows(table_name, candidates) if candidates else {}
+        new_rows = [row for row in rows if row[key_index] not in existing]
+        old_rows = [row for row in rows if row[key_index] in existing]
+        # Keys at or below the mark that are gone were deleted since they were loaded
+        report['reinserted'] += len(candidates) - len(existing)
+
+        statement = upsert_statement(table_name, columns)
+        if new_rows:
+            report['inserted'] += self.conn.executemany(statement, new_rows).rowcount
+        if old_rows:
+            updated = self.conn.executemany(statement, old_rows).rowcount
+            report['updated'] += updated
+            report['unchanged'] += len(old_rows) - updated
+
+        keys = [row[key_index] for row in rows if row[key_index] is not None]
+        if keys:
+            report['high_water'] = max(keys) if high_water is None else max(high_water, max(keys))
+
+        if table_name == 'products':
+            positions = [columns.index(column) for column in AGGREGATE_COLUMNS]
+            for row in rows:
+                new = tuple(row[i] for i in positions)
+                old = existing.get(row[key_index])
+                if old != new:
+                    if old is not None:
+                        self.count_product(old, -1)
+                    self.count_product(new, 1)
+
+    def existing_rows(self, table_name, keys):
+        """key -> aggregate columns (products) or True, for the keys that exist"""
+        key = TABLE_KEYS[table_name]
+        if table_name == 'products':
+            rows = self.conn.execute(f"""
+                SELECT p.id, {', '.join(f'p.{column}' for column in AGGREGATE_COLUMNS)}
+                FROM json_each(?) ids JOIN products p ON p.id = ids.value
+            """, (json.dumps(keys),))
+            return {row[0]: tuple(row[1:]) for row in rows}
+        rows = self.conn.execute(f"""
+            SELECT t.{key} FROM json_each(?) ids JOIN {table_name} t ON t.{key} = ids.value
+        """, (json.dumps(keys),))
+        return {row[0]: True for row in rows}
+
+    def count_product(self, values, sign):
+        """Add (sign 1) or remove (sign -1) one product's contribution to the summary tables"""
+        row = dict(zip(AGGREGATE_COLUMNS, values))
+        price = row['retail_price']
+        for table, column in AGGREGATE_TABLES.items():
+            delta = self.aggregate_deltas.setdefault((table, row[column] if column else 1), [0, 0, 0.0])
+            delta[0] += sign
+            if price is not None:
+                delta[1] += sign
+                delta[2] += sign * price
+
+    def apply_aggregates(self):
+        """Fold the accumulated differences into the summary tables; returns the groups touched"""
+        for (table, key), (n, count, total) in self.aggregate_deltas.items():
+            column = AGGREGATE_TABLES[table]
+            key_column = column or 'id'
+            if column is None:
+                where, params = '', ()
+            elif key is None:
+                where, params = f"WHERE {column} IS NULL", ()
+            else:
+                where, params = f"WHERE {column} = ?", (key,)
+            # Separate MIN and MAX queries: each is a single index seek
+            low = self.conn.execute(f"SELECT MIN(retail_price) FROM products {where}", params).fetchone()[0]
+            high = self.conn.execute(f"SELECT MAX(retail_price) FROM products {where}", params).fetchone()[0]
+            values = {'key': key, 'n': n, 'count': count, 'total': total, 'low': low, 'high': high}
+            updated = self.conn.execute(f"""
+                UPDATE {table} SET
+                    product_count = product_count + :n,
+                    price_count = price_count + :count,
+                    price_sum = price_sum + :total,
+                    min_price = :low,
+                    max_price = :high
+                WHERE {key_column} IS :key
+            """, values).rowcount
+            if updated == 0:
+                self.conn.execute(f"""
+                    INSERT INTO {table} ({key_column}, product_count, price_count, price_sum, min_price, max_price)
+                    VALUES (:key, :n, :count, :total, :low, :high)
+                """, values)
+            if column is not None:
+                self.conn.execute(f"DELETE FROM {table} WHERE {key_column} IS ? AND product_count <= 0", (key,))
+        return len(self.aggregate_deltas)
+
+def ingest_delta(database, csv_files, chunk_size=CHUNK_SIZE):
+    """
+    Apply the new and changed rows of `csv_files` ({csv path: table name})
+    to `database`. Returns a report:
+    - tables: per table, files (unchanged_files of them skipped), rows_read,
+      inserted (reinserted of them below the high-water mark), updated,
+      unchanged, and high_water_before/high_water
+    - files: per CSV, 'new', 'unchanged', 'appended' or 'changed'
+    - aggregate_groups: summary table rows adjusted
+    - changed: whether anything was written (the data version only moves then)
+    """
+    started = time.perf_counter()
+    setup = DatabaseSetup(database)
+    # Adds the ingest state tables and search triggers to older databases
+    setup.create_tables()
+    setup.engine.dispose()
+
+    conn = sqlite3.connect(database, isolation_level=None)
+    try:
+        known = {row[0]: (row[1], row[2]) for row in conn.execute("SELECT path, size, sha256 FROM ingest_files")}
+        conn.execute("BEGIN IMMEDIATE")
+        run = DeltaIngest(conn, chunk_size)
+        files = {}
+        fingerprints = {}
+        for csv_file, table_name in csv_files.items():
+            path = os.path.abspath(csv_file)
+            status, offset, size, sha256 = scan_file(csv_file, known.get(path))
+            files[csv_file] = status
+            logger.info(f"{csv_file} ({table_name}): {status}"
+                        + (f", reading from byte {offset:,}" if status == 'appended' else ''))
+            run.ingest_file(csv_file, table_name, status, offset)
+            if status != 'unchanged':
+                fingerprints[csv_file] = (table_name, size, sha256)
+
+        aggregate_groups = run.apply_aggregates()
+        changed = any(report['inserted'] or report['updated'] for report in run.tables.values())
+        if fingerprints:
+            setup.record_ingest_state(fingerprints, conn)
+        if changed:
+            setup.bump_data_version(conn)
+        conn.execute("COMMIT")
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+    if changed:
+        # Refresh planner statistics only where they have gone stale
+        conn = sqlite3.connect(database)
+        try:
+            conn.execute("PRAGMA optimize")
+        finally:
+            conn.close()
+
+    seconds = round(time.perf_counter() - started, 3)
+    for table_name, report in run.tables.items():
+        logger.info(f"{table_name}: {report['inserted']} inserted ({report['reinserted']} reinserted), "
+                    f"{report['updated']} updated, "
+                    f"{report['unchanged']} unchanged; high-water mark {report['high_water_before']} "
+                    f"-> {report['high_water']}")
+    logger.info(f"Delta ingest finished in {seconds:.2f}s ({aggregate_groups} summary rows adjusted)")
+    return {
+        'tables': run.tables,
+        'files': files,
+        'aggregate_groups': aggregate_groups,
+        'changed': changed,
+        'seconds': seconds,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Apply new and changed CSV rows to the database in place')
+    parser.add_argument('--db', default='ecommerce.db', help='SQLite database path')
+    parser.add_argument('files', nargs='*', metavar='table=path.csv',
+                        help='CSVs to ingest (default: the ecommerce-dataset CSVs that exist)')
+    args = parser.parse_args(argv)
+
+    if args.files:
+        csv_files = {}
+        for spec in args.files:
+            table_name, sep, csv_file = spec.partition('=')
+            if not sep or table_name not in TABLE_KEYS:
+                parser.error(f"expected table=path.csv with a table among {', '.join(TABLE_KEYS)}, not {spec!r}")
+            csv_files[csv_file] = table_name
+    else:
+        csv_files = {csv_file: table_name for csv_file, table_name in DEFAULT_CSV_FILES.items()
+                     if os.path.exists(csv_file)}
+    if not os.path.exists(args.db):
+        print(f"❌ Database not found: {args.db} (run init_database.py first)")
+        return 1
+
+    report = ingest_delta(args.db, csv_files)
+    for csv_file, status in report['files'].items():
+        print(f"   {csv_file}: {status}")
+    for table_name, stats in report['tables'].items():
+        print(f"   {table_name:22} +{stats['inserted']:,} inserted ({stats['reinserted']:,} reinserted)  "
+              f"~{stats['updated']:,} updated  "
+              f"={stats['unchanged']:,} unchanged  (high-water {stats['high_water']})")
+    print(f"✅ {'Applied' if report['changed'] else 'No changes'} in {report['seconds']:.2f}s")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
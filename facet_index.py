@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Facet Index
+Posting bitmaps behind GET /api/products/facets. Products are numbered in
+price order and each facet value (category, brand, department, distribution
+center) keeps a bitmap of its products as a Python int, so a filter set is a
+few ANDs and every facet count is one AND plus bit_count(). Because rows are
+in price order, a price range is a contiguous run of bits found with a
+binary search over the sorted prices.
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+
+from index_service import IndexService
+from queries import FACET_SOURCE_QUERY, PRICE_BUCKETS
+
+FACETS = ('category', 'brand', 'department', 'distribution_center')
+
+def _bitmap(positions, size):
+    """Python int with the given bit positions set"""
+    bits = bytearray((size + 7) // 8)
+    for position in positions:
+        bits[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(bits, 'little')
+
+class FacetIndex:
+    """
+    Immutable bitmap index over one snapshot of the products table.
+    Facet counts are disjunctive: the counts of a facet ignore that facet's
+    own filter, so the other values stay visible as alternatives.
+    """
+
+    def __init__(self, rows):
+        """
+        rows: (id, category, brand, department, distribution_center,
+        retail_price) tuples ordered by price with NULL prices first
+        """
+        rows = list(rows)
+        self.size = len(rows)
+        self.all = (1 << self.size) - 1
+
+        max_id = max((row[0] for row in rows), default=0)
+        self.positions = array('i', [-1]) * (max_id + 1)
+        postings = {facet: {} for facet in FACETS}
+        self.prices = array('d')
+        for position, (product_id, *values, price) in enumerate(rows):
+            self.positions[product_id] = position
+            for facet, value in zip(FACETS, values):
+                if value is not None:
+                    postings[facet].setdefault(value, []).append(position)
+            if price is not None:
+                self.prices.append(price)
+        # Bits [0, unpriced) are the products without a price
+        self.unpriced = self.size - len(self.prices)
+
+        self.bitmaps = {
+            facet: {value: _bitmap(positions, self.size) for value, positions in values.items()}
+            for facet, values in postings.items()
+        }
+        self.totals = {
+            facet: {value: bitmap.bit_count() for value, bitmap in bitmaps.items()}
+            for facet, bitmaps in self.bitmaps.items()
+        }
+        self.bucket_bitmaps = {
+            name: self.price_range(low, high, high_inclusive=False)
+            for name, (low, high) in PRICE_BUCKETS.items()
+        }
+
+    def __len__(self):
+        return self.size
+
+    def price_range(self, low=None, high=None, high_inclusive=True):
+        """Bitmap of products priced in [low, high] ([low, high) if not high_inclusive)"""
+        if low is None and high is None:
+            return self.all
+        start = self.unpriced + (bisect_left(self.prices, low) if low is not None else 0)
+        if high is None:
+            end = self.size
+        elif high_inclusive:
+            end = self.unpriced + bisect_right(self.prices, high)
+        else:
+            end = self.unpriced + bisect_left(self.prices, high)
+        if end <= start:
+            return 0
+        return ((1 << end) - 1) ^ ((1 << start) - 1)
+
+    def id_bitmap(self, product_ids):
+        """Bitmap of the given product ids (ids unknown to this snapshot are ignored)"""
+        positions = self.positions
+        limit = len(positions)
+        return _bitmap(
+            (positions[product_id] for product_id in product_ids
+             if 0 <= product_id < limit and positions[product_id] >= 0),
+            self.size
+        )
+
+    def _filter_bitmaps(self, filters, search_ids):
+        bitmaps = {}
+        for facet in FACETS:
+            if filters.get(facet):
+                bitmaps[facet] = self.bitmaps[facet].get(filters[facet], 0)
+        if filters.get('min_price') is not None or filters.get('max_price') is not None:
+            bitmaps['price'] = self.price_range(filters.get('min_price'), filters.get('max_price'))
+        if filters.get('price_range'):
+            bitmaps['price'] = bitmaps.get('price', self.all) & self.bucket_bitmaps[filters['price_range']]
+        if search_ids is not None:
+            bitmaps['search'] = self.id_bitmap(search_ids)
+        return bitmaps
+
+    def price_histogram(self, mask, bins):
+        """
+        Counts of the products in `mask` over `bins` equal-width price bins
+        spanning the catalog's price range (the last bin includes the maximum)
+        """
+        if not self.prices or bins < 1:
+            return {'bin_width': None, 'bins': []}
+        low, high = self.prices[0], self.prices[-1]
+        width = (high - low) / bins
+        edges = [low] + [round(low + width * i, 2) for i in range(1, bins)] + [high]
+        return {
+            'bin_width': round(width, 2),
+            'bins': [
+                {
+                    'min': edges[i],
+                    'max': edges[i + 1],
+                    'count': (mask & self.price_range(edges[i], edges[i + 1],
+                                                      high_inclusive=i == bins - 1)).bit_count()
+                }
+                for i in range(bins)
+            ]
+        }
+
+    def counts(self, filters, search_ids=None, limit=None, histogram_bins=20):
+        """
+        Matching product total, per-facet value counts and price histogram
+        for `filters`. search_ids: ids matching the filters' search term, if
+        there is one. Facet values are ordered by count (zero counts
+        omitted), at most `limit` per facet; price buckets are always listed
+        in full. Price buckets and the histogram ignore the price filters.
+        """
+        bitmaps = self._filter_bitmaps(filters, search_ids)
+
+        def combined(exclude=None):
+            mask = self.all
+            for name, bitmap in bitmaps.items():
+                if name != exclude:
+                    mask &= bitmap
+            return mask
+
+        facets = {}
+        for facet in FACETS:
+            mask = combined(facet)
+            if mask == self.all:
+                counts = self.totals[facet].items()
+            else:
+                counts = [(value, (mask & bitmap).bit_count())
+                          for value, bitmap in self.bitmaps[facet].items()]
+            ranked = sorted((item for item in counts if item[1]), key=lambda item: (-item[1], item[0]))
+            facets[facet] = [{'value': value, 'count': count} for value, count in ranked[:limit]]
+
+        mask = combined('price')
+        facets['price_range'] = [
+            {'value': name, 'count': (mask & bitmap).bit_count()}
+            for name, bitmap in self.bucket_bitmaps.items()
+        ]
+        return {
+            'total_items': combined().bit_count(),
+            'facets': facets,
+            'price_histogram': self.price_histogram(mask, histogram_bins)
+        }
+
+    @classmethod
+    def from_database(cls, conn):
+        return cls(tuple(row) for row in conn.execute(FACET_SOURCE_QUERY))
+
+class FacetService(IndexService):
+    """Keeps a FacetIndex current with the catalog data version"""
+
+    def __init__(self, connection_factory):
+        super().__init__(FacetIndex.from_database, connection_factory, 'Facet index')
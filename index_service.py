@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Versioned In-Memory Indexes
+Keeps an index built from the database current with the catalog data
+version stamp. Used for the autocomplete and facet indexes.
+"""
+
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+class IndexService:
+    """
+    Holds the current index and rebuilds it when the catalog data version
+    changes. The first build is synchronous; later rebuilds run in a
+    background thread while lookups keep using the previous index.
+    """
+
+    def __init__(self, build, connection_factory, name='Index'):
+        # build(conn) returns a new index; connection_factory() must return
+        # a context manager yielding a connection
+        self._build_index = build
+        self._connection_factory = connection_factory
+        self.name = name
+        self._index = None
+        self._version = None
+        self._building = False
+        self._lock = threading.Lock()
+
+    def _build(self, version):
+        try:
+            with self._connection_factory() as conn:
+                index = self._build_index(conn)
+            with self._lock:
+                self._index, self._version = index, version
+            logger.info(f"{self.name} built: {len(index)} entries (data version {version})")
+        except Exception as e:
+            logger.error(f"Error building {self.name.lower()}: {e}")
+        finally:
+            with self._lock:
+                self._building = False
+
+    def load(self, version):
+        """Build the index for `version` in the calling thread unless it is already current"""
+        with self._lock:
+            current = self._index is not None and self._version == version
+        if not current:
+            self._build(version)
+        with self._lock:
+            return self._index
+
+    def get_index(self, version, stale_ok=True):
+        """
+        Current index, triggering a (background) rebuild if it is stale.
+        With stale_ok=False a stale index is not returned: the caller gets
+        None until the rebuild for `version` has finished.
+        """
+        with self._lock:
+            index, stale = self._index, self._version != version
+            start = stale and not self._building
+            if start:
+                self._building = True
+
+        if index is None:
+            if start:
+                self._build(version)
+            with self._lock:
+                return self._index
+        if start:
+            threading.Thread(target=self._build, args=(version,), daemon=True).start()
+        return index if stale_ok or not stale else None
@@ -1,16 +1,23 @@
 #!/usr/bin/env python3
 """
 Database Initialization Script
-This script recreates the ecommerce database from the CSV files.
-Run this script to set up the database locally.
+This script builds the ecommerce database from the CSV files.
+Run this script to set up the database locally. When the database already
+exists, a new snapshot is built and validated next to it and swapped in
+atomically, so a running API keeps serving throughout (see db_snapshots.py).
+With --delta, only the rows added or changed in the CSVs since they were
+last loaded are applied to the existing database in place (see
+delta_ingest.py).
 """
 
 import os
 import sys
 from database_setup import DatabaseSetup
+from db_snapshots import KEEP_SNAPSHOTS, reload_database
+from delta_ingest import ingest_delta
 
-def main():
-    """Initialize the database"""
+def main(delta=False):
+    """Initialize the database (or, with delta=True, apply the CSV changes to it)"""
     print("=== E-commerce Database Initialization ===")
     print("This script will create the database from CSV files.")
     print("Make sure you have the ecommerce-dataset folder in the project root.")
@@ -23,26 +30,20 @@ def main():
         print("git clone https://github.com/recruit41/ecommerce-dataset.git")
         sys.exit(1)
     
+    if delta and not os.path.exists('ecommerce.db'):
+        print("❌ Error: --delta needs an existing ecommerce.db; run without --delta first.")
+        sys.exit(1)
+    
     # Check if database already exists
-    if os.path.exists('ecommerce.db'):
-        response = input("⚠️  Database already exists. Do you want to recreate it? (y/N): ")
+    if os.path.exists('ecommerce.db') and not delta:
+        response = input("⚠️  Database already exists. Build a new snapshot and swap it in? (y/N): ")
         if response.lower() != 'y':
             print("Database initialization cancelled.")
             sys.exit(0)
-        else:
-            os.remove('ecommerce.db')
-            print("🗑️  Removed existing database.")
     
     print("🚀 Starting database initialization...")
     
     try:
-        # Initialize database setup
-        db_setup = DatabaseSetup()
-        
-        # Create tables
-        print("📋 Creating database tables...")
-        db_setup.create_tables()
-        
         # Load data from CSV files
         csv_files = {
             'ecommerce-dataset/archive/products.csv': 'products',
@@ -53,16 +54,41 @@ def main():
             'ecommerce-dataset/archive/distribution_centers.csv': 'distribution_centers'
         }
         
+        available = {}
         for csv_file, table_name in csv_files.items():
             if os.path.exists(csv_file):
-                print(f"📥 Loading {table_name}...")
-                db_setup.load_csv_data(csv_file, table_name)
+                available[csv_file] = table_name
             else:
                 print(f"⚠️  Warning: {csv_file} not found")
         
+        if delta:
+            # Skip unchanged files, read only what was appended to the others
+            # and upsert it; aggregates and search index are updated in place
+            print(f"📥 Applying changes from {', '.join(available.values())}...")
+            report = ingest_delta('ecommerce.db', available)
+            for csv_file, status in report['files'].items():
+                print(f"   {csv_file}: {status}")
+            for table_name, stats in report['tables'].items():
+                print(f"   {table_name:22} {stats['inserted']:>9,} inserted  {stats['reinserted']:>9,} reinserted  "
+                      f"{stats['updated']:>9,} updated  "
+                      f"high-water {stats['high_water']}")
+            print(f"\n🎉 {'Changes applied' if report['changed'] else 'No changes found'} "
+                  f"in {report['seconds']:.2f}s.")
+            return
+        
+        # Parse all CSVs in parallel into a single writer in a new snapshot
+        # file; indexes, search index and aggregates are built once the rows
+        # are in. The snapshot is validated (row counts, indexes, integrity,
+        # query plans) and warmed before ecommerce.db is pointed at it.
+        print(f"📥 Loading {', '.join(available.values())} into a new snapshot...")
+        report = reload_database('ecommerce.db', available, keep=KEEP_SNAPSHOTS)
+        for table_name, stats in report.items():
+            print(f"   {table_name:22} {stats['rows']:>9,} rows  {stats['rows_per_sec']:>9,} rows/sec")
+        print(f"🔀 Published {os.path.realpath('ecommerce.db')}")
+        
         # Verify data loading
         print("✅ Verifying data...")
-        db_setup.verify_data_loading()
+        DatabaseSetup().verify_data_loading()
         
         print("\n🎉 Database initialization completed successfully!")
         print("📊 You can now run 'python verify_data.py' to see the data summary.")
@@ -72,4 +98,4 @@ def main():
         sys.exit(1)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main(delta='--delta' in sys.argv[1:])
\ No newline at end of file
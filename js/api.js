@@ -1,10 +1,12 @@
 // API Configuration
 const API_BASE_URL = 'http://localhost:5000/api';
+const PRODUCT_BATCH_SIZE = 200;
 
 // API Service Class
 class ApiService {
     constructor() {
         this.baseURL = API_BASE_URL;
+        this.pendingProducts = [];
     }
 
     // Generic fetch method with error handling
@@ -30,20 +32,94 @@ class ApiService {
         }
     }
 
-    // Get all products with pagination and filters
-    async getProducts(page = 1, limit = 12, filters = {}) {
+    // Get all products with pagination and filters.
+    // Pass the previous response's pagination.next_cursor as `cursor` to
+    // fetch the following page without an OFFSET scan on the server.
+    async getProducts(page = 1, limit = 12, filters = {}, cursor = null) {
         const params = new URLSearchParams({
-            page: page.toString(),
             limit: limit.toString(),
             ...filters
         });
 
+        if (cursor) {
+            params.set('cursor', cursor);
+        } else {
+            params.set('page', page.toString());
+        }
+
         return this.fetchAPI(`/products?${params}`);
     }
 
+    // Facet counts (category, brand, department, distribution center and
+    // price range) for the given filters, at most `limit` values per facet
+    async getFacets(filters = {}, limit = 50) {
+        const params = new URLSearchParams({
+            limit: limit.toString(),
+            ...filters
+        });
+        return this.fetchAPI(`/products/facets?${params}`);
+    }
+
+    // Follow next_cursor links, yielding one page of products at a time
+    async *iterateProducts(limit = 12, filters = {}) {
+        let cursor = null;
+        do {
+            const response = await this.getProducts(1, limit, filters, cursor);
+            yield response.data;
+            cursor = response.pagination.next_cursor;
+        } while (cursor);
+    }
+
     // Get a single product by ID
-    async getProduct(id) {
-        return this.fetchAPI(`/products/${id}`);
+    // getProduct calls made in the same tick are merged into a single
+    // /products/batch request; each caller still gets the single-product
+    // response shape (or a 404 error) back
+    getProduct(id) {
+        return new Promise((resolve, reject) => {
+            this.pendingProducts.push({ id: Number(id), resolve, reject });
+            if (this.pendingProducts.length === 1) {
+                queueMicrotask(() => this.flushProductBatch());
+            }
+        });
+    }
+
+    async flushProductBatch() {
+        const pending = this.pendingProducts;
+        this.pendingProducts = [];
+
+        if (pending.length === 1) {
+            const { id, resolve, reject } = pending[0];
+            this.fetchAPI(`/products/${id}`).then(resolve, reject);
+            return;
+        }
+
+        const ids = [...new Set(pending.map(entry => entry.id))];
+        const products = new Map();
+        try {
+            for (let i = 0; i < ids.length; i += PRODUCT_BATCH_SIZE) {
+                const chunk = ids.slice(i, i + PRODUCT_BATCH_SIZE);
+                const response = await this.getProductsBatch(chunk);
+                response.data.forEach((product, index) => products.set(chunk[index], product));
+            }
+        } catch (error) {
+            pending.forEach(entry => entry.reject(error));
+            return;
+        }
+
+        pending.forEach(({ id, resolve, reject }) => {
+            const product = products.get(id);
+            if (product) {
+                resolve({ success: true, data: product });
+            } else {
+                reject(new Error('HTTP error! status: 404'));
+            }
+        });
+    }
+
+    // Get several products by ID in one request (results in request order,
+    // null for IDs that do not exist)
+    async getProductsBatch(ids) {
+        return this.fetchAPI(`/products/batch?ids=${ids.join(',')}`);
     }
 
     // Get all categories
@@ -61,6 +137,16 @@ class ApiService {
         return this.fetchAPI('/products/stats');
     }
 
+    // Type-ahead suggestions (product names, brands, categories)
+    async suggestProducts(query, limit = 8) {
+        const params = new URLSearchParams({
+            q: query,
+            limit: limit.toString()
+        });
+
+        return this.fetchAPI(`/products/suggest?${params}`);
+    }
+
     // Search products (custom implementation)
     async searchProducts(query, page = 1, limit = 12) {
         const params = new URLSearchParams({
@@ -145,15 +231,15 @@ const cache = new CacheManager();
 
 // Enhanced API Service with caching
 class CachedApiService extends ApiService {
-    async getProducts(page = 1, limit = 12, filters = {}) {
-        const cacheKey = cache.generateKey('products', { page, limit, ...filters });
+    async getProducts(page = 1, limit = 12, filters = {}, cursor = null) {
+        const cacheKey = cache.generateKey('products', { page, limit, cursor, ...filters });
         const cachedData = cache.get(cacheKey);
         
         if (cachedData) {
             return cachedData;
         }
 
-        const data = await super.getProducts(page, limit, filters);
+        const data = await super.getProducts(page, limit, filters, cursor);
         cache.set(cacheKey, data);
         return data;
     }
@@ -1,3 +1,6 @@
+// Fields rendered by the product grid; the listing only selects these
+const GRID_FIELDS = 'id,name,brand,category,retail_price';
+
 // Main Application Class
 class ECommerceApp {
     constructor() {
@@ -34,10 +37,16 @@ class ECommerceApp {
             }
         });
 
-        // Search input with debouncing
+        // Search input with debouncing; suggestions use a shorter delay
+        // because they come from a cheap in-memory index on the server
         let searchTimeout;
+        let suggestTimeout;
         searchInput.addEventListener('input', (e) => {
             clearTimeout(searchTimeout);
+            clearTimeout(suggestTimeout);
+            suggestTimeout = setTimeout(() => {
+                this.loadSuggestions(e.target.value);
+            }, 100);
             searchTimeout = setTimeout(() => {
                 this.handleSearch(e.target.value);
             }, 500);
@@ -73,52 +82,79 @@ class ECommerceApp {
     }
 
     async loadInitialData() {
+        await this.refreshFacets();
+    }
+
+    // Reload the filter options with counts for the current filters
+    // (one /products/facets request covers every filter)
+    async refreshFacets() {
+        const facetKey = JSON.stringify(this.currentFilters);
+        if (facetKey === this.facetKey) {
+            return;
+        }
+        this.facetKey = facetKey;
+
         try {
-            // Load categories and brands for filters
-            const [categoriesResponse, brandsResponse] = await Promise.all([
-                ApiResponseHandler.execute(() => api.getCategories()),
-                ApiResponseHandler.execute(() => api.getBrands())
-            ]);
-
-            if (categoriesResponse.success) {
-                this.populateCategoryFilter(categoriesResponse.data);
-            }
+            const response = await ApiResponseHandler.execute(() =>
+                api.getFacets(this.currentFilters)
+            );
 
-            if (brandsResponse.success) {
-                this.populateBrandFilter(brandsResponse.data);
+            if (response.success) {
+                // response.data is the API body; its payload is under .data
+                const facets = response.data.data.facets;
+                this.populateCategoryFilter(facets.category);
+                this.populateBrandFilter(facets.brand);
+                this.updatePriceFilterCounts(facets.price_range);
             }
         } catch (error) {
-            console.error('Failed to load initial data:', error);
+            console.error('Failed to load facets:', error);
         }
     }
 
     populateCategoryFilter(categories) {
-        const select = document.getElementById('categoryFilter');
-        categories.forEach(category => {
-            const option = document.createElement('option');
-            option.value = category.category;
-            option.textContent = `${category.category} (${category.count})`;
-            select.appendChild(option);
-        });
+        this.populateFacetSelect('categoryFilter', categories);
     }
 
     populateBrandFilter(brands) {
-        const select = document.getElementById('brandFilter');
-        brands.forEach(brand => {
+        this.populateFacetSelect('brandFilter', brands);
+    }
+
+    // Price options are fixed server-side buckets; only their counts change
+    updatePriceFilterCounts(buckets) {
+        const select = document.getElementById('priceFilter');
+        buckets.forEach(bucket => {
+            const option = select.querySelector(`option[value="${bucket.value}"]`);
+            if (option) {
+                option.dataset.label = option.dataset.label || option.textContent;
+                option.textContent = `${option.dataset.label} (${bucket.count})`;
+            }
+        });
+    }
+
+    populateFacetSelect(selectId, entries) {
+        const select = document.getElementById(selectId);
+        const selected = select.value;
+        select.length = 1; // keep the "All ..." option
+        entries.forEach(entry => {
             const option = document.createElement('option');
-            option.value = brand.brand;
-            option.textContent = `${brand.brand} (${brand.count})`;
+            option.value = entry.value;
+            option.textContent = `${entry.value} (${entry.count})`;
             select.appendChild(option);
         });
+        select.value = selected;
     }
 
     async loadProducts() {
         this.showLoading(true);
         this.hideError();
+        this.refreshFacets();
 
         try {
             const response = await ApiResponseHandler.execute(() => 
-                api.getProducts(this.currentPage, this.productsPerPage, this.currentFilters)
+                api.getProducts(this.currentPage, this.productsPerPage, {
+                    ...this.currentFilters,
+                    fields: GRID_FIELDS
+                })
             );
 
             if (response.success) {
@@ -282,6 +318,24 @@ class ECommerceApp {
         await this.loadProducts();
     }
 
+    async loadSuggestions(query) {
+        const datalist = document.getElementById('searchSuggestions');
+        if (query.trim() === '') {
+            datalist.innerHTML = '';
+            return;
+        }
+
+        const response = await ApiResponseHandler.execute(() => api.suggestProducts(query.trim()));
+        if (!response.success) return;
+
+        datalist.innerHTML = '';
+        response.data.data.forEach(suggestion => {
+            const option = document.createElement('option');
+            option.value = suggestion.text;
+            datalist.appendChild(option);
+        });
+    }
+
     clearFilters() {
         document.getElementById('categoryFilter').value = '';
         document.getElementById('brandFilter').value = '';
@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""
+Request Metrics
+Instrumentation for the REST API: per-route latency histograms and status
+counts, per-statement SQL time and rows returned, connection acquisition
+and JSON serialization time. Everything is rendered in the Prometheus text
+format for /metrics, and each response carries a Server-Timing header with
+its own breakdown. Statements slower than the slow-query threshold are
+logged with their EXPLAIN QUERY PLAN.
+
+Statements are profiled by creating pooled connections as
+`Metrics.connection_class`, whose execute() returns a cursor that times its
+fetches and counts its rows. Counters are per process; with several worker
+processes each one reports its own.
+"""
+
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+
+import serialization
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Distinct statements tracked individually; any beyond are reported as "other"
+MAX_STATEMENTS = 500
+STATEMENT_LABEL_LENGTH = 160
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+def _timings():
+    """Server-Timing accumulators of the current request, or None outside one"""
+    return g.get('_metrics_timings') if has_request_context() else None
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _shorten(text, length=STATEMENT_LABEL_LENGTH):
+    """Head and tail of a long statement (the tail holds the WHERE and ORDER BY)"""
+    if len(text) <= length:
+        return text
+    head = length // 3
+    return f'{text[:head]} … {text[head - length + 3:]}'
+
+def _labels(**labels):
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+
+class Histogram:
+    """Latency histogram over LATENCY_BUCKETS (updated under the Metrics lock)"""
+
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def copy(self):
+        histogram = Histogram()
+        histogram.counts = list(self.counts)
+        histogram.sum = self.sum
+        histogram.count = self.count
+        return histogram
+
+    def render(self, name, labels=''):
+        """Prometheus sample lines (cumulative buckets, sum and count)"""
+        lines = []
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels + "," if labels else ""}le="{bound}"}} {cumulative}')
+        braces = f'{{{labels}}}' if labels else ''
+        lines.append(f'{name}_sum{braces} {self.sum:.6f}')
+        lines.append(f'{name}_count{braces} {self.count}')
+        return lines
+
+class StatementStats:
+    """Totals for one SQL statement text"""
+
+    __slots__ = ('query_id', 'text', 'calls', 'seconds', 'rows', 'slow')
+
+    def __init__(self, sql):
+        self.text = ' '.join(sql.split())
+        self.query_id = hashlib.sha1(self.text.encode('utf-8')).hexdigest()[:12]
+        self.calls = 0
+        self.seconds = 0.0
+        self.rows = 0
+        self.slow = 0
+
+class ProfiledCursor(sqlite3.Cursor):
+    """
+    Cursor returned by ProfiledConnection.execute(). Time spent executing
+    and fetching, and the rows fetched, are added to its statement's totals
+    and the request's Server-Timing. The query plan of a slow statement is
+    captured while its connection is still in use and logged once the cursor
+    is exhausted, closed or collected.
+    """
+
+    def _begin(self, metrics, stats, sql, parameters, seconds):
+        self._metrics = metrics
+        self._stats = stats
+        self._sql = sql
+        self._parameters = parameters
+        self._seconds = 0.0
+        self._rows = 0
+        self._plan = None
+        self._finished = False
+        self._fetched(seconds, 0, calls=1)
+
+    def _fetched(self, seconds, rows, exhausted=False, calls=0):
+        self._seconds += seconds
+        self._rows += rows
+        metrics = self._metrics
+        metrics.add_statement(self._stats, seconds, rows, calls)
+        timings = _timings()
+        if timings is not None:
+            timings['db'] += seconds
+            timings['queries'] += calls
+        threshold = metrics.slow_query_seconds
+        if threshold is not None and self._plan is None and self._seconds >= threshold:
+            self._plan = self._explain()
+        if exhausted:
+            self._finish()
+
+    def _explain(self):
+        try:
+            plan = sqlite3.Connection.execute(self.connection, f'EXPLAIN QUERY PLAN {self._sql}', self._parameters)
+            return ' | '.join(row[3] for row in plan)
+        except sqlite3.Error as e:
+            return f'unavailable ({e})'
+
+    def _finish(self):
+        if getattr(self, '_finished', True):
+            return
+        self._finished = True
+        if self._plan is not None:
+            self._metrics.log_slow_query(self._stats, self._parameters, self._seconds, self._rows, self._plan)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(time.perf_counter() - start, int(row is not None), exhausted=row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        start = time.perf_counter()
+        rows = super().fetchmany(size)
+        self._fetched(time.perf_counter() - start, len(rows), exhausted=len(rows) < size)
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(time.perf_counter() - start, len(rows), exhausted=True)
+        return rows
+
+    def __iter__(self):
+        return self._iterate()
+
+    def _iterate(self):
+        fetch = super().__next__
+        seconds = 0.0
+        rows = 0
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    row = fetch()
+                except StopIteration:
+                    return
+                finally:
+                    seconds += time.perf_counter() - start
+                rows += 1
+                yield row
+        finally:
+            self._fetched(seconds, rows, exhausted=True)
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+class ProfiledConnection(sqlite3.Connection):
+    """sqlite3 connection whose execute() profiles the statement (see Metrics.connection_class)"""
+
+    metrics = None
+
+    def execute(self, sql, parameters=()):
+        cursor = self.cursor(ProfiledCursor)
+        start = time.perf_counter()
+        cursor.execute(sql, parameters)
+        cursor._begin(self.metrics, self.metrics.statement(sql), sql, parameters, time.perf_counter() - start)
+        return cursor
+
+class Metrics:
+    """
+    Per-process request, SQL, connection and serialization metrics.
+    `slow_query_ms` is the statement time (execution plus fetching) above
+    which a statement is logged with its query plan; 0 disables the log.
+    """
+
+    def __init__(self, slow_query_ms=100.0, server_timing=True):
+        self.slow_query_seconds = slow_query_ms / 1000 if slow_query_ms > 0 else None
+        self.server_timing = server_timing
+        self.connection_class = type('ProfiledConnection', (ProfiledConnection,), {'metrics': self})
+        self._lock = threading.Lock()
+        self._requests = {}  # (method, route, status) -> count
+        self._latency = {}  # (method, route) -> Histogram
+        self._statements = {}  # SQL text -> StatementStats
+        self._other = StatementStats('other')
+        self._acquire = Histogram()
+        self._serialization = Histogram()
+
+    def statement(self, sql):
+        """Totals record for a statement text"""
+        stats = self._statements.get(sql)
+        if stats is None:
+            with self._lock:
+                stats = self._statements.get(sql)
+                if stats is None:
+                    if len(self._statements) >= MAX_STATEMENTS:
+                        return self._other
+                    stats = self._statements[sql] = StatementStats(sql)
+        return stats
+
+    def add_statement(self, stats, seconds, rows, calls=0):
+        with self._lock:
+            stats.calls += calls
+            stats.seconds += seconds
+            stats.rows += rows
+
+    def log_slow_query(self, stats, parameters, seconds, rows, plan):
+        with self._lock:
+            stats.slow += 1
+        logger.warning(f"Slow query ({seconds * 1000:.1f} ms, {rows} rows, id {stats.query_id}): "
+                       f"{stats.text} params={parameters!r} plan: {plan}")
+
+    def observe_acquire(self, seconds):
+        with self._lock:
+            self._acquire.observe(seconds)
+        timings = _timings()
+        if timings is not None:
+            timings['acquire'] += seconds
+
+    def observe_serialization(self, seconds):
+        with self._lock:
+            self._serialization.observe(seconds)
+        timings = _timings()
+        if timings is not None:
+            timings['serialize'] += seconds
+
+    def observe_request(self, method, route, status, seconds):
+        with self._lock:
+            key = (method, route, status)
+            self._requests[key] = self._requests.get(key, 0) + 1
+            histogram = self._latency.get((method, route))
+            if histogram is None:
+                histogram = self._latency[(method, route)] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def connection(self, pool):
+        """Borrow a connection from `pool`, recording how long the checkout took"""
+        start = time.perf_counter()
+        with pool.connection() as conn:
+            self.observe_acquire(time.perf_counter() - start)
+            yield conn
+
+    def init_app(self, app):
+        """
+        Time every request of `app` and report JSON encodes to this registry.
+        Register before other after_request hooks (such as compression) so
+        the recorded time includes them; for streamed responses it ends when
+        the body starts streaming.
+        """
+        serialization.encode_observer = self.observe_serialization
+
+        @app.before_request
+        def start_request_timer():
+            g._metrics_timings = {'start': time.perf_counter(), 'db': 0.0, 'queries': 0,
+                                  'acquire': 0.0, 'serialize': 0.0}
+
+        @app.after_request
+        def record_request(response):
+            timings = g.pop('_metrics_timings', None)
+            if timings is None:
+                return response
+            elapsed = time.perf_counter() - timings['start']
+            route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            self.observe_request(request.method, route, response.status_code, elapsed)
+            if self.server_timing:
+                queries = timings['queries']
+                response.headers.add('Server-Timing', ', '.join([
+                    f'db;dur={timings["db"] * 1000:.3f};desc="{queries} {"query" if queries == 1 else "queries"}"',
+                    f'db-acquire;dur={timings["acquire"] * 1000:.3f}',
+                    f'serialize;dur={timings["serialize"] * 1000:.3f}',
+                    f'total;dur={elapsed * 1000:.3f}',
+                ]))
+            return response
+
+        return record_request
+
+    def render(self, gauges=None):
+        """Prometheus text exposition of every metric, plus `gauges` ({name: number})"""
+        with self._lock:
+            requests = sorted(self._requests.items())
+            latency = sorted((key, histogram.copy()) for key, histogram in self._latency.items())
+            statements = [(s.query_id, s.text, s.calls, s.seconds, s.rows, s.slow)
+                          for s in list(self._statements.values()) + [self._other] if s.calls]
+            acquire = self._acquire.copy()
+            encode = self._serialization.copy()
+
+        lines = ['# HELP api_requests_total Requests by route and status',
+                 '# TYPE api_requests_total counter']
+        lines += [f'api_requests_total{{{_labels(method=method, route=route, status=status)}}} {count}'
+                  for (method, route, status), count in requests]
+
+        lines += ['# HELP api_request_duration_seconds Request handling time by route',
+                  '# TYPE api_request_duration_seconds histogram']
+        for (method, route), histogram in latency:
+            lines += histogram.render('api_request_duration_seconds', _labels(method=method, route=route))
+
+        for name, index, kind, help_text in (
+                ('api_sql_statement_calls_total', 2, 'counter', 'Executions per SQL statement'),
+                ('api_sql_statement_seconds_total', 3, 'counter', 'Execution plus fetch time per SQL statement'),
+                ('api_sql_statement_rows_total', 4, 'counter', 'Rows returned per SQL statement'),
+                ('api_sql_slow_queries_total', 5, 'counter', 'Executions slower than the slow-query threshold')):
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+            for statement in statements:
+                value = f'{statement[index]:.6f}' if isinstance(statement[index], float) else statement[index]
+                labels = _labels(query_id=statement[0], statement=_shorten(statement[1]))
+                lines.append(f'{name}{{{labels}}} {value}')
+
+        lines += ['# HELP api_db_acquire_seconds Time to check a connection out of the pool',
+                  '# TYPE api_db_acquire_seconds histogram']
+        lines += acquire.render('api_db_acquire_seconds')
+        lines += ['# HELP api_serialization_seconds Time spent encoding JSON responses',
+                  '# TYPE api_serialization_seconds histogram']
+        lines += encode.render('api_serialization_seconds')
+
+        for name, value in (gauges or {}).items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                lines += [f'# TYPE api_{name} gauge', f'api_{name} {value}']
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+SQL used by the REST API
+Kept in one place so the API handlers and the database setup checks
+(EXPLAIN QUERY PLAN verification) always see the same statements.
+"""
+
+import re
+
+# Product fields the API can return: field name -> select expression
+PRODUCT_FIELDS = {
+    'id': 'p.id',
+    'name': 'p.name',
+    'brand': 'p.brand',
+    'category': 'p.category',
+    'department': 'p.department',
+    'retail_price': 'p.retail_price',
+    'cost': 'p.cost',
+    'sku': 'p.sku',
+    'distribution_center': 'dc.name as distribution_center',
+    'dc_latitude': 'dc.latitude as dc_latitude',
+    'dc_longitude': 'dc.longitude as dc_longitude',
+}
+
+PRODUCT_COLUMNS = ",\n    ".join(PRODUCT_FIELDS.values())
+
+PRODUCT_FROM = """
+    FROM products p
+    LEFT JOIN distribution_centers dc ON p.distribution_center_id = dc.id
+"""
+
+PRODUCT_BY_ID_QUERY = f"""
+    SELECT {PRODUCT_COLUMNS}
+    {PRODUCT_FROM}
+    WHERE p.id = ?
+"""
+
+# Every product with its distribution center, for in-memory catalog snapshots
+CATALOG_SOURCE_QUERY = f"""
+    SELECT {PRODUCT_COLUMNS}
+    {PRODUCT_FROM}
+    ORDER BY p.id
+"""
+
+# Price sums of the summary tables, which the catalog engines divide by the
+# same counts as the summary queries so both return identical averages
+SUMMARY_PRICE_SUMS_QUERY = """
+    SELECT 'category', category, price_sum FROM category_stats
+    UNION ALL SELECT 'brand', brand, price_sum FROM brand_stats
+    UNION ALL SELECT 'department', department, price_sum FROM department_stats
+    UNION ALL SELECT 'catalog', NULL, price_sum FROM catalog_stats
+"""
+
+# Several products in one statement: ids are passed as a JSON array and each
+# one is looked up by primary key
+PRODUCTS_BY_IDS_QUERY = f"""
+    SELECT {PRODUCT_COLUMNS}
+    FROM json_each(?) ids
+    JOIN products p ON p.id = ids.value
+    LEFT JOIN distribution_centers dc ON p.distribution_center_id = dc.id
+"""
+
+# Stamp written by DatabaseSetup whenever catalog data is (re)loaded
+DATA_VERSION_QUERY = "SELECT value FROM catalog_meta WHERE key = 'data_version'"
+
+# The aggregate endpoints read the summary tables DatabaseSetup maintains
+# at load time instead of grouping the products table on every request
+CATEGORIES_QUERY = """
+    SELECT
+        category,
+        product_count,
+        price_sum / price_count as avg_price,
+        min_price,
+        max_price
+    FROM category_stats
+    ORDER BY product_count DESC, category
+"""
+
+BRANDS_QUERY = """
+    SELECT
+        brand,
+        product_count,
+        price_sum / price_count as avg_price
+    FROM brand_stats
+    WHERE product_count > 1
+    ORDER BY product_count DESC, brand
+    LIMIT 50
+"""
+
+STATS_QUERY = """
+    SELECT
+        s.product_count as total_products,
+        (SELECT COUNT(category) FROM category_stats) as unique_categories,
+        (SELECT COUNT(brand) FROM brand_stats) as unique_brands,
+        (SELECT COUNT(department) FROM department_stats) as departments,
+        s.price_sum / s.price_count as avg_price,
+        s.min_price,
+        s.max_price,
+        COALESCE((SELECT product_count FROM department_stats WHERE department = 'Men'), 0) as men_products,
+        COALESCE((SELECT product_count FROM department_stats WHERE department = 'Women'), 0) as women_products
+    FROM catalog_stats s
+"""
+
+# Autocomplete source: every product with its units sold (popularity weight)
+SUGGEST_SOURCE_QUERY = """
+    SELECT p.name, p.brand, p.category, s.sold
+    FROM products p
+    LEFT JOIN (
+        SELECT product_id, COUNT(*) as sold
+        FROM order_items
+        GROUP BY product_id
+    ) s ON s.product_id = p.id
+"""
+
+# Facet index source: one row per product in price order (NULL prices first),
+# so any price range is a contiguous run of rows
+FACET_SOURCE_QUERY = """
+    SELECT
+        p.id,
+        p.category,
+        p.brand,
+        p.department,
+        dc.name as distribution_center,
+        p.retail_price
+    FROM products p
+    LEFT JOIN distribution_centers dc ON p.distribution_center_id = dc.id
+    ORDER BY p.retail_price, p.id
+"""
+
+# Product ids matching a full-text search (MATCH expression from build_match_query)
+SEARCH_IDS_QUERY = "SELECT rowid FROM products_fts WHERE products_fts MATCH ?"
+
+# Named price ranges shown as a facet: name -> (lower bound, upper bound).
+# The lower bound is inclusive and the upper bound exclusive (None: unbounded)
+PRICE_BUCKETS = {
+    '0-50': (0, 50),
+    '50-100': (50, 100),
+    '100-200': (100, 200),
+    '200+': (200, None),
+}
+
+def build_match_query(search):
+    """
+    Turn free text into an FTS5 MATCH expression: every word must match, and
+    the last one is a prefix so partially typed words already find results.
+    Words are quoted so user input can never be parsed as FTS5 syntax.
+    """
+    terms = re.findall(r'\w+', search or '')
+    if not terms:
+        return None
+    quoted = ['"' + term.replace('"', '""') + '"' for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+def build_product_filters(category=None, brand=None, department=None,
+                          min_price=None, max_price=None, search=None, price_range=None):
+    """
+    Build the FROM/JOIN and WHERE clauses shared by the product listing and
+    count queries. A search joins the products_fts full-text index;
+    price_range is a PRICE_BUCKETS name.
+    """
+    joins = ""
+    clause = "WHERE 1=1"
+    params = []
+
+    match = build_match_query(search)
+    if match:
+        joins = "JOIN products_fts ON products_fts.rowid = p.id"
+        clause += " AND products_fts MATCH ?"
+        params.append(match)
+
+    if category:
+        clause += " AND p.category = ?"
+        params.append(category)
+
+    if brand:
+        clause += " AND p.brand = ?"
+        params.append(brand)
+
+    if department:
+        clause += " AND p.department = ?"
+        params.append(department)
+
+    if min_price is not None:
+        clause += " AND p.retail_price >= ?"
+        params.append(min_price)
+
+    if max_price is not None:
+        clause += " AND p.retail_price <= ?"
+        params.append(max_price)
+
+    if price_range:
+        low, high = PRICE_BUCKETS[price_range]
+        clause += " AND p.retail_price >= ?"
+        params.append(low)
+        if high is not None:
+            clause += " AND p.retail_price < ?"
+            params.append(high)
+
+    return joins, clause, params
+
+# Listing sort orders: name -> (sort key expression, direction, result column).
+# Every order ends with p.id so (sort key, id) is unique and can be used as a
+# keyset cursor. relevance is the BM25 rank (lower is better) and needs a search.
+# retail_price can be NULL: SQLite (and its indexes) order NULL before every
+# value, so NULL prices come first ascending and last descending, ordered by id.
+SORT_ORDERS = {
+    'id': ('p.id', 'ASC', 'id'),
+    'price_asc': ('p.retail_price', 'ASC', 'retail_price'),
+    'price_desc': ('p.retail_price', 'DESC', 'retail_price'),
+    'relevance': ('products_fts.rank', 'ASC', 'relevance'),
+}
+
+def sort_key(sort, row):
+    """The (sort key, id) tuple of a listing row, used to build cursors"""
+    column, _, result_column = SORT_ORDERS[sort]
+    if column == 'p.id':
+        return (row['id'],)
+    return (row[result_column], row['id'])
+
+def product_list_query(filters, limit, offset=0, sort='id', after=None, fields=None):
+    """
+    Paged product listing for the given filters.
+    With `after` (a sort_key tuple) the page starts right after that row
+    (keyset pagination) and the index seeks to it instead of using OFFSET.
+    A cursor whose page continues across the boundary between NULL and
+    priced rows reads both ranges, each with its own seek.
+    `fields` (names from PRODUCT_FIELDS) narrows the SELECT; the selected
+    fields come first in that order, followed by any sort key columns the
+    cursor needs that were not requested. The distribution_centers join is
+    skipped when none of its fields are selected.
+    """
+    column, direction, result_column = SORT_ORDERS[sort]
+    joins, clause, params = build_product_filters(**filters)
+    product_from = PRODUCT_FROM
+    if fields is None:
+        columns = PRODUCT_COLUMNS
+    else:
+        selected = list(fields)
+        for key_field in ('id', result_column):
+            if key_field in PRODUCT_FIELDS and key_field not in selected:
+                selected.append(key_field)
+        columns = ", ".join(PRODUCT_FIELDS[field] for field in selected)
+        if not any(PRODUCT_FIELDS[field].startswith('dc.') for field in selected):
+            product_from = "FROM products p"
+    if sort == 'relevance':
+        columns += f", {column} as {result_column}"
+
+    if column == 'p.id':
+        order = f"ORDER BY p.id {direction}"
+    else:
+        order = f"ORDER BY {column} {direction}, p.id {direction}"
+
+    # The rows after the cursor as (condition, params, order) segments, read in turn
+    segments = [("", [], order)]
+    if after is not None:
+        operator = '>' if direction == 'ASC' else '<'
+        if column == 'p.id':
+            segments = [(f" AND p.id {operator} ?", list(after), order)]
+        elif column != 'p.retail_price':
+            segments = [(f" AND ({column}, p.id) {operator} (?, ?)", list(after), order)]
+        elif after[0] is None:
+            # Rest of the NULL prices; ascending, every priced row follows
+            segments = [(f" AND {column} IS NULL AND p.id {operator} ?", [after[1]], f"ORDER BY p.id {direction}")]
+            if direction == 'ASC':
+                segments.append((f" AND {column} IS NOT NULL", [], order))
+        else:
+            # A row-value comparison with NULL is never true, so descending
+            # the NULL prices are a segment of their own after the priced rows
+            segments = [(f" AND ({column}, p.id) {operator} (?, ?)", list(after), order)]
+            if direction == 'DESC':
+                segments.append((f" AND {column} IS NULL", [], "ORDER BY p.id DESC"))
+
+    if len(segments) == 1:
+        condition, segment_params, order = segments[0]
+        query = f"""
+            SELECT {columns}
+            {product_from}
+            {joins}
+            {clause}{condition}
+            {order} LIMIT ? OFFSET ?
+        """
+        return query, params + segment_params + [limit, offset]
+
+    # Each segment seeks its own index range; UNION ALL returns them in order
+    segment_limit = -1 if limit < 0 else limit + offset
+    selects = []
+    all_params = []
+    for condition, segment_params, order in segments:
+        selects.append(f"""
+            SELECT * FROM (
+                SELECT {columns}
+                {product_from}
+                {joins}
+                {clause}{condition}
+                {order} LIMIT ?
+            )
+        """)
+        all_params += params + segment_params + [segment_limit]
+    query = "UNION ALL".join(selects) + "LIMIT ? OFFSET ?"
+    return query, all_params + [limit, offset]
+
+def product_count_query(filters):
+    """Total number of products matching the given filters"""
+    joins, clause, params = build_product_filters(**filters)
+    query = f"""
+        SELECT COUNT(*) as total
+        FROM products p
+        {joins}
+        {clause}
+    """
+    return query, params
+
+def hot_queries():
+    """
+    Representative API queries for EXPLAIN QUERY PLAN checks.
+    Returns (name, sql, params, allow_scan) tuples. A full scan of a covering
+    index and a full-text MATCH lookup are always acceptable; allow_scan additionally marks queries that
+    legitimately walk the whole table (unfiltered listing in rowid order,
+    the small precomputed summary tables).
+    """
+    shapes = [
+        ('list_all', {}, True),
+        ('list_category', {'category': 'Jeans'}, False),
+        ('list_brand', {'brand': 'Levi\'s'}, False),
+        ('list_department', {'department': 'Women'}, False),
+        ('list_price_range', {'min_price': 50.0, 'max_price': 100.0}, False),
+        ('list_price_bucket', {'price_range': '50-100'}, False),
+        ('list_category_price', {'category': 'Jeans', 'min_price': 50.0}, False),
+        ('list_brand_department', {'brand': 'Levi\'s', 'department': 'Men'}, False),
+        ('list_search', {'search': 'jean'}, False),
+        ('list_search_category', {'search': 'slim fit', 'category': 'Jeans'}, False),
+    ]
+
+    queries = []
+    for name, filters, allow_scan in shapes:
+        sql, params = product_list_query(filters, 20, 0)
+        queries.append((name, sql, params, allow_scan))
+        sql, params = product_count_query(filters)
+        queries.append((f"count_{name[5:]}", sql, params, allow_scan))
+
+    # Sparse fieldset used by the product grid
+    grid_fields = ['id', 'name', 'brand', 'category', 'retail_price']
+    sql, params = product_list_query({'category': 'Jeans'}, 20, fields=grid_fields)
+    queries.append(('list_category_fields', sql, params, False))
+
+    # Deep pages reached through a keyset cursor must seek, not scan
+    keyset_shapes = [
+        ('seek_all', {}, 'id', (20000,)),
+        ('seek_category', {'category': 'Jeans'}, 'id', (20000,)),
+        ('seek_price', {}, 'price_asc', (75.0, 20000)),
+        ('seek_category_price', {'category': 'Jeans'}, 'price_desc', (75.0, 20000)),
+        ('seek_search_relevance', {'search': 'jean'}, 'relevance', (-1.5, 20000)),
+        ('seek_price_null', {}, 'price_asc', (None, 20000)),
+    ]
+    for name, filters, sort, after in keyset_shapes:
+        sql, params = product_list_query(filters, 20, sort=sort, after=after)
+        queries.append((name, sql, params, False))
+
+    queries.extend([
+        ('product_by_id', PRODUCT_BY_ID_QUERY, [1], False),
+        ('products_by_ids', PRODUCTS_BY_IDS_QUERY, ['[1, 2, 3]'], False),
+        ('search_ids', SEARCH_IDS_QUERY, [build_match_query('jean')], False),
+        # Summary tables hold one row per category/brand/department
+        ('categories', CATEGORIES_QUERY, [], True),
+        ('brands', BRANDS_QUERY, [], True),
+        ('stats', STATS_QUERY, [], True),
+    ])
+    return queries
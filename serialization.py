@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+JSON Serialization
+Single encoder used for every API response. orjson is used when it is
+installed and the stdlib json module otherwise; both produce compact output
+with sorted keys, like Flask's default provider. Listing responses can also
+be stitched together from already-encoded per-product fragments. Time
+spent in the top-level encodes is reported to `encode_observer` when one is
+set (see metrics.py).
+"""
+
+import json
+import time
+from functools import wraps
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+ENCODER = 'orjson' if orjson is not None else 'json'
+
+# Handles dates, decimals, UUIDs and dataclasses the same way jsonify does
+_default = DefaultJSONProvider.default
+
+# Called with the seconds spent in each timed encode (set by metrics.init_app)
+encode_observer = None
+
+def timed_encode(func):
+    """Report the time spent in `func` to encode_observer"""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if encode_observer is None:
+            return func(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            encode_observer(time.perf_counter() - start)
+    return wrapper
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+
+    def dumps(obj):
+        """Encode `obj` as compact UTF-8 JSON bytes"""
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+
+    loads = orjson.loads
+else:
+    def dumps(obj):
+        """Encode `obj` as compact UTF-8 JSON bytes"""
+        return json.dumps(obj, default=_default, sort_keys=True,
+                          separators=(',', ':')).encode('utf-8')
+
+    loads = json.loads
+
+@timed_encode
+def encode_with_array(payload, key, fragments):
+    """
+    Encode `payload` with `payload[key]` set to a JSON array built from
+    already-encoded `fragments` (bytes). The array member is written first,
+    the other members follow in sorted order.
+    """
+    array = b'[' + b','.join(fragments) + b']'
+    rest = dumps({name: value for name, value in payload.items() if name != key})
+    if rest == b'{}':
+        return b'{' + dumps(key) + b':' + array + b'}'
+    return b'{' + dumps(key) + b':' + array + b',' + rest[1:]
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider that routes jsonify() through dumps(). Pretty-printed
+    output (debug mode or compact=False) still goes through the stdlib encoder.
+    """
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return dumps(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return loads(s)
+
+    @timed_encode
+    def response(self, *args, **kwargs):
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj), mimetype=self.mimetype)
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Production Server
+Runs the API with several worker processes, each with a pool of request
+threads, instead of Flask's single-process debug server. The application
+and the catalog snapshot (CATALOG_ENGINE=numpy|shared) are loaded once in
+the parent before it forks, so workers start warm and share the snapshot's
+pages. Each worker's connection pool is sized to its thread count. When the
+catalog data version changes (DatabaseSetup reloaded the data), the parent
+loads the new snapshot and replaces the workers one by one; in-flight
+requests finish on the old workers.
+
+Uses gunicorn (gthread workers) when it is installed (pip install gunicorn),
+otherwise a built-in pre-fork server whose workers run the asyncio server
+from asgi_app.py.
+
+Usage: python serve.py [--workers 4] [--threads 8] [--port 8000] [--server auto|gunicorn|builtin]
+Every option can also be set from the environment (see --help).
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import socket
+import sqlite3
+import sys
+import threading
+import time
+
+try:
+    import gunicorn.app.base
+except ImportError:  # optional dependency
+    gunicorn = None
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def parse_args(argv=None):
+    env = os.environ.get
+    parser = argparse.ArgumentParser(description='Run the E-commerce REST API with multiple workers')
+    parser.add_argument('--host', default=env('SERVER_HOST', '0.0.0.0'), help='interface to bind (SERVER_HOST)')
+    parser.add_argument('--port', type=int, default=int(env('SERVER_PORT', 8000)),
+                        help='port to listen on (SERVER_PORT)')
+    parser.add_argument('--workers', type=int, default=int(env('SERVER_WORKERS', os.cpu_count() or 1)),
+                        help='worker processes (SERVER_WORKERS, default: CPU count)')
+    parser.add_argument('--threads', type=int, default=int(env('SERVER_THREADS', 8)),
+                        help='request threads per worker; also the per-worker DB_POOL_SIZE unless that is set '
+                             '(SERVER_THREADS)')
+    parser.add_argument('--keepalive', type=float, default=float(env('KEEPALIVE_TIMEOUT', 5)),
+                        help='seconds an idle keep-alive connection is kept open (KEEPALIVE_TIMEOUT)')
+    parser.add_argument('--graceful-timeout', type=float, default=float(env('GRACEFUL_TIMEOUT', 30)),
+                        help='seconds a stopping worker may spend finishing requests (GRACEFUL_TIMEOUT)')
+    parser.add_argument('--reload-interval', type=float, default=float(env('DATA_RELOAD_INTERVAL', 10)),
+                        help='seconds between data version checks, 0 to disable (DATA_RELOAD_INTERVAL)')
+    parser.add_argument('--server', choices=('auto', 'gunicorn', 'builtin'), default=env('SERVER_BACKEND', 'auto'),
+                        help='gunicorn if installed (auto), or the built-in pre-fork server (SERVER_BACKEND)')
+    args = parser.parse_args(argv)
+    if args.workers < 1 or args.threads < 1:
+        parser.error('--workers and --threads must be at least 1')
+    return args
+
+def configure_environment(args):
+    """Settings app.py and asgi_app.py read at import time; call before importing them"""
+    os.environ.setdefault('DB_POOL_SIZE', str(args.threads))
+    os.environ['ASYNC_THREADS'] = str(args.threads)
+    os.environ['KEEPALIVE_TIMEOUT'] = str(args.keepalive)
+
+def read_data_version(database):
+    """Catalog data version from a short-lived read-only connection (never a pooled one)"""
+    from api_cache import current_data_version
+    from storage import database_uri
+    conn = sqlite3.connect(database_uri(database, 'readonly'), uri=True)
+    try:
+        return current_data_version(conn)
+    finally:
+        conn.close()
+
+def watch_data_version(database, interval, on_change):
+    """Call on_change() from a daemon thread whenever the data version changes"""
+
+    def watch():
+        version = read_data_version(database)
+        while True:
+            time.sleep(interval)
+            try:
+                latest = read_data_version(database)
+            except sqlite3.Error as e:
+                logger.warning(f"Data version check failed: {e}")
+                continue
+            if latest != version:
+                logger.info(f"Data version changed ({version} -> {latest}), reloading workers")
+                version = latest
+                on_change()
+
+    thread = threading.Thread(target=watch, name='data-version-watch', daemon=True)
+    thread.start()
+    return thread
+
+def preload():
+    """Load the app and its catalog snapshot in the parent; returns the Flask app"""
+    import app as api
+    catalog = api.preload_catalog()
+    if catalog is not None:
+        logger.info(f"Preloaded {api.CATALOG_ENGINE} catalog: {len(catalog)} products")
+    return api.app
+
+def reset_after_fork():
+    """Drop any pooled connection inherited from the parent"""
+    from app import db_pool
+    db_pool.close_all()
+
+async def _serve_worker(sock, graceful_timeout):
+    from asgi_app import application, start_builtin_server
+
+    loop = asyncio.get_running_loop()
+    stopping = asyncio.Event()
+    loop.add_signal_handler(signal.SIGTERM, stopping.set)
+    server = await start_builtin_server(application, sock=sock)
+    await stopping.wait()
+
+    # Stop accepting, then let admitted requests finish
+    server.close()
+    deadline = loop.time() + graceful_timeout
+    while application.executor.in_flight and loop.time() < deadline:
+        await asyncio.sleep(0.05)
+
+def run_worker(sock, graceful_timeout):
+    """Body of a built-in server worker process"""
+    # The parent handles Ctrl+C and reloads, and stops workers with SIGTERM
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    reset_after_fork()
+    asyncio.run(_serve_worker(sock, graceful_timeout))
+    from asgi_app import application
+    application.close()
+
+class PreforkServer:
+    """
+    Built-in pre-fork parent: binds the listening socket, preloads the app,
+    forks the workers (which share the socket), restarts workers that die,
+    and replaces all of them on SIGHUP or a data version change.
+    """
+
+    def __init__(self, args):
+        self.args = args
+        self.workers = set()
+        self.stopping = False
+        self.reload_requested = False
+
+    def spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                run_worker(self.sock, self.args.graceful_timeout)
+            except Exception as e:
+                logger.error(f"Worker {os.getpid()} failed: {e}")
+                code = 1
+            finally:
+                os._exit(code)
+        self.workers.add(pid)
+        return pid
+
+    def reap(self):
+        """Collect exited workers; replace any that exited on their own"""
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            if pid in self.workers:
+                self.workers.discard(pid)
+                if not self.stopping:
+                    logger.warning(f"Worker {pid} exited (status {status}), starting a new one")
+                    self.spawn()
+
+    def reload(self):
+        """Load the current catalog, then replace the workers one at a time"""
+        self.reload_requested = False
+        preload()
+        for pid in list(self.workers):
+            self.spawn()
+            self.workers.discard(pid)
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def stop(self):
+        for pid in self.workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + self.args.graceful_timeout
+        while time.monotonic() < deadline:
+            try:
+                os.waitpid(-1, os.WNOHANG)
+                time.sleep(0.05)
+            except ChildProcessError:
+                return
+        for pid in self.workers:
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+
+    def run(self):
+        from app import DATABASE
+
+        self.sock = socket.create_server((self.args.host, self.args.port), backlog=2048)
+        preload()
+        for _ in range(self.args.workers):
+            self.spawn()
+
+        def request_stop(signum, frame):
+            self.stopping = True
+
+        def request_reload(signum, frame):
+            self.reload_requested = True
+
+        signal.signal(signal.SIGTERM, request_stop)
+        signal.signal(signal.SIGINT, request_stop)
+        signal.signal(signal.SIGHUP, request_reload)
+        if self.args.reload_interval > 0:
+            watch_data_version(DATABASE, self.args.reload_interval,
+                               lambda: os.kill(os.getpid(), signal.SIGHUP))
+
+        try:
+            while not self.stopping:
+                time.sleep(0.2)
+                self.reap()
+                if self.reload_requested and not self.stopping:
+                    self.reload()
+        finally:
+            self.stop()
+            self.sock.close()
+
+def gunicorn_options(args):
+    from app import DATABASE
+
+    def when_ready(server):
+        if args.reload_interval > 0:
+            # gunicorn replaces its workers gracefully on SIGHUP
+            watch_data_version(DATABASE, args.reload_interval, lambda: os.kill(server.pid, signal.SIGHUP))
+
+    def on_reload(server):
+        preload()
+
+    def post_fork(server, worker):
+        reset_after_fork()
+
+    return {
+        'bind': f'{args.host}:{args.port}',
+        'workers': args.workers,
+        'threads': args.threads,
+        'worker_class': 'gthread',
+        'keepalive': int(args.keepalive),
+        'graceful_timeout': int(args.graceful_timeout),
+        'preload_app': True,
+        'when_ready': when_ready,
+        'on_reload': on_reload,
+        'post_fork': post_fork,
+    }
+
+if gunicorn is not None:
+    class GunicornServer(gunicorn.app.base.BaseApplication):
+        """gunicorn configured from serve.py options, loading (and preloading) app.py"""
+
+        def __init__(self, options):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return preload()
+
+def main(argv=None):
+    args = parse_args(argv)
+    configure_environment(args)
+
+    from app import DATABASE
+    if not os.path.exists(DATABASE):
+        print(f"❌ Database file '{DATABASE}' not found!")
+        print("Please run 'python init_database.py' first to create the database.")
+        return 1
+    if args.server == 'gunicorn' and gunicorn is None:
+        print("❌ gunicorn is not installed (pip install gunicorn)")
+        return 1
+
+    use_gunicorn = gunicorn is not None and args.server != 'builtin'
+    print(f"🚀 Starting E-commerce REST API ({'gunicorn' if use_gunicorn else 'built-in pre-fork server'})...")
+    print(f"📍 API will be available at: http://localhost:{args.port}")
+    print(f"🔧 {args.workers} workers x {args.threads} threads, "
+          f"DB pool {os.environ['DB_POOL_SIZE']} connections per worker")
+
+    if use_gunicorn:
+        GunicornServer(gunicorn_options(args)).run()
+    else:
+        PreforkServer(args).run()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Shared Catalog Snapshot
+Read-only catalog segment shared by every worker process. The catalog is
+written once per data version to a flat binary file (fixed-width NumPy
+columns, strings as one UTF-8 blob plus offsets) and memory-mapped.
+Workers read it through array views, with no per-row Python objects, so the
+mapped pages stay shared in the OS page cache instead of being copied by
+refcount updates after fork. Enabled with CATALOG_ENGINE=shared (see app.py).
+
+File layout: 8-byte magic, 8-byte little-endian header length, JSON header
+(which also carries the summary table price sums), then the arrays, each
+aligned to 64 bytes at the offset the header records.
+"""
+
+import glob
+import json
+import logging
+import mmap
+import os
+
+import numpy as np
+
+from api_cache import current_data_version
+from catalog_engine import ENCODED_COLUMNS, ColumnarCatalog
+from index_service import IndexService
+
+logger = logging.getLogger(__name__)
+
+# Bumped with the file layout; it is part of the file name, so snapshots
+# written in an older layout are rebuilt rather than mapped
+SNAPSHOT_FORMAT = 2
+MAGIC = f'CATSNAP{SNAPSHOT_FORMAT}'.encode()
+ALIGNMENT = 64
+TEXT_COLUMNS = ('name', 'sku')
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+def _pack_strings(values):
+    """(offsets, utf-8 blob, null flags) for a sequence of str/None"""
+    encoded = [b'' if value is None else value.encode('utf-8') for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    nulls = np.array([value is None for value in values], dtype=np.uint8)
+    return offsets, np.frombuffer(b''.join(encoded), dtype=np.uint8), nulls
+
+def snapshot_path(directory, version):
+    return os.path.join(directory, f"catalog-{version}-v{SNAPSHOT_FORMAT}.bin")
+
+def write_snapshot(catalog, path, version):
+    """Write a ColumnarCatalog to `path` atomically (temp file + rename)"""
+    arrays = {
+        'ids': catalog.ids,
+        'prices': catalog.prices,
+        'costs': catalog.costs,
+        'price_keys': catalog.price_keys,
+        'priced': catalog.priced,
+        'order_id': catalog.orders['id'],
+        'order_price': catalog.orders['price_asc'],
+    }
+    for column in ENCODED_COLUMNS:
+        arrays[f'codes_{column}'] = catalog.codes[column]
+        offsets, blob, _ = _pack_strings(catalog.lookups[column][:-1])
+        arrays[f'lookup_{column}_offsets'], arrays[f'lookup_{column}_data'] = offsets, blob
+    for column, values in (('name', catalog.names), ('sku', catalog.skus)):
+        (arrays[f'text_{column}_offsets'], arrays[f'text_{column}_data'],
+         arrays[f'text_{column}_nulls']) = _pack_strings(values)
+    for i, column in enumerate(('dc_latitude', 'dc_longitude')):
+        coordinates = catalog.dc_coordinates[i][:-1]
+        arrays[column] = np.array([np.nan if value is None else value for value in coordinates],
+                                  dtype=np.float64)
+
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        arrays[name] = array
+        layout[name] = [array.dtype.str, offset, len(array)]
+        offset = _align(offset + array.nbytes)
+    # Summary table price sums (a few thousand values at most) go in the header
+    price_sums = {column: list(sums.items()) for column, sums in catalog.price_sums.items()}
+    header = json.dumps({'version': version, 'size': catalog.size, 'arrays': layout,
+                         'price_sums': price_sums}).encode()
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    temp_path = f"{path}.tmp-{os.getpid()}"
+    base = _align(16 + len(header))
+    with open(temp_path, 'wb') as f:
+        f.write(MAGIC + len(header).to_bytes(8, 'little') + header)
+        for name, array in arrays.items():
+            f.seek(base + layout[name][1])
+            f.write(array.tobytes())
+        f.truncate(base + offset)
+    os.replace(temp_path, path)
+
+class SharedCatalog(ColumnarCatalog):
+    """ColumnarCatalog whose columns are read-only views of a mapped snapshot file"""
+
+    @classmethod
+    def open(cls, path):
+        self = cls.__new__(cls)
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:8] != MAGIC:
+            raise ValueError(f"{path} is not a catalog snapshot")
+        header_length = int.from_bytes(self._mmap[8:16], 'little')
+        header = json.loads(self._mmap[16:16 + header_length])
+        base = _align(16 + header_length)
+
+        arrays = {}
+        for name, (dtype, offset, count) in header['arrays'].items():
+            if count:
+                arrays[name] = np.frombuffer(self._mmap, dtype=dtype, count=count, offset=base + offset)
+            else:
+                arrays[name] = np.empty(0, dtype=dtype)
+
+        self.path = path
+        self.version = header['version']
+        self.size = header['size']
+        self.price_sums = {column: dict(sums) for column, sums in header['price_sums'].items()}
+        self.ids = arrays['ids']
+        self.prices = arrays['prices']
+        self.costs = arrays['costs']
+        self.price_keys = arrays['price_keys']
+        self.priced = arrays['priced']
+        self.orders = {
+            'id': arrays['order_id'],
+            'price_asc': arrays['order_price'],
+            'price_desc': arrays['order_price'][::-1],
+        }
+        self.names = self.skus = None
+        self._texts = {
+            column: (arrays[f'text_{column}_offsets'], arrays[f'text_{column}_nulls'], base + header['arrays'][f'text_{column}_data'][1])
+            for column in TEXT_COLUMNS
+        }
+
+        # Dictionaries are small; they are decoded into per-process objects
+        self.codes = {}
+        self.lookups = {}
+        for column in ENCODED_COLUMNS:
+            self.codes[column] = arrays[f'codes_{column}']
+            offsets = arrays[f'lookup_{column}_offsets'].tolist()
+            data = arrays[f'lookup_{column}_data'].tobytes()
+            lookup = np.empty(len(offsets), dtype=object)
+            lookup[:-1] = [data[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(len(offsets) - 1)]
+            lookup[-1] = None
+            self.lookups[column] = lookup
+        self.dc_coordinates = []
+        for column in ('dc_latitude', 'dc_longitude'):
+            coordinates = np.empty(len(arrays[column]) + 1, dtype=object)
+            coordinates[:-1] = [None if value != value else value for value in arrays[column].tolist()]
+            coordinates[-1] = None
+            self.dc_coordinates.append(coordinates)
+
+        self._index_values()
+        return self
+
+    def _text(self, name, page):
+        offsets, nulls, data_start = self._texts[name]
+        starts = offsets[page].tolist()
+        ends = offsets[page + 1].tolist()
+        null_flags = nulls[page].tolist()
+        buffer = self._mmap
+        return [
+            None if null else buffer[data_start + start:data_start + end].decode('utf-8')
+            for start, end, null in zip(starts, ends, null_flags)
+        ]
+
+    @classmethod
+    def from_database(cls, conn, directory):
+        """
+        Map the snapshot of the database's current data version, writing it
+        first if no process has yet; snapshots of older versions are removed
+        """
+        version = current_data_version(conn)
+        path = snapshot_path(directory, version)
+        if not os.path.exists(path):
+            write_snapshot(ColumnarCatalog.from_database(conn), path, version)
+            for old_path in glob.glob(os.path.join(directory, 'catalog-*.bin')):
+                if old_path != path:
+                    try:
+                        # Processes that still map an old snapshot keep its pages
+                        os.remove(old_path)
+                    except OSError as e:
+                        logger.warning(f"Could not remove old catalog snapshot {old_path}: {e}")
+        return cls.open(path)
+
+class SharedCatalogService(IndexService):
+    """Keeps the mapped SharedCatalog current with the catalog data version"""
+
+    def __init__(self, connection_factory, directory):
+        super().__init__(lambda conn: SharedCatalog.from_database(conn, directory),
+                         connection_factory, 'Shared catalog')
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Storage Profile
+SQLite settings for the serving database. After a load, DatabaseSetup
+switches the file to WAL journaling, so API readers and a reload writer
+never block each other. It also checkpoints the WAL so the main file is
+complete on its own. Serving connections memory-map the file (mmap_size
+sized to it), use a larger page cache and keep temporary b-trees in
+memory. They are opened read-only, or immutable when the data is frozen:
+no locking or change detection at all, which is only safe while nothing
+writes to the file.
+"""
+
+import os
+from urllib.parse import quote
+
+# How the API opens the database: readwrite (plain path), readonly
+# (mode=ro) or immutable (mode=ro&immutable=1, frozen files only)
+OPEN_MODES = ('readwrite', 'readonly', 'immutable')
+
+# Page cache per serving connection, in KiB (SQLite's default is 2 MB)
+SERVING_CACHE_KIB = 65536
+
+# Memory map the whole file plus room for it to grow by a reload, up to
+# SQLite's default compile-time limit (SQLITE_MAX_MMAP_SIZE)
+MMAP_HEADROOM = 1.25
+MAX_MMAP_SIZE = 0x7fff0000
+
+def database_uri(path, mode='readwrite'):
+    """sqlite3.connect(..., uri=True) target for opening `path` in `mode`"""
+    if mode not in OPEN_MODES:
+        raise ValueError(f"Database open mode must be one of {', '.join(OPEN_MODES)}, not {mode!r}")
+    uri = f"file:{quote(os.path.abspath(path))}"
+    if mode == 'readonly':
+        uri += '?mode=ro'
+    elif mode == 'immutable':
+        uri += '?mode=ro&immutable=1'
+    return uri
+
+def mmap_size_for(path):
+    """Bytes to memory-map for `path`: its size plus headroom, capped"""
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        size = 0
+    return min(int(size * MMAP_HEADROOM), MAX_MMAP_SIZE)
+
+def serving_pragmas(path, cache_kib=SERVING_CACHE_KIB, mmap_size=None):
+    """Per-connection PRAGMAs for API readers of `path`"""
+    return {
+        'mmap_size': mmap_size_for(path) if mmap_size is None else mmap_size,
+        'cache_size': -cache_kib,
+        'temp_store': 'MEMORY',
+    }
+
+def apply_pragmas(conn, pragmas):
+    for pragma, value in pragmas.items():
+        conn.execute(f"PRAGMA {pragma} = {value}")
+
+def enable_wal(conn):
+    """
+    Switch the database behind `conn` to WAL journaling (a persistent
+    property of the file) and checkpoint it into the main file. Returns the
+    journal mode in effect; it stays unchanged if other connections are open.
+    """
+    mode = conn.execute("PRAGMA journal_mode = WAL").fetchone()[0]
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return mode
+
+def remove_database(path):
+    """Delete a database file along with its WAL, shared-memory and journal files"""
+    for suffix in ('', '-wal', '-shm', '-journal'):
+        try:
+            os.remove(path + suffix)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Autocomplete Index
+In-memory prefix index over product names, brands and categories used by
+GET /api/products/suggest. Lookups are a binary search over a sorted array
+of word-start offsets into one lowercase text blob, so the index holds a
+few flat arrays instead of a trie of Python objects.
+"""
+
+import heapq
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+
+from index_service import IndexService
+from queries import SUGGEST_SOURCE_QUERY
+
+KINDS = ('product', 'brand', 'category')
+
+def normalize(text):
+    """Lowercase and collapse punctuation/whitespace runs to single spaces"""
+    return ' '.join(re.split(r'[\W_]+', text.lower())).strip()
+
+class SuggestIndex:
+    """
+    Immutable prefix index. Every word of every suggestion is searchable, so
+    "jea" completes "Levi's Jeans" as well as "Jeans", and multi-word input
+    ("levi je") must match a word prefix for each word. Suggestions are
+    ranked by popularity weight.
+    """
+
+    # Prefixes this short match too many entries to rank per lookup;
+    # their top results are computed once at build time
+    PRECOMPUTED_PREFIX_LENGTH = 2
+    MAX_RESULTS = 20
+
+    def __init__(self, suggestions):
+        """suggestions: iterable of (label, kind, weight)"""
+        merged = {}
+        for label, kind, weight in suggestions:
+            if not label:
+                continue
+            key = (label, kind)
+            merged[key] = merged.get(key, 0) + weight
+
+        self.labels = []
+        self.kinds = array('B')
+        self.weights = array('d')
+        self.starts = array('I')
+        parts = []
+        position = 0
+        # Entries are numbered in ranking order (heaviest first), so ranking
+        # candidates is a plain integer sort
+        ranked = sorted(merged.items(), key=lambda item: (-item[1], item[0][0]))
+        for (label, kind), weight in ranked:
+            normalized = normalize(label)
+            if not normalized:
+                continue
+            self.labels.append(label)
+            self.kinds.append(KINDS.index(kind))
+            self.weights.append(weight)
+            self.starts.append(position)
+            parts.append(normalized)
+            position += len(normalized) + 1
+        self.starts.append(position)
+        # Normalized suggestions joined by newlines; words are separated by
+        # single spaces, so a word starts at offset 0 or right after a space
+        self.text = '\n'.join(parts) + '\n'
+
+        # Offsets of every word start, sorted by the text that follows them
+        word_offsets = []
+        word_entries = []
+        for entry, normalized in enumerate(parts):
+            start = self.starts[entry]
+            word_offsets.append(start)
+            word_entries.append(entry)
+            for i, char in enumerate(normalized):
+                if char == ' ':
+                    word_offsets.append(start + i + 1)
+                    word_entries.append(entry)
+        order = sorted(range(len(word_offsets)),
+                       key=lambda i: self.text[word_offsets[i]:word_offsets[i] + 48])
+        self.word_offsets = array('I', (word_offsets[i] for i in order))
+        self.word_entries = array('I', (word_entries[i] for i in order))
+
+        self._precomputed = {}
+        for length in range(1, self.PRECOMPUTED_PREFIX_LENGTH + 1):
+            prefixes = {self.text[offset:offset + length] for offset in self.word_offsets}
+            for prefix in prefixes:
+                if len(prefix) == length and normalize(prefix) == prefix:
+                    self._precomputed[prefix] = tuple(self._rank(prefix, self.MAX_RESULTS))
+
+    def __len__(self):
+        return len(self.labels)
+
+    def _range(self, prefix):
+        size = len(prefix)
+        key = lambda offset: self.text[offset:offset + size]
+        return (bisect_left(self.word_offsets, prefix, key=key),
+                bisect_right(self.word_offsets, prefix, key=key))
+
+    def _entry_text(self, entry):
+        return self.text[self.starts[entry]:self.starts[entry + 1] - 1]
+
+    def _rank(self, query, limit):
+        words = query.split(' ')
+        # Candidates come from the word with the fewest matches; every other
+        # word must then appear as a word prefix in the candidate
+        ranges = sorted((self._range(word) for word in words), key=lambda r: r[1] - r[0])
+        low, high = ranges[0]
+        entries = set(self.word_entries[low:high])
+        if len(words) == 1:
+            return heapq.nsmallest(limit, entries)
+        needles = [' ' + word for word in words]
+        matches = []
+        for entry in sorted(entries):
+            if all(needle in ' ' + self._entry_text(entry) for needle in needles):
+                matches.append(entry)
+                if len(matches) == limit:
+                    break
+        return matches
+
+    def lookup(self, prefix, limit=8):
+        """Top `limit` suggestions with a word starting with each word of `prefix`"""
+        query = normalize(prefix)
+        if not query:
+            return []
+        limit = min(limit, self.MAX_RESULTS)
+        entries = self._precomputed.get(query)
+        if entries is None:
+            entries = self._rank(query, limit)
+        return [
+            {
+                'text': self.labels[entry],
+                'type': KINDS[self.kinds[entry]],
+                'score': self.weights[entry]
+            }
+            for entry in entries[:limit]
+        ]
+
+    @classmethod
+    def from_database(cls, conn):
+        """Build from products, weighting each suggestion by units sold"""
+        suggestions = []
+        for name, brand, category, sold in conn.execute(SUGGEST_SOURCE_QUERY):
+            weight = 1 + (sold or 0)
+            suggestions.append((name, 'product', weight))
+            suggestions.append((brand, 'brand', weight))
+            suggestions.append((category, 'category', weight))
+        return cls(suggestions)
+
+class SuggestService(IndexService):
+    """Keeps a SuggestIndex current with the catalog data version"""
+
+    def __init__(self, connection_factory):
+        super().__init__(SuggestIndex.from_database, connection_factory, 'Suggest index')
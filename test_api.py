@@ -55,6 +55,25 @@ def test_endpoint(endpoint, description, expected_status=200):
     
     print("-" * 60)
 
+def test_facets_contract():
+    """Check the facet payload shape the frontend reads (js/app.js refreshFacets)"""
+    print("\n🔍 Testing: Facet Response Contract")
+    try:
+        body = requests.get(f"{BASE_URL}/api/products/facets?limit=5").json()
+        facets = body['data']['facets']
+        problems = [name for name in ('category', 'brand', 'price_range')
+                    if not isinstance(facets.get(name), list)
+                    or not all(set(entry) == {'value', 'count'} for entry in facets[name])]
+        if body.get('success') is True and not problems:
+            print("✅ Status: PASS (data.facets.category/brand/price_range are [{value, count}] lists)")
+        else:
+            print(f"❌ Status: FAIL (unexpected shape for: {', '.join(problems) or 'success'})")
+    except requests.exceptions.ConnectionError:
+        print("❌ Connection Error: Make sure the API server is running")
+    except (KeyError, TypeError, ValueError) as e:
+        print(f"❌ Status: FAIL (missing {e} in the facet response)")
+    print("-" * 60)
+
 def test_api():
     """Run all API tests"""
     print("🚀 E-commerce REST API - Milestone 2 Testing")
@@ -70,12 +89,25 @@ def test_api():
     
     # Test products endpoint with pagination
     test_endpoint("/api/products?page=1&limit=5", "Get Products with Pagination")
+    test_endpoint("/api/products?limit=0", "Get Products with Invalid Limit", 400)
     
     # Test products endpoint with filters
     test_endpoint("/api/products?category=Jeans&limit=3", "Get Products by Category")
     test_endpoint("/api/products?department=Women&limit=3", "Get Products by Department")
     test_endpoint("/api/products?min_price=50&max_price=100&limit=3", "Get Products by Price Range")
     
+    # Test sorted listing and invalid cursor handling
+    test_endpoint("/api/products?sort=price_desc&limit=3", "Get Products Sorted by Price")
+    test_endpoint("/api/products?cursor=not-a-cursor", "Get Products with Invalid Cursor", 400)
+    
+    # Test full-text search
+    test_endpoint("/api/products?search=jeans&limit=3", "Search Products")
+    test_endpoint("/api/products?search=levi&category=Jeans&limit=3", "Search Products within a Category")
+    
+    # Test count modes
+    test_endpoint("/api/products?category=Jeans&count=estimate&limit=3", "Get Products with Estimated Count")
+    test_endpoint("/api/products?count=none&limit=3", "Get Products without Total Count")
+    
     # Test specific product endpoint
     test_endpoint("/api/products/1", "Get Product by ID (Valid)")
     test_endpoint("/api/products/99999", "Get Product by ID (Invalid)", 404)
@@ -89,6 +121,33 @@ def test_api():
     # Test stats endpoint
     test_endpoint("/api/products/stats", "Get Product Statistics")
     
+    # Test sparse fieldsets and columnar format
+    test_endpoint("/api/products?fields=id,name,retail_price", "Get Products with Sparse Fieldset")
+    test_endpoint("/api/products?fields=id,name&format=columns", "Get Products in Columnar Format")
+    test_endpoint("/api/products?fields=bogus", "Get Products with Invalid Fields", 400)
+    
+    # Test named price buckets
+    test_endpoint("/api/products?price_range=50-100", "Get Products in Price Bucket")
+    test_endpoint("/api/products?price_range=cheap", "Get Products with Invalid Price Bucket", 400)
+    
+    # Test facet counts
+    test_endpoint("/api/products/facets", "Get Facet Counts")
+    test_endpoint("/api/products/facets?department=Women&min_price=20", "Get Facet Counts with Filters")
+    test_facets_contract()
+    
+    # Test batch product lookup
+    test_endpoint("/api/products/batch?ids=1,2,999999", "Get Products by ID Batch")
+    test_endpoint("/api/products/batch?ids=1,abc", "Get Products Batch with Invalid IDs", 400)
+    
+    # Test export endpoint format validation
+    test_endpoint("/api/products/export?format=xml", "Export Products with Invalid Format", 400)
+    
+    # Test autocomplete endpoint
+    test_endpoint("/api/products/suggest?q=jea", "Get Autocomplete Suggestions")
+    
+    # Test connection pool metrics endpoint
+    test_endpoint("/api/pool/stats", "Get Connection Pool Metrics")
+    
     # Test error handling
     test_endpoint("/api/nonexistent", "Non-existent Endpoint", 404)
     
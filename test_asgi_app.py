@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Tests for the asyncio server adapter: streamed responses (stream_with_context)
+must work when their chunks are produced on different handler threads.
+Run with: python test_asgi_app.py (or pytest)
+"""
+
+import asyncio
+import threading
+
+from flask import Flask, request, stream_with_context
+
+from asgi_app import AsyncAPI, BoundedExecutor
+
+CHUNKS = 50
+
+def streaming_app():
+    app = Flask(__name__)
+
+    @app.route('/stream')
+    def stream():
+        def generate():
+            for i in range(CHUNKS):
+                # Touches the request context on every step
+                yield f"{request.args['tag']}:{i}:{threading.get_ident()}\n"
+        return app.response_class(stream_with_context(generate()), mimetype='text/plain')
+
+    return app
+
+async def fetch(api, tag):
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+        # Let other requests take turns so chunks land on different threads
+        await asyncio.sleep(0)
+
+    scope = {'type': 'http', 'method': 'GET', 'path': '/stream', 'query_string': f'tag={tag}'.encode(),
+             'headers': [], 'http_version': '1.1'}
+    await api(scope, receive, send)
+    body = b''.join(message.get('body', b'') for message in messages[1:]).decode()
+    return messages[0]['status'], body.splitlines()
+
+def test_streamed_response_across_threads():
+    executor = BoundedExecutor(8, 16)
+    api = AsyncAPI(streaming_app(), executor)
+
+    async def run():
+        return await asyncio.gather(*(fetch(api, tag) for tag in range(8)))
+
+    try:
+        results = asyncio.run(run())
+    finally:
+        executor.shutdown()
+    threads = set()
+    for tag, (status, lines) in enumerate(results):
+        assert status == 200
+        assert [line.rsplit(':', 1)[0] for line in lines] == [f'{tag}:{i}' for i in range(CHUNKS)]
+        threads.update(line.rsplit(':', 1)[1] for line in lines)
+    # The point of the test: chunks of a response were produced on several threads
+    assert len(threads) > 1
+
+if __name__ == '__main__':
+    test_streamed_response_across_threads()
+    print("✅ test_streamed_response_across_threads")
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Tests for the columnar catalog engines: every cursor page, count and
+statistic they answer must equal SQLite's, including for products without
+a price.
+Run with: python test_catalog_engine.py (or pytest)
+"""
+
+import sqlite3
+import tempfile
+
+from catalog_engine import ColumnarCatalog
+from database_setup import DatabaseSetup
+from queries import BRANDS_QUERY, CATEGORIES_QUERY, STATS_QUERY, product_count_query, product_list_query
+from shared_catalog import SharedCatalog, snapshot_path, write_snapshot
+from test_queries import LISTINGS, PAGE_SIZE, build_database, sqlite_page, walk_pages
+
+def engine_page(catalog, filters, sort, after):
+    return catalog.query(filters, PAGE_SIZE + 1, sort=sort, after=after)
+
+def check_listings(conn, catalog):
+    for filters, sort in LISTINGS:
+        expected = walk_pages(lambda after: sqlite_page(conn, filters, sort, after), sort)
+        ids = walk_pages(lambda after: engine_page(catalog, filters, sort, after), sort)
+        assert ids == expected, (filters, sort)
+        # Same columns and values as SQLite for the whole listing
+        query, params = product_list_query(filters, -1, sort=sort)
+        cursor = conn.execute(query, params)
+        names = [column[0] for column in cursor.description]
+        assert catalog.query(filters, -1, sort=sort) == (names, cursor.fetchall()), (filters, sort)
+        query, params = product_count_query(filters)
+        assert catalog.count(filters) == conn.execute(query, params).fetchone()[0], filters
+
+def test_columnar_catalog_matches_sqlite():
+    with tempfile.TemporaryDirectory() as directory:
+        conn = sqlite3.connect(build_database(directory))
+        try:
+            check_listings(conn, ColumnarCatalog.from_database(conn))
+        finally:
+            conn.close()
+
+def test_shared_catalog_matches_sqlite():
+    with tempfile.TemporaryDirectory() as directory:
+        conn = sqlite3.connect(build_database(directory))
+        try:
+            path = snapshot_path(directory, 1)
+            write_snapshot(ColumnarCatalog.from_database(conn), path, 1)
+            check_listings(conn, SharedCatalog.open(path))
+        finally:
+            conn.close()
+
+def sqlite_rows(conn, query):
+    cursor = conn.execute(query)
+    names = [column[0] for column in cursor.description]
+    return [dict(zip(names, row)) for row in cursor]
+
+def sqlite_stats(conn):
+    return sqlite_rows(conn, STATS_QUERY)[0]
+
+def test_aggregates_match_sqlite():
+    """Averages are the same floats in every engine (response bytes and ETags depend on them)"""
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = build_database(directory)
+        conn = sqlite3.connect(db_path)
+        try:
+            # Prices whose sums depend on the order they are added in
+            conn.execute("UPDATE products SET retail_price = retail_price + id * 0.01 + 0.003")
+            conn.commit()
+            DatabaseSetup(db_path).refresh_aggregates()
+            catalog = ColumnarCatalog.from_database(conn)
+            path = snapshot_path(directory, 1)
+            write_snapshot(catalog, path, 1)
+            for engine in (catalog, SharedCatalog.open(path)):
+                assert engine.stats() == sqlite_stats(conn)
+                assert engine.categories() == sqlite_rows(conn, CATEGORIES_QUERY)
+                assert engine.brands() == sqlite_rows(conn, BRANDS_QUERY)
+        finally:
+            conn.close()
+
+def test_stats_without_a_department():
+    """A department with no products counts 0, not NULL, in both engines"""
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = build_database(directory)
+        conn = sqlite3.connect(db_path)
+        try:
+            conn.execute("DELETE FROM products WHERE department = 'Men'")
+            conn.commit()
+            DatabaseSetup(db_path).refresh_aggregates()
+            stats = sqlite_stats(conn)
+            assert stats['men_products'] == 0 and stats['women_products'] > 0, stats
+            catalog_stats = ColumnarCatalog.from_database(conn).stats()
+            assert (catalog_stats['men_products'], catalog_stats['women_products']) == (0, stats['women_products'])
+        finally:
+            conn.close()
+
+if __name__ == '__main__':
+    for test in (test_columnar_catalog_matches_sqlite, test_shared_catalog_matches_sqlite,
+                 test_aggregates_match_sqlite, test_stats_without_a_department):
+        test()
+        print(f"✅ {test.__name__}")
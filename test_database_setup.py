@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Tests for the parallel CSV loader: a failing writer or parser must abort
+the load with its error instead of leaving the other parsers blocked on the
+full queue, and a load must finish when several files feed one table.
+Run with: python test_database_setup.py (or pytest)
+"""
+
+import csv
+import os
+import sqlite3
+import tempfile
+import threading
+
+from database_setup import DatabaseSetup
+
+# Seconds a failing load may take before it counts as hung
+LOAD_TIMEOUT = 60
+
+PRODUCT_HEADER = ['id', 'cost', 'category', 'name', 'brand', 'retail_price', 'department', 'sku',
+                  'distribution_center_id']
+
+def write_products(path, ids, extra_row=None):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(PRODUCT_HEADER)
+        for product_id in ids:
+            writer.writerow([product_id, 5.0, 'Jeans', f'Jean {product_id}', 'Acme', 20.0, 'Women', f'S{product_id}', 1])
+        if extra_row:
+            writer.writerow(extra_row)
+
+def write_users(path, count):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['id', 'first_name', 'email'])
+        writer.writerows((i, f'First{i}', f'user{i}@example.com') for i in range(1, count + 1))
+
+def run_load(csv_files, directory):
+    """Load csv_files in a thread with tiny chunks; returns the exception raised (None if none)"""
+    db_path = os.path.join(directory, 'test.db')
+    setup = DatabaseSetup(db_path)
+    setup.create_tables()
+    outcome = {}
+
+    def load():
+        try:
+            setup.load_csv_files_parallel(csv_files, workers=2, chunk_size=10)
+        except Exception as e:
+            outcome['error'] = e
+
+    thread = threading.Thread(target=load, daemon=True)
+    thread.start()
+    thread.join(LOAD_TIMEOUT)
+    assert not thread.is_alive(), f"load did not finish within {LOAD_TIMEOUT}s"
+    return outcome.get('error')
+
+def test_duplicate_key_aborts_load():
+    """An IntegrityError in the writer stops the parsers and is raised"""
+    with tempfile.TemporaryDirectory() as directory:
+        products = os.path.join(directory, 'products.csv')
+        users = os.path.join(directory, 'users.csv')
+        write_products(products, [1, 2, 3, 3] + list(range(4, 2000)))
+        write_users(users, 20000)
+        error = run_load({products: 'products', users: 'users'}, directory)
+        assert isinstance(error, sqlite3.IntegrityError), repr(error)
+
+def test_parse_error_aborts_load():
+    """A parser that fails stops the others and its error is raised"""
+    with tempfile.TemporaryDirectory() as directory:
+        products = os.path.join(directory, 'products.csv')
+        users = os.path.join(directory, 'users.csv')
+        write_products(products, range(1, 2000), extra_row=list(range(20)))
+        write_users(users, 20000)
+        error = run_load({products: 'products', users: 'users'}, directory)
+        assert error is not None and not isinstance(error, sqlite3.IntegrityError), repr(error)
+
+def test_clean_load():
+    with tempfile.TemporaryDirectory() as directory:
+        products = os.path.join(directory, 'products.csv')
+        write_products(products, range(1, 500))
+        assert run_load({products: 'products'}, directory) is None
+        conn = sqlite3.connect(os.path.join(directory, 'test.db'))
+        try:
+            assert conn.execute("SELECT COUNT(*) FROM products").fetchone()[0] == 499
+        finally:
+            conn.close()
+
+def test_two_files_for_one_table():
+    """Every file's end marker is counted, not one per table"""
+    with tempfile.TemporaryDirectory() as directory:
+        first = os.path.join(directory, 'products.csv')
+        second = os.path.join(directory, 'more_products.csv')
+        write_products(first, range(1, 500))
+        write_products(second, range(500, 800))
+        assert run_load({first: 'products', second: 'products'}, directory) is None
+        conn = sqlite3.connect(os.path.join(directory, 'test.db'))
+        try:
+            assert conn.execute("SELECT COUNT(*) FROM products").fetchone()[0] == 799
+        finally:
+            conn.close()
+
+if __name__ == '__main__':
+    for test in (test_duplicate_key_aborts_load, test_parse_error_aborts_load, test_clean_load,
+                 test_two_files_for_one_table):
+        test()
+        print(f"✅ {test.__name__}")
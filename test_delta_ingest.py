@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Tests for delta ingestion: after appending to and editing a loaded CSV, the
+in-place ingest must leave the summary tables and the search index exactly
+as a full rebuild would, and report what it inserted, reinserted and updated.
+Run with: python test_delta_ingest.py (or pytest)
+"""
+
+import csv
+import os
+import sqlite3
+import tempfile
+
+from database_setup import AGGREGATE_TABLES, DatabaseSetup
+from delta_ingest import ingest_delta
+from test_queries import PRODUCT_HEADER, build_database
+
+SEARCH_TERMS = ['item', 'acme', 'levi', 'jeans', 'hats', 'zebra', 'renamed', '"item 10"']
+
+def append_rows(path, rows, header=False):
+    with open(path, 'a', newline='') as f:
+        writer = csv.writer(f)
+        if header:
+            writer.writerow(PRODUCT_HEADER)
+        writer.writerows(rows)
+
+def product(product_id, price=30.0, category='Hats', name=None, brand='Acme'):
+    return [product_id, 5.0, category, name or f'Item {product_id}', brand, price, 'Women', f'S{product_id}', 1]
+
+def aggregate_rows(conn):
+    return {table: sorted(conn.execute(f"SELECT * FROM {table}").fetchall(), key=repr)
+            for table in AGGREGATE_TABLES}
+
+def search_results(conn):
+    return {term: [row[0] for row in conn.execute(
+        "SELECT rowid FROM products_fts WHERE products_fts MATCH ? ORDER BY rowid", (term,))]
+        for term in SEARCH_TERMS}
+
+def assert_same_aggregates(actual, expected):
+    for table in AGGREGATE_TABLES:
+        assert len(actual[table]) == len(expected[table]), table
+        for row, full in zip(actual[table], expected[table]):
+            # price_sum is adjusted incrementally, so allow rounding differences
+            assert row[:3] == full[:3] and abs(row[3] - full[3]) < 1e-6 and row[4:] == full[4:], (table, row, full)
+
+def test_delta_matches_full_rebuild():
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = build_database(directory)
+        products = os.path.join(directory, 'products.csv')
+        changes = os.path.join(directory, 'changes.csv')
+        setup = DatabaseSetup(db_path)
+
+        report = ingest_delta(db_path, {products: 'products'})
+        assert report['files'] == {products: 'unchanged'} and not report['changed']
+
+        # Products deleted outside the CSVs, one of them re-added below
+        conn = sqlite3.connect(db_path)
+        conn.execute("DELETE FROM products WHERE id IN (50, 60)")
+        conn.commit()
+        conn.close()
+        setup.refresh_aggregates()
+
+        # New rows appended (one without a price), existing rows edited in a delta file
+        append_rows(products, [product(i, price=None if i == 405 else 20.0 + i % 7) for i in range(401, 421)])
+        append_rows(changes, [
+            product(10, price=99.0, name='Renamed Zebra'),  # new name, category and price
+            product(2, price=15.0, category='Jeans'),       # NULL price gets one
+            product(50, category='Jeans'),                  # deleted since the load
+            product(420, price=1.0, brand='Levi\'s'),       # appended above, changed again
+        ], header=True)
+
+        report = ingest_delta(db_path, {products: 'products', changes: 'products'})
+        assert report['files'] == {products: 'appended', changes: 'new'}, report['files']
+        stats = report['tables']['products']
+        assert (stats['inserted'], stats['reinserted'], stats['updated']) == (21, 1, 3), stats
+        assert (stats['high_water_before'], stats['high_water']) == (400, 420), stats
+
+        conn = sqlite3.connect(db_path)
+        try:
+            assert conn.execute("SELECT COUNT(*) FROM products").fetchone()[0] == 419
+            assert conn.execute("SELECT retail_price, brand FROM products WHERE id = 420").fetchone() == (1.0, 'Levi\'s')
+            delta_aggregates = aggregate_rows(conn)
+            delta_search = search_results(conn)
+            assert delta_search['zebra'] == [10] and 10 not in delta_search['"item 10"']
+            setup.refresh_aggregates()
+            setup.rebuild_search_index()
+            assert_same_aggregates(delta_aggregates, aggregate_rows(conn))
+            assert delta_search == search_results(conn)
+        finally:
+            conn.close()
+
+        # Nothing changed since: both files are skipped
+        report = ingest_delta(db_path, {products: 'products', changes: 'products'})
+        assert set(report['files'].values()) == {'unchanged'} and not report['changed']
+
+if __name__ == '__main__':
+    test_delta_matches_full_rebuild()
+    print("✅ test_delta_matches_full_rebuild")
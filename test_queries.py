@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Tests for keyset pagination in queries.product_list_query: walking every
+cursor page of a listing must return each matching product exactly once,
+in the listing's order, including products without a price.
+Run with: python test_queries.py (or pytest)
+"""
+
+import csv
+import os
+import sqlite3
+import tempfile
+
+from database_setup import DatabaseSetup
+from queries import product_count_query, product_list_query, sort_key
+
+PAGE_SIZE = 7
+
+PRODUCT_HEADER = ['id', 'cost', 'category', 'name', 'brand', 'retail_price', 'department', 'sku',
+                  'distribution_center_id']
+
+# Listings walked by the tests: (filters, sort)
+LISTINGS = [
+    (filters, sort)
+    for filters in ({}, {'category': 'Jeans'}, {'department': 'Women'}, {'min_price': 20.0})
+    for sort in ('id', 'price_asc', 'price_desc')
+]
+
+def price(product_id):
+    """Retail price of a test product: NULL for the first and some later ids, many ties"""
+    if product_id <= 5 or product_id % 37 == 0:
+        return None
+    return 10.0 + product_id % 23
+
+def build_database(directory, count=400):
+    """Load `count` products (some without a price) into a new database; returns its path"""
+    products = os.path.join(directory, 'products.csv')
+    with open(products, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(PRODUCT_HEADER)
+        for product_id in range(1, count + 1):
+            writer.writerow([product_id, 5.0, ('Jeans', 'Tops', 'Socks')[product_id % 3],
+                             f'Item {product_id}', ('Acme', 'Levi\'s')[product_id % 2], price(product_id),
+                             ('Women', 'Men')[product_id % 2], f'S{product_id}', 1])
+    db_path = os.path.join(directory, 'test.db')
+    setup = DatabaseSetup(db_path)
+    setup.create_tables()
+    setup.load_csv_files_parallel({products: 'products'}, workers=1)
+    return db_path
+
+def walk_pages(fetch_page, sort):
+    """
+    Ids of a listing read page by page; fetch_page(after) returns
+    (column names, rows) with one row more than PAGE_SIZE if there is a next page
+    """
+    ids = []
+    after = None
+    while True:
+        names, rows = fetch_page(after)
+        page = [dict(zip(names, row)) for row in rows[:PAGE_SIZE]]
+        ids.extend(row['id'] for row in page)
+        if len(rows) <= PAGE_SIZE:
+            return ids
+        after = sort_key(sort, page[-1])
+
+def sqlite_page(conn, filters, sort, after):
+    query, params = product_list_query(filters, PAGE_SIZE + 1, sort=sort, after=after)
+    cursor = conn.execute(query, params)
+    return [column[0] for column in cursor.description], cursor.fetchall()
+
+def test_cursor_walk_returns_every_product():
+    with tempfile.TemporaryDirectory() as directory:
+        conn = sqlite3.connect(build_database(directory))
+        try:
+            for filters, sort in LISTINGS:
+                ids = walk_pages(lambda after: sqlite_page(conn, filters, sort, after), sort)
+                query, params = product_count_query(filters)
+                assert len(ids) == conn.execute(query, params).fetchone()[0], (filters, sort)
+                # Same rows in the same order as one unpaged query
+                query, params = product_list_query(filters, -1, sort=sort)
+                assert ids == [row[0] for row in conn.execute(query, params)], (filters, sort)
+        finally:
+            conn.close()
+
+def test_null_prices_position():
+    """NULL prices come first ascending and last descending, ordered by id"""
+    with tempfile.TemporaryDirectory() as directory:
+        conn = sqlite3.connect(build_database(directory))
+        try:
+            unpriced = [row[0] for row in conn.execute(
+                "SELECT id FROM products WHERE retail_price IS NULL ORDER BY id")]
+            ascending = walk_pages(lambda after: sqlite_page(conn, {}, 'price_asc', after), 'price_asc')
+            descending = walk_pages(lambda after: sqlite_page(conn, {}, 'price_desc', after), 'price_desc')
+            assert ascending[:len(unpriced)] == unpriced
+            assert descending[-len(unpriced):] == unpriced[::-1]
+        finally:
+            conn.close()
+
+def test_cursor_queries_seek():
+    """Cursor queries, including those spanning NULL prices, pass the query plan check"""
+    with tempfile.TemporaryDirectory() as directory:
+        setup = DatabaseSetup(build_database(directory))
+        queries = []
+        for sort in ('price_asc', 'price_desc'):
+            for after in ((None, 3), (15.0, 200)):
+                query, params = product_list_query({}, 20, sort=sort, after=after)
+                queries.append((f"{sort} after {after}", query, params, False))
+        setup.verify_query_plans(queries)
+
+if __name__ == '__main__':
+    for test in (test_cursor_walk_returns_every_product, test_null_prices_position, test_cursor_queries_seek):
+        test()
+        print(f"✅ {test.__name__}")